@@ -1,29 +1,125 @@
 #! /usr/bin/env python
+import importlib
 import io
 import os
+from functools import partial
 from pathlib import Path
 from typing import List, Optional
 from zipfile import ZipFile
 
-import emoji
+import click
 import typer
+from typer.core import TyperGroup
 from typing_extensions import Annotated
 
 from dm_cli import VERSION
-from dm_cli.command_group.data_source import data_source_app, reset_data_source
-from dm_cli.command_group.entities import entities_app, import_entity
-from dm_cli.dmss import dmss_api, dmss_exception_wrapper, export
+from dm_cli.concurrency import AdaptiveLimiter
+from dm_cli.dmss import (
+    console,
+    dmss_api,
+    dmss_exception_wrapper,
+    ensure_connection_pool_size,
+    export,
+)
+from dm_cli.metrics import RequestMetrics
+from dm_cli.profiler import profiler
+from dm_cli.retry import RetryBudget
 from dm_cli.state import state
 from dm_cli.utils.file_structure import get_app_dir_structure, get_json_files_in_dir
-from dm_cli.utils.utils import (
-    get_root_packages_in_data_sources,
-    validate_entities_in_data_sources,
-)
-from dm_cli.utils.zip import save_as_zip_file, unpack_and_save_zipfile
 
-app = typer.Typer(pretty_exceptions_short=True)
-app.add_typer(data_source_app, name="ds")
-app.add_typer(entities_app, name="entities")
+
+class LazyGroup(TyperGroup):
+    """
+    Imports the command groups in 'lazy_groups' when one of their commands is run, so that other commands do not
+    pay for importing them, and what they import. Listing them in '--help' only uses the help given here.
+    """
+
+    # Name -> (module, Typer app in the module, help)
+    lazy_groups = {
+        "ds": ("dm_cli.command_group.data_source", "data_source_app", "Import and reset data sources"),
+        "entities": (
+            "dm_cli.command_group.entities",
+            "entities_app",
+            "Import, delete, or validate entities and/or blueprints",
+        ),
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._formatting_help = False
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        return [*(name for name in super().list_commands(ctx) if name not in self.lazy_groups), *self.lazy_groups]
+
+    def get_command(self, ctx: click.Context, name: str) -> Optional[click.Command]:
+        if name not in self.lazy_groups or name in self.commands:
+            return super().get_command(ctx, name)
+        module_name, app_name, help_text = self.lazy_groups[name]
+        if self._formatting_help:
+            return TyperGroup(name=name, help=help_text)
+        group = typer.main.get_group(getattr(importlib.import_module(module_name), app_name))
+        group.name = name
+        self.add_command(group, name)
+        return group
+
+    def format_help(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        self._formatting_help = True
+        try:
+            super().format_help(ctx, formatter)
+        finally:
+            self._formatting_help = False
+
+
+app = typer.Typer(cls=LazyGroup, pretty_exceptions_short=True)
+
+
+def configure_dmss_api(
+    api,
+    max_connections: Optional[int],
+    connect_timeout: float,
+    read_timeout: float,
+    compress_requests: List[str],
+    max_concurrency: Optional[int],
+    retry_budget: int,
+    metrics: Optional[RequestMetrics],
+):
+    from dm_cli.transport import get_transport
+
+    api.api_client.default_headers["Authorization"] = f"Bearer {state.token}"
+    api.api_client.configuration.host = state.dmss_url
+    transport = get_transport(api.api_client)
+    transport.configure(max_connections, connect_timeout, read_timeout, compress_endpoints=compress_requests)
+    transport.limiter = AdaptiveLimiter(state.concurrency, max_concurrency) if max_concurrency else None
+    transport.retry_budget = RetryBudget(retry_budget)
+    if metrics:
+        transport.hooks.append(metrics)
+    ensure_connection_pool_size(api.api_client, state.upload_workers)
+
+
+def print_retry_summary():
+    if not dmss_api.is_created:  # No requests were sent
+        return
+    from dm_cli.transport import get_transport
+
+    stats = get_transport(dmss_api.api_client).retry_budget.stats()
+    if stats.spent or stats.exhausted:
+        console.print(str(stats), style="dark_orange")
+
+
+def write_metrics(metrics: RequestMetrics, path: Path):
+    if dmss_api.is_created:
+        from dm_cli.transport import get_transport
+
+        get_transport(dmss_api.api_client).hooks.remove(metrics)
+    metrics.write(path)
+
+
+def print_profile(stats_path: Optional[Path]):
+    profiler.disable()
+    console.print(profiler.table())
+    if stats_path:
+        profiler.dump_stats(str(stats_path))
+        console.print(f"Wrote the cProfile stats to '{stats_path}'")
 
 
 def version_callback(print_version: bool):
@@ -34,6 +130,7 @@ def version_callback(print_version: bool):
 
 @app.callback()
 def main(
+    ctx: typer.Context,
     force: bool = typer.Option(
         False, "--force", "-f", help="Force the operation. Overwriting and potentially deleting data."
     ),
@@ -42,6 +139,87 @@ def main(
     ),
     token: str = typer.Option("no-token", "--token", "-t", help="Token for authentication against DMSS."),
     debug: bool = typer.Option(False, "--debug", "-d", help="Print stack trace of suppressed exceptions"),
+    concurrency: int = typer.Option(
+        4, "--concurrency", "-c", min=1, help="Maximum number of concurrent uploads when importing packages."
+    ),
+    resume: bool = typer.Option(
+        False, "--resume", help="Resume package imports that were interrupted, skipping uploads already completed."
+    ),
+    reuse_global_files: bool = typer.Option(
+        False,
+        "--reuse-global-files",
+        help="Reuse files in global folders uploaded by earlier runs, if they are unchanged and still in DMSS.",
+    ),
+    share_global_files: bool = typer.Option(
+        False,
+        "--share-global-files",
+        help="Upload files in global folders once per imported package tree, "
+        "instead of once per entity referencing them.",
+    ),
+    parse_workers: int = typer.Option(
+        1,
+        "--parse-workers",
+        min=1,
+        help="Number of processes parsing JSON documents and resolving their references when importing packages.",
+    ),
+    max_connections: Optional[int] = typer.Option(
+        None,
+        "--max-connections",
+        min=1,
+        help="Maximum number of connections to DMSS. By default, one per request in flight.",
+    ),
+    connect_timeout: float = typer.Option(10.0, "--connect-timeout", help="Seconds to wait for a connection to DMSS."),
+    read_timeout: float = typer.Option(600.0, "--read-timeout", help="Seconds to wait for DMSS to respond."),
+    compress_requests: Optional[List[str]] = typer.Option(
+        None,
+        "--compress-requests",
+        metavar="PATH",
+        help="Compress request bodies of 1 kB or more with gzip, when sent to DMSS endpoints starting with PATH "
+        "(e.g. /api/documents). DMSS must be deployed behind a proxy that decodes them. Can be given more than once.",
+    ),
+    max_concurrency: Optional[int] = typer.Option(
+        None,
+        "--max-concurrency",
+        min=1,
+        help="Adapt the number of requests in flight to DMSS to its latency and errors, "
+        "from --concurrency up to this, shared by all imports. "
+        "By default, every import sends up to --concurrency requests at once.",
+    ),
+    retry_budget: int = typer.Option(
+        50,
+        "--retry-budget",
+        min=0,
+        help="Number of times requests to DMSS failing with a server error, or without a response, may be retried "
+        "in total. Every request is sent at most 5 times.",
+    ),
+    metrics_out: Optional[Path] = typer.Option(
+        None,
+        "--metrics-out",
+        help="Write the counts, latencies and bytes of the requests to DMSS, by endpoint, to this JSON file when the "
+        "command ends, and in the Prometheus text format to the same path with the suffix '.prom'.",
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Print the wall time, CPU time and peak memory of every phase of imports when the command ends.",
+    ),
+    profile_stats: Optional[Path] = typer.Option(
+        None,
+        "--profile-stats",
+        help="Profile the functions called from the main thread with cProfile, and write the stats to this file, to "
+        "read with pstats. Implies --profile.",
+    ),
+    cache_ttl: float = typer.Option(
+        300.0,
+        "--cache-ttl",
+        help="Seconds to keep the meta information and blueprints of DMSS documents cached between runs. "
+        "Changes made by the CLI are never served from the cache. 0 disables the cache.",
+    ),
+    preflight: bool = typer.Option(
+        False,
+        "--preflight",
+        help="Check that all references in packages point to something before importing them, and stop if not.",
+    ),
     version: Optional[bool] = typer.Option(
         None, "--version", "-v", callback=version_callback, is_eager=True, help="Print version and exit"
     ),
@@ -54,9 +232,35 @@ def main(
     state.dmss_url = dmss_url
     state.token = token
     state.debug = debug
+    state.concurrency = concurrency
+    state.resume = resume
+    state.reuse_global_files = reuse_global_files
+    state.share_global_files = share_global_files
+    state.parse_workers = parse_workers
+    state.preflight = preflight
+    state.cache_ttl = cache_ttl
+    state.max_concurrency = max_concurrency
 
-    dmss_api.api_client.default_headers["Authorization"] = f"Bearer {token}"
-    dmss_api.api_client.configuration.host = dmss_url
+    metrics = RequestMetrics() if metrics_out else None
+    # The DMSS api is set up when a command first uses it, as creating it is slow. See 'LazyApi'
+    dmss_api.on_create(
+        partial(
+            configure_dmss_api,
+            max_connections=max_connections,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            compress_requests=compress_requests or [],
+            max_concurrency=max_concurrency,
+            retry_budget=retry_budget,
+            metrics=metrics,
+        )
+    )
+    ctx.call_on_close(print_retry_summary)
+    if profile or profile_stats:
+        profiler.enable(cprofile=profile_stats is not None)
+        ctx.call_on_close(partial(print_profile, profile_stats))
+    if metrics:
+        ctx.call_on_close(partial(write_metrics, metrics, metrics_out))
 
 
 @app.command("import-plugin-blueprints")
@@ -72,6 +276,8 @@ def import_plugin_blueprints(
     """
     Import blueprints from a plugin into the standard location 'system/Plugins/<plugin-name>'.
     """
+    from dm_cli.command_group.entities import import_entity
+
     state.force = True
     dmss_exception_wrapper(
         import_entity, source=f"{path}/blueprints/", destination=f"system/Plugins/{Path(path).name}", validate=validate
@@ -121,16 +327,18 @@ def export_entity(
 
     If the file or folder to export already exists on local disk, an exception is raised.
     """
+    from dm_cli.utils.zip import save_as_zip_file, unpack_and_save_zipfile
+
     response = dmss_exception_wrapper(export, target)
 
     if not export_location:
         export_location = os.getcwd()
-    with ZipFile(io.BytesIO(response.content), "r") as zip_file:
+    with ZipFile(io.BytesIO(response.data), "r") as zip_file:
         zip_file.filename = f"{target.split('/')[-1]}.zip"
         if unpack:
             unpack_and_save_zipfile(export_location=export_location, zip_file=zip_file)
         else:
-            save_as_zip_file(export_location=export_location, filename=zip_file.filename, data=response.content)
+            save_as_zip_file(export_location=export_location, filename=zip_file.filename, data=response.data)
 
 
 @app.command("reset")
@@ -145,10 +353,24 @@ def reset(
     resolve_local_ids: Annotated[
         bool, typer.Option(help="if True, will resolve all local ids found in all entities")
     ] = False,
+    incremental: Annotated[
+        bool, typer.Option(help="if True, only upload documents that changed since the last incremental reset.")
+    ] = False,
+    parallel: Annotated[
+        int, typer.Option(min=1, help="Number of data sources and root packages to reset at the same time.")
+    ] = 1,
 ):
     """
     Reset all data sources (deletes and re-uploads all packages to DMSS).
     """
+    import emoji
+
+    from dm_cli.command_group.data_source import reset_data_sources
+    from dm_cli.utils.utils import (
+        get_root_packages_in_data_sources,
+        validate_entities_in_data_sources,
+    )
+
     # Check for presence of expected directories, 'data_sources' and 'data'
     data_sources_dir, data_dir = get_app_dir_structure(Path(path))
 
@@ -156,21 +378,7 @@ def reset(
     if not data_source_definitions:
         print(emoji.emojize(f"\t:warning: No data source definitions were found in '{data_sources_dir}'."))
 
-    for data_source_definition_filename in data_source_definitions:
-        data_source_name = data_source_definition_filename.replace(".json", "")
-
-        data_source_data_dir = data_dir.joinpath(data_source_name)
-        if not data_source_data_dir.is_dir():
-            print(
-                emoji.emojize(
-                    f"\t:warning: No data source data directory was found by the name '{data_source_name}' in '{data_dir}'."
-                )
-            )
-            continue
-
-        dmss_exception_wrapper(
-            reset_data_source, data_source=data_source_name, path=path, resolve_local_ids=resolve_local_ids
-        )
+    reset_data_sources(data_sources_dir, data_dir, data_source_definitions, resolve_local_ids, incremental, parallel)
     data_source_contents = get_root_packages_in_data_sources(path)
     if validate_entities:
         dmss_exception_wrapper(validate_entities_in_data_sources, data_source_contents)
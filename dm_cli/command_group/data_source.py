@@ -1,20 +1,32 @@
 import json
+import time
+from functools import partial
 from pathlib import Path
+from typing import Callable, Dict, List, Tuple, Union
 
 import emoji
 import typer
 from rich import print
-from tenacity import (
-    retry,
-    retry_if_exception_type,
-    stop_after_attempt,
-    wait_random_exponential,
-)
 from typing_extensions import Annotated
 
-from dm_cli.dmss import ApplicationException, dmss_api, dmss_exception_wrapper
-from dm_cli.dmss_api.exceptions import ServiceException
+from dm_cli.dmss import (
+    dmss_api,
+    dmss_exception_wrapper,
+    ensure_connection_pool_size,
+)
+from dm_cli.domain import Package
 from dm_cli.import_entity import import_folder_entity, remove_by_path_ignore_404
+from dm_cli.import_journal import ImportJournal
+from dm_cli.incremental_import import (
+    Manifest,
+    import_root_package_incrementally,
+    remove_root_package_incrementally,
+)
+from dm_cli.package_tree_from_folder import package_tree_from_folder
+from dm_cli.preflight import check_package_references
+from dm_cli.reset_scheduler import ResetScheduler, print_reset_summary
+from dm_cli.state import state
+from dm_cli.transport import get_transport
 from dm_cli.utils.file_structure import get_app_dir_structure, get_json_files_in_dir
 from dm_cli.utils.utils import (
     get_root_packages_in_data_sources,
@@ -32,30 +44,21 @@ def import_data_source(
     Import a single data source definition to DMSS.
     """
 
-    @retry(
-        wait=wait_random_exponential(multiplier=1, max=60),
-        stop=stop_after_attempt(5),
-        reraise=True,
-        retry=retry_if_exception_type(ServiceException),
-    )
-    def retry_wrapper():
-        data_source_path = Path(path)
-        if not data_source_path.is_file():
-            raise FileNotFoundError(f"The path '{path}' is not a file.")
-
-        print(f"IMPORTING DATA SOURCE '{data_source_path.name}'")
+    data_source_path = Path(path)
+    if not data_source_path.is_file():
+        raise FileNotFoundError(f"The path '{path}' is not a file.")
 
-        # Read the data source definition
-        with open(data_source_path) as file:
-            document = json.load(file)
-            existing_data_sources = dmss_exception_wrapper(dmss_api.data_source_get_all)
-            if any(existing_document["name"] == document["name"] for existing_document in existing_data_sources):
-                print(f"WARNING: data source {document['name']} already exists. Updating existing data source.")
+    print(f"IMPORTING DATA SOURCE '{data_source_path.name}'")
 
-            dmss_exception_wrapper(dmss_api.data_source_save, document["name"], document)
-            print(f"\tImported data source '{document['name']}' ✓")
+    # Read the data source definition
+    with open(data_source_path) as file:
+        document = json.load(file)
+        existing_data_sources = dmss_exception_wrapper(dmss_api.data_source_get_all)
+        if any(existing_document["name"] == document["name"] for existing_document in existing_data_sources):
+            print(f"WARNING: data source {document['name']} already exists. Updating existing data source.")
 
-    retry_wrapper()
+        dmss_exception_wrapper(dmss_api.data_source_save, document["name"], document)
+        print(f"\tImported data source '{document['name']}' ✓")
 
 
 @data_source_app.command("import-all", help="Import all datasources found in the directory given by 'path'")
@@ -90,6 +93,12 @@ def initialize_data_source(
     validate_entities: Annotated[
         bool, typer.Option(help="If True, all entities uploaded to DMSS will be validated.")
     ] = True,
+    incremental: Annotated[
+        bool, typer.Option(help="If True, only upload documents that changed since the last incremental import.")
+    ] = False,
+    parallel: Annotated[
+        int, typer.Option(min=1, help="Number of data sources and root packages to reset at the same time.")
+    ] = 1,
 ):
     """
     Initialize the data sources and import all packages.
@@ -101,16 +110,71 @@ def initialize_data_source(
     data_source_definitions = get_json_files_in_dir(data_sources_dir)
     if not data_source_definitions:
         print(emoji.emojize(f"\t:warning: No data source definitions were found in '{data_sources_dir}'."))
-    for data_source_definition_filename in data_source_definitions:
-        import_data_source_file(data_sources_dir, data_dir, data_source_definition_filename, False)
+    reset_data_sources(data_sources_dir, data_dir, data_source_definitions, False, incremental, parallel)
     data_source_contents = get_root_packages_in_data_sources(path)
     if validate_entities:
         dmss_exception_wrapper(validate_entities_in_data_sources, data_source_contents)
 
 
-def import_data_source_file(
-    data_sources_dir: str, data_dir: str, data_source_definition_filename: str, resolve_local_ids: bool
-):
+def get_root_package_dirs(data_source_definition_filepath: Path, data_source_data_dir: Path) -> List[Path]:
+    """The folders of the root packages in a data source, which are all folders except the global folders"""
+    with open(data_source_definition_filepath) as file:
+        data_source_document = json.load(file)
+    global_folders = data_source_document.get("global_folders", [])
+    return [f for f in data_source_data_dir.iterdir() if f.is_dir() and f.name not in global_folders]
+
+
+# A package tree built from the folder of a root package, and the ids given to the documents in it
+PackageTree = Tuple[Package, Dict[str, str]]
+
+
+def preflight_data_sources(
+    data_sources_dir: Path, data_dir: Path, data_source_definition_filenames: List[str], incremental: bool = False
+) -> Dict[Path, PackageTree]:
+    """
+    Check the references in all root packages of the data sources before any of them are reset.
+    References to root packages being reset are checked against the local files, others against DMSS.
+
+    @return: The package trees of the root packages, by their folder. They are built with the ids the import would
+        give the documents, so they can be imported instead of being built again
+    """
+    package_trees: Dict[Path, PackageTree] = {}
+    packages = []
+    for filename in data_source_definition_filenames:
+        data_source_name = filename.replace(".json", "")
+        data_source_data_dir = data_dir / data_source_name
+        if not data_source_data_dir.is_dir():
+            continue
+        manifest = Manifest.load(data_source_name) if incremental else None
+        for root_package in get_root_package_dirs(Path(data_sources_dir, filename), data_source_data_dir):
+            if manifest:
+                document_ids = manifest.document_ids_in(root_package.name)
+            else:
+                document_ids = ImportJournal.open(data_source_name, root_package, resume=state.resume).document_ids
+            package = package_tree_from_folder(
+                data_source_name, root_package, is_root=True, document_ids=document_ids, workers=state.parse_workers
+            )
+            package_trees[root_package] = (package, document_ids)
+            packages.append((package, data_source_name))
+    check_package_references(packages, scopes=[f"{destination}/{package.name}" for package, destination in packages])
+    return package_trees
+
+
+def prepare_data_source_file(
+    data_sources_dir: str,
+    data_dir: str,
+    data_source_definition_filename: str,
+    resolve_local_ids: bool,
+    incremental: bool = False,
+    package_trees: Union[Dict[Path, PackageTree], None] = None,
+) -> List[Tuple[str, Callable[[], None]]]:
+    """
+    Import a data source definition and remove the root packages that are about to be re-imported.
+
+    @param package_trees: Package trees already built by 'preflight_data_sources', to import instead of building them
+    @return: The root packages to import, as pairs of root package name and a function importing it.
+    """
+    package_trees = package_trees or {}
     data_source_definition_filepath = Path(data_sources_dir).joinpath(data_source_definition_filename)
     data_source_name = data_source_definition_filename.replace(".json", "")
 
@@ -121,30 +185,107 @@ def import_data_source_file(
                 f"\t:warning: No data source data directory was found by the name '{data_source_name}' in '{data_dir}'."
             )
         )
-    else:
-        import_data_source(data_source_definition_filepath)
-        with open(data_source_definition_filepath) as file:
-            data_source_document = json.load(file)
-            global_folders = data_source_document.get("global_folders", [])
-            root_packages = [f for f in data_source_data_dir.iterdir() if f.is_dir() and f.name not in global_folders]
-            # Remove existing root packages from the data source.
-            # This will also remove any files in the global folders that are references from files in the root packages.
-            for root_package in root_packages:
-                dmss_exception_wrapper(remove_by_path_ignore_404, f"/{data_source_name}/{root_package.name}")
-
-            # Import all root packages
-            for root_package in root_packages:
-                print(f"Importing PACKAGE '{data_source_data_dir / root_package.name}' --> '{data_source_name}'")
-                dmss_exception_wrapper(
-                    import_folder_entity,
-                    source_path=data_source_data_dir / root_package.name,
-                    destination=data_source_name,
-                    # Use the document raw endpoint,
-                    # so that uploaded packages will not be resolved,
-                    # this is to support uploading core blueprints.
-                    raw_package_import=True,
+        return []
+
+    import_data_source(data_source_definition_filepath)
+    root_packages = get_root_package_dirs(data_source_definition_filepath, data_source_data_dir)
+
+    if incremental:
+        manifest = Manifest.load(data_source_name)
+        for removed_root_package in manifest.root_packages() - {root_package.name for root_package in root_packages}:
+            remove_root_package_incrementally(removed_root_package, manifest)
+        return [
+            (
+                root_package.name,
+                partial(
+                    import_root_package_incrementally,
+                    source_path=root_package,
+                    data_source=data_source_name,
+                    manifest=manifest,
                     resolve_local_ids=resolve_local_ids,
-                )
+                    package_tree=package_trees.get(root_package),
+                ),
+            )
+            for root_package in root_packages
+        ]
+
+    # Remove existing root packages from the data source.
+    # This will also remove any files in the global folders that are references from files in the root packages.
+    for root_package in root_packages:
+        if ImportJournal.open(data_source_name, root_package, resume=state.resume).has_progress:
+            continue  # Resuming an interrupted import of the root package
+        remove_by_path_ignore_404(f"/{data_source_name}/{root_package.name}")
+
+    return [
+        (
+            root_package.name,
+            partial(
+                import_root_package,
+                source_path=data_source_data_dir / root_package.name,
+                data_source=data_source_name,
+                resolve_local_ids=resolve_local_ids,
+                package=package_trees[root_package][0] if root_package in package_trees else None,
+            ),
+        )
+        for root_package in root_packages
+    ]
+
+
+def import_root_package(source_path: Path, data_source: str, resolve_local_ids: bool, package: Package = None):
+    print(f"Importing PACKAGE '{source_path}' --> '{data_source}'")
+    import_folder_entity(
+        source_path=source_path,
+        destination=data_source,
+        # Use the document raw endpoint,
+        # so that uploaded packages will not be resolved,
+        # this is to support uploading core blueprints.
+        raw_package_import=True,
+        resolve_local_ids=resolve_local_ids,
+        package=package,
+    )
+
+
+def reset_data_sources(
+    data_sources_dir: Path,
+    data_dir: Path,
+    data_source_definition_filenames: List[str],
+    resolve_local_ids: bool,
+    incremental: bool = False,
+    parallel: int = 1,
+):
+    """
+    Reset data sources, with up to 'parallel' data sources and root packages being reset at the same time.
+    Failures are reported in a summary once all data sources are done, and make the command exit with code 1.
+    """
+    package_trees = {}
+    if state.preflight:
+        package_trees = dmss_exception_wrapper(
+            preflight_data_sources, data_sources_dir, data_dir, data_source_definition_filenames, incremental
+        )
+    # Every root package import runs its own uploads concurrently
+    ensure_connection_pool_size(dmss_api.api_client, parallel * state.upload_workers)
+    start = time.perf_counter()
+    steps = ResetScheduler(max_parallel=parallel).run(
+        {
+            filename.replace(".json", ""): partial(
+                prepare_data_source_file,
+                data_sources_dir,
+                data_dir,
+                filename,
+                resolve_local_ids,
+                incremental,
+                package_trees,
+            )
+            for filename in data_source_definition_filenames
+        }
+    )
+    transport = get_transport(dmss_api.api_client)
+    caption = str(transport.stats())
+    if transport.limiter:
+        caption += f"\n{transport.limiter.stats()}"
+    print_reset_summary(steps, time.perf_counter() - start, caption=caption)
+    if any(step.error for step in steps):
+        raise typer.Exit(code=1)
 
 
 @data_source_app.command("reset")
@@ -152,6 +293,12 @@ def reset_data_source(
     data_source: Annotated[str, typer.Argument(help="Name of data source to reset")],
     path: Annotated[Path, typer.Argument(help="Path on local filesystem to data source folder.")],
     resolve_local_ids: Annotated[bool, typer.Argument(help="Resolve local ids")] = False,
+    incremental: Annotated[
+        bool, typer.Option(help="If True, only upload documents that changed since the last incremental import.")
+    ] = False,
+    parallel: Annotated[
+        int, typer.Option(min=1, help="Number of data sources and root packages to reset at the same time.")
+    ] = 1,
 ):
     """
     Reset a single data source (deletes and re-uploads root-packages)
@@ -173,4 +320,4 @@ def reset_data_source(
         raise FileNotFoundError(f"There is no data source directory for '{data_source}' in '{data_dir}'.")
 
     # Import all packages in the data source
-    import_data_source_file(data_sources_dir, data_dir, f"{data_source}.json", resolve_local_ids)
+    reset_data_sources(data_sources_dir, data_dir, [f"{data_source}.json"], resolve_local_ids, incremental, parallel)
@@ -3,17 +3,13 @@ from pathlib import Path
 
 import typer
 from rich import print
-from tenacity import (
-    retry,
-    retry_if_not_exception_type,
-    stop_after_attempt,
-    wait_random_exponential,
-)
 from typing_extensions import Annotated
 
-from dm_cli.dmss import ApplicationException, console, dmss_api, dmss_exception_wrapper
+from dm_cli.dmss import console, dmss_api, dmss_exception_wrapper
 from dm_cli.dmss_api import ApiException
 from dm_cli.import_entity import import_folder_entity, import_single_entity
+from dm_cli.profiler import phase
+from dm_cli.state import state
 from dm_cli.utils.utils import destination_is_root
 
 entities_app = typer.Typer(help="Import, delete, or validate entities and/or blueprints")
@@ -52,16 +48,18 @@ def import_entity(
                     if file.is_file():
                         import_single_entity(file, destination, validate)
                         continue
-                    import_folder_entity(file, destination, fast)
+                    import_folder_entity(file, destination, fast, preflight=state.preflight)
                     if validate:
                         print(f"Validating entities in: {destination}/{file.name}")
-                        dmss_api.validate_existing_entity(f"{destination}/{file.name}")
+                        with phase("validation"):
+                            dmss_api.validate_existing_entity(f"{destination}/{file.name}")
                 return True
             print(f"Importing PACKAGE '{source}' --> '{destination}'")
-            import_folder_entity(source_path, destination, fast)
+            import_folder_entity(source_path, destination, fast, preflight=state.preflight)
             if validate:
                 print(f"Validating entities in: {destination}/{source_path.name}")
-                dmss_api.validate_existing_entity(f"{destination}/{source_path.name}")
+                with phase("validation"):
+                    dmss_api.validate_existing_entity(f"{destination}/{source_path.name}")
             return True
         else:
             import_single_entity(source_path, destination, validate)
@@ -82,11 +80,6 @@ def validate_entity(
     """Recursively validate entity at remote target"""
     print(f"Validating entities recursively in: {destination}")
 
-    @retry(
-        wait=wait_random_exponential(multiplier=1, max=60),
-        stop=stop_after_attempt(5),
-        retry=retry_if_not_exception_type((ApplicationException, RuntimeError)),
-    )
     def validation_error_wrapper():
         try:
             dmss_api.validate_existing_entity(destination)
@@ -0,0 +1,116 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# Responses this much slower than usual are not counted as slow, as they are within the jitter of DMSS
+MIN_SPIKE_SECONDS = 0.1
+# The number of slow responses in a row from an endpoint that make a latency spike, so one large request is not
+SPIKE_RESPONSES = 3
+
+
+@dataclass
+class ConcurrencyStats:
+    limit: int
+    lowest: int
+    highest: int
+    decreases: int
+
+    def __str__(self):
+        return (
+            f"Concurrent requests to DMSS adapted between {self.lowest} and {self.highest} "
+            f"({self.limit} at the end, backed off {self.decreases} times)"
+        )
+
+
+class AdaptiveLimiter:
+    """
+    Limits the number of requests in flight to DMSS, adapting the limit to how DMSS copes (AIMD).
+
+    The limit grows by one for every 'limit' responses that are on time, and is halved on a server error,
+    a 429 Too Many Requests, or a latency spike: 'SPIKE_RESPONSES' responses in a row taking more than
+    'latency_tolerance' times the usual latency of their endpoint. The usual latency follows every response, so a
+    lasting change in latency is only a spike until it has become usual.
+    A decrease is only triggered by requests sent after the previous one, so a burst of failures from requests
+    sent under a higher limit halves it once.
+
+    @param initial: The number of requests in flight to start with
+    @param max_limit: The limit is never raised above this
+    @param min_limit: The limit is never lowered below this
+    @param latency_tolerance: How many times slower than usual a response must be to count as a latency spike
+    """
+
+    def __init__(self, initial: int, max_limit: int, min_limit: int = 1, latency_tolerance: float = 2.0):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.latency_tolerance = latency_tolerance
+        self._limit = float(min(max(initial, min_limit), self.max_limit))
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._holding = threading.local()
+        self._last_decrease = 0.0
+        self._baselines: Dict[str, float] = {}  # Endpoint -> usual latency in seconds
+        self._slow_responses: Dict[str, int] = {}  # Endpoint -> slow responses in a row
+        self._stats = ConcurrencyStats(int(self._limit), int(self._limit), int(self._limit), 0)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def stats(self) -> ConcurrencyStats:
+        with self._condition:
+            return ConcurrencyStats(self.limit, self._stats.lowest, self._stats.highest, self._stats.decreases)
+
+    def acquire(self) -> Optional[float]:
+        """
+        Wait for the number of requests in flight to be below the limit, and take a slot.
+
+        Returns the time the slot was taken, to give to 'release', or None if the thread already holds a slot, as
+        redirects are sent while the request they are a redirect of is still in flight.
+        """
+        if getattr(self._holding, "active", False):
+            return None
+        with self._condition:
+            self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        self._holding.active = True
+        return time.monotonic()
+
+    def release(self, sent: Optional[float], endpoint: str, status: Optional[int]) -> None:
+        """
+        Give back a slot, and adapt the limit to the response.
+
+        @param sent: The time returned by 'acquire'
+        @param endpoint: The endpoint the request was sent to, as latencies are compared to others of the same endpoint
+        @param status: The status of the response, or None if there was no response
+        """
+        if sent is None:
+            return
+        self._holding.active = False
+        with self._condition:
+            self._in_flight -= 1
+            self._on_response(endpoint, sent, time.monotonic() - sent, status)
+            self._condition.notify_all()
+
+    def _on_response(self, endpoint: str, sent: float, latency: float, status) -> None:
+        overloaded = status is None or status == 429 or status >= 500  # No response may be a timeout
+        slow = False
+        if not overloaded:  # Failures are often fast, and not a sign of the usual latency
+            baseline = self._baselines.get(endpoint)
+            slow = baseline is not None and latency > max(
+                self.latency_tolerance * baseline, baseline + MIN_SPIKE_SECONDS
+            )
+            # A slow moving average of every response, so the usual latency follows a lasting change
+            self._baselines[endpoint] = latency if baseline is None else 0.9 * baseline + 0.1 * latency
+            self._slow_responses[endpoint] = self._slow_responses.get(endpoint, 0) + 1 if slow else 0
+        if overloaded or self._slow_responses.get(endpoint, 0) >= SPIKE_RESPONSES:
+            if sent >= self._last_decrease:
+                self._last_decrease = time.monotonic()
+                self._limit = max(self._limit / 2, self.min_limit)
+                self._slow_responses[endpoint] = 0
+                self._stats.decreases += 1
+                self._stats.lowest = min(self._stats.lowest, self.limit)
+            return
+        if not slow:
+            self._limit = min(self._limit + 1 / self._limit, self.max_limit)
+            self._stats.highest = max(self._stats.highest, self.limit)
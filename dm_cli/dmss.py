@@ -1,25 +1,133 @@
+import io
 import json
-from typing import Any, Callable
+import threading
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, List, Tuple, Union
+from urllib.parse import quote
 
-import requests
 import typer
 from rich.console import Console
 from rich.text import Text
-from tenacity import (
-    retry,
-    retry_if_exception_type,
-    stop_after_attempt,
-    wait_random_exponential,
-)
-
-from dm_cli.dmss_api import ApiException
-from dm_cli.dmss_api.api.default_api import DefaultApi
-from dm_cli.dmss_api.exceptions import NotFoundException, ServiceException
+
+from dm_cli.retry import RetryBudget
 from dm_cli.state import state
+from dm_cli.utils import codec
+from dm_cli.utils.multipart import MultipartStream
+
+# The generated DMSS api, and urllib3, are imported on first use. See 'LazyApi'
+if TYPE_CHECKING:
+    from dm_cli.dmss_api import ApiClient
+    from dm_cli.dmss_api.api.default_api import DefaultApi
+    from dm_cli.dmss_api.rest import RESTResponse
 
 console = Console()
 
-dmss_api = DefaultApi()
+
+def _deserialize_raw(deserialize: Callable, response: "RESTResponse", response_type: tuple, _check_type: bool) -> Any:
+    from dm_cli.dmss_api.model_utils import file_type
+
+    if response_type == (file_type,):
+        return deserialize(response, response_type, _check_type)
+    try:
+        return codec.loads(response.data)
+    except ValueError:
+        return response.data.decode("utf-8")
+
+
+def use_raw_responses(api_client: "ApiClient", enabled: bool = True) -> None:
+    """
+    Make the operations of 'api_client' return responses as parsed JSON (dicts, lists, and primitives).
+
+    The generated DMSS api checks every value in a response against the types of the api, and converts them to
+    instances of the generated models. For large documents that takes far longer than parsing them. The CLI only
+    reads responses as plain JSON, so it always uses raw responses. See 'call_raw' for a single call.
+    """
+    if enabled:
+        api_client.deserialize = partial(_deserialize_raw, partial(type(api_client).deserialize, api_client))
+    else:
+        api_client.__dict__.pop("deserialize", None)
+
+
+def call_raw(operation: Callable, *args, **kwargs) -> Any:
+    """Call an operation of the generated DMSS api, returning the response as parsed JSON. See 'use_raw_responses'"""
+    response = operation(*args, _preload_content=False, **kwargs)
+    try:
+        data = response.data
+    finally:
+        response.release_conn()
+    return codec.loads(data) if data else None
+
+
+class LazyApi:
+    """
+    The DefaultApi of the CLI, created on first use.
+
+    Importing the generated DMSS api, its models and urllib3 takes longer than starting the rest of the CLI, so it
+    is only done once a command uses DMSS, and not at all for commands like '--help'. Attributes are read from
+    and set on the DefaultApi, so that it is used (and patched in tests) like one.
+    """
+
+    def __init__(self, create: Callable[[], "DefaultApi"]):
+        object.__setattr__(self, "_create", create)
+        object.__setattr__(self, "_api", None)
+        object.__setattr__(self, "_callbacks", [])
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    @property
+    def is_created(self) -> bool:
+        return self._api is not None
+
+    def on_create(self, callback: Callable[["DefaultApi"], None]) -> None:
+        """
+        Call 'callback' with the DefaultApi before it is first used, or at once, if it already has been.
+        The callback must use the DefaultApi it is given, not this.
+        """
+        with self._lock:
+            if self._api is None:
+                self._callbacks.append(callback)
+                return
+        callback(self._api)
+
+    def _get(self) -> "DefaultApi":
+        if self._api is None:
+            with self._lock:
+                if self._api is None:
+                    api = self._create()
+                    for callback in self._callbacks:
+                        callback(api)
+                    self._callbacks.clear()
+                    object.__setattr__(self, "_api", api)
+        return self._api
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._get(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._get(), name)
+
+
+def _create_dmss_api() -> "DefaultApi":
+    from dm_cli.dmss_api.api.default_api import DefaultApi
+    from dm_cli.transport import get_transport
+
+    codec.install_in_generated_client()
+    api = DefaultApi()
+    use_raw_responses(api.api_client)
+    get_transport(api.api_client).retry_budget = RetryBudget()
+    return api
+
+
+dmss_api = LazyApi(_create_dmss_api)
+
+
+def ensure_connection_pool_size(api_client: "ApiClient", size: int) -> None:
+    """Grow the connection pool of 'api_client', so that 'size' requests to DMSS can be in flight at once"""
+    from dm_cli.transport import get_transport
+
+    get_transport(api_client).ensure_pool_size(size)
 
 
 class ApplicationException(Exception):
@@ -54,34 +162,115 @@ class ApplicationException(Exception):
         }
 
 
-@retry(
-    wait=wait_random_exponential(multiplier=1, max=60),
-    stop=stop_after_attempt(5),
-    reraise=True,
-    retry=retry_if_exception_type(ServiceException),
-)
 def export(absolute_document_ref: str):
     """Call export endpoint from DMSS to download document(s) as zip.
 
     The reason dmss_api cannot be used directly is that there were some issues with interpreting the JSON schema,
     which caused the export function in the generated DMSS api to not work properly.
+    The request is sent through the connection pool of the generated DMSS api.
     """
+    from dm_cli.dmss_api.exceptions import ServiceException
+    from dm_cli.transport import get_transport
+
     headers = {"Access-Key": state.token}
 
-    response = requests.get(f"{state.dmss_url}/api/export/{absolute_document_ref}", headers=headers)  # nosec
-    if response.status_code != 200:
+    response = get_transport(dmss_api.api_client).request(
+        "GET", f"/api/export/{absolute_document_ref}", headers=headers
+    )
+    if 500 <= response.status <= 599:
+        raise ServiceException(http_resp=response)
+    if response.status != 200:
         raise ApplicationException(
-            message=f"Could not export document(s) from {absolute_document_ref} (status code {response.status_code})."
+            message=f"Could not export document(s) from {absolute_document_ref} (status code {response.status})."
         )
 
     return response
 
 
+def _raise_for_status(response: "RESTResponse") -> None:
+    """Raise the same exceptions for an unsuccessful response as the generated DMSS api does"""
+    from dm_cli.dmss_api.exceptions import (
+        ApiException,
+        ForbiddenException,
+        NotFoundException,
+        ServiceException,
+        UnauthorizedException,
+    )
+
+    if 200 <= response.status <= 299:
+        return
+    if response.status == 401:
+        raise UnauthorizedException(http_resp=response)
+    if response.status == 403:
+        raise ForbiddenException(http_resp=response)
+    if response.status == 404:
+        raise NotFoundException(http_resp=response)
+    if 500 <= response.status <= 599:
+        raise ServiceException(http_resp=response)
+    raise ApiException(http_resp=response)
+
+
+def _upload_multipart(
+    api_client: "ApiClient", method: str, resource_path: str, fields: List[Tuple[str, Union[str, io.IOBase]]]
+) -> Any:
+    """
+    Send a multipart/form-data request to DMSS, streaming the files in it from disk.
+
+    The generated DMSS api reads every file into memory to build the request body, which makes uploads
+    of large files run out of memory. The request is sent through the connection pool of 'api_client'.
+    """
+    from dm_cli.transport import get_transport
+
+    body = MultipartStream(fields)
+    headers = {
+        "Accept": "application/json",
+        "Content-Type": body.content_type,
+        "Content-Length": str(len(body)),
+    }
+    api_client.update_params_for_auth(
+        headers, [], ["APIKeyHeader", "OAuth2AuthorizationCodeBearer"], resource_path, method, None
+    )
+    with body:
+        response = get_transport(api_client).request(method, resource_path, body=body, headers=headers)
+    _raise_for_status(response)
+    return codec.loads(response.data) if response.data else None
+
+
+def file_upload(data_source_id: str, file_id: str, file: io.IOBase, api_client: "ApiClient" = None) -> Any:
+    """
+    Upload a file to a data source, streaming it from disk. Replaces 'dmss_api.file_upload'.
+
+    @param file: A file opened in binary mode, or a 'LazyFile'
+    """
+    return _upload_multipart(
+        api_client or dmss_api.api_client,
+        "POST",
+        f"/api/files/{quote(data_source_id, safe='')}",
+        [("data", codec.dumps({"file_id": file_id})), ("file", file)],
+    )
+
+
+def blob_upload(data_source_id: str, blob_id: str, file: io.IOBase, api_client: "ApiClient" = None) -> str:
+    """
+    Upload a blob to a data source, streaming it from disk. Replaces 'dmss_api.blob_upload'.
+
+    @param file: A file opened in binary mode, or a 'LazyFile'
+    """
+    return _upload_multipart(
+        api_client or dmss_api.api_client,
+        "PUT",
+        f"/api/blobs/{quote(data_source_id, safe='')}/{quote(blob_id, safe='')}",
+        [("file", file)],
+    )
+
+
 def dmss_exception_wrapper(
     function: Callable,
     *args,
     **kwargs,
 ) -> Any:
+    from dm_cli.dmss_api.exceptions import ApiException, NotFoundException
+
     try:
         return function(*args, **kwargs)
     except ApplicationException as e:
@@ -0,0 +1,85 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, List, Union
+
+from .dmss import (
+    blob_upload,
+    dmss_api,
+    ensure_connection_pool_size,
+    export,
+    file_upload,
+)
+from .state import state
+from .utils import codec
+
+if TYPE_CHECKING:
+    from .dmss_api.api.default_api import DefaultApi
+    from .dmss_api.rest import RESTResponse
+
+
+class AsyncDMSS:
+    """
+    asyncio client for the DMSS endpoints used by the CLI.
+
+    Requests are sent through the generated DefaultApi, so they share its configuration, authentication and
+    urllib3 connection pool, and raise the same exceptions. At most 'max_concurrency' requests are in flight at
+    once, while any number of coroutines can be awaiting them on a single event loop.
+
+    Example:
+        async with AsyncDMSS() as dmss:
+            documents = await asyncio.gather(*(dmss.document_get(address) for address in addresses))
+    """
+
+    def __init__(self, api: "DefaultApi" = None, max_concurrency: int = None):
+        self.api = api if api else dmss_api
+        self.max_concurrency = max_concurrency if max_concurrency else state.upload_workers
+        ensure_connection_pool_size(self.api.api_client, self.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="dmss")
+
+    async def __aenter__(self) -> "AsyncDMSS":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    async def _call(self, function: Callable, *args, **kwargs) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(function, *args, **kwargs))
+
+    async def document_add(self, address: str, document: Union[dict, str], files: List = None) -> Any:
+        if isinstance(document, dict):
+            document = codec.dumps(document)
+        return await self._call(self.api.document_add, address, document, files=files if files else [])
+
+    async def document_add_simple(self, data_source: str, document: dict) -> str:
+        return await self._call(self.api.document_add_simple, data_source, document)
+
+    async def document_get(self, address: str, **kwargs) -> dict:
+        return await self._call(self.api.document_get, address, **kwargs)
+
+    async def document_remove(self, address: str) -> Any:
+        return await self._call(self.api.document_remove, address)
+
+    async def document_check(self, address: str) -> bool:
+        return await self._call(self.api.document_check, address)
+
+    async def file_upload(self, data_source: str, file_id: str, file) -> Any:
+        return await self._call(file_upload, data_source, file_id, file, api_client=self.api.api_client)
+
+    async def blob_upload(self, data_source: str, blob_id: str, file) -> Any:
+        return await self._call(blob_upload, data_source, blob_id, file, api_client=self.api.api_client)
+
+    async def export(self, address: str) -> "RESTResponse":
+        return await self._call(export, address)
+
+    async def export_meta(self, address: str) -> dict:
+        return await self._call(self.api.export_meta, address)
+
+    async def validate_entity(self, entity: dict) -> Any:
+        return await self._call(self.api.validate_entity, entity)
+
+    async def validate_existing_entity(self, address: str) -> Any:
+        return await self._call(self.api.validate_existing_entity, address)
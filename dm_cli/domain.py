@@ -1,17 +1,41 @@
 import io
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Callable, List, Literal, NewType, Union
+from typing import Callable, Dict, Literal, NewType, Union
 from uuid import UUID, uuid4
 
 from .enums import SIMOS, ReferenceTypes
 
 
+class LazyFile(io.RawIOBase):
+    """A binary file on the local filesystem, that is not opened (or read into memory) until it is first read"""
+
+    def __init__(self, path: Path, name: str, destination: Path):
+        super().__init__()
+        self.path = path
+        self.name = name
+        self.destination = destination
+        self._file = None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._file is None:
+            self._file = open(self.path, "rb")
+        return self._file.readinto(buffer)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        super().close()
+
+
 @dataclass(frozen=True)
 class File:
     """Class for a file"""
 
-    content: io.BytesIO
+    content: Union[io.BytesIO, LazyFile]
     path: Path
     name: str = ""
     uid: str = ""
@@ -20,7 +44,85 @@ class File:
         return self.__getattribute__(item)
 
 
+def _child_name(child: Union["Package", dict, File]) -> Union[str, None]:
+    return child.get("name") if isinstance(child, dict) else child.name
+
+
+class PackageContent(list):
+    """
+    The content list of a Package, which maintains a name->child index as children are added.
+
+    Lookups by name return the first child with that name, like a linear search through the list would.
+    """
+
+    def __init__(self, children=()):
+        super().__init__()
+        self.by_name: Dict[str, Union[Package, dict, File]] = {}
+        self.packages_by_name: Dict[str, Package] = {}
+        self.extend(children)
+
+    def _index(self, child) -> None:
+        name = _child_name(child)
+        self.by_name.setdefault(name, child)
+        if isinstance(child, Package):
+            self.packages_by_name.setdefault(name, child)
+
+    def _reindex(self) -> None:
+        self.by_name.clear()
+        self.packages_by_name.clear()
+        for child in self:
+            self._index(child)
+
+    def append(self, child) -> None:
+        super().append(child)
+        self._index(child)
+
+    def extend(self, children) -> None:
+        for child in children:
+            self.append(child)
+
+    def __setitem__(self, index, child) -> None:
+        replaced = self[index]
+        super().__setitem__(index, child)
+        if (
+            isinstance(index, int)
+            and _child_name(replaced) == _child_name(child)
+            and isinstance(replaced, Package) == isinstance(child, Package)
+        ):
+            # Fast path for documents replaced in place (e.g. by 'traverse_documents')
+            name = _child_name(child)
+            if self.by_name.get(name) is replaced:
+                self.by_name[name] = child
+            if self.packages_by_name.get(name) is replaced:
+                self.packages_by_name[name] = child
+            return
+        self._reindex()
+
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self._reindex()
+
+    def insert(self, index, child) -> None:
+        super().insert(index, child)
+        self._reindex()
+
+    def remove(self, child) -> None:
+        super().remove(child)
+        self._reindex()
+
+    def pop(self, index=-1):
+        child = super().pop(index)
+        self._reindex()
+        return child
+
+    def clear(self) -> None:
+        super().clear()
+        self._reindex()
+
+
 class Package:
+    __slots__ = ("name", "description", "uid", "is_root", "content", "meta", "parent")
+
     def __init__(
         self,
         name: str,
@@ -34,7 +136,7 @@ class Package:
         self.description = description
         self.uid = uid if uid else uuid4()
         self.is_root = is_root
-        self.content: List[Union[Package, dict, File]] = []
+        self.content: PackageContent = PackageContent()
         self.meta: Union[dict, None] = meta if meta else {}
         self.parent = parent if parent else None
 
@@ -44,8 +146,19 @@ class Package:
     def __getitem__(self, item):
         return self.__getattribute__(item)
 
-    def search(self, filename: str) -> Union["Package", dict]:
-        return next((child for child in self.content if child["name"] == filename), None)
+    def search(self, filename: str) -> Union["Package", dict, File, None]:
+        return self.content.by_name.get(filename)
+
+    def get_sub_package(self, name: str) -> Union["Package", None]:
+        return self.content.packages_by_name.get(name)
+
+    def get_or_create_sub_package(self, name: str) -> "Package":
+        """Return the sub package with the given name, creating and appending it to the content if it is missing"""
+        sub_package = self.content.packages_by_name.get(name)
+        if not sub_package:
+            sub_package = Package(name=name, parent=self)
+            self.content.append(sub_package)
+        return sub_package
 
     def to_dict(self):
         return {
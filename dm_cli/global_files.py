@@ -0,0 +1,150 @@
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Literal, Tuple
+from urllib.parse import unquote, urlsplit
+
+from .dmss import dmss_api
+from .dmss_api.exceptions import NotFoundException
+from .response_cache import normalize_address
+from .state import state
+from .transport import get_transport
+from .utils.cache import get_cache_dir, hash_file, read_json_file, write_json_file
+
+GlobalFileKind = Literal["blob", "document"]
+
+
+class GlobalFileCache:
+    """
+    The ids of the files in global folders (referenced by storage references) uploaded to a data source.
+
+    Files are keyed by their owner, their resolved path and a hash of what is uploaded, so a file referenced by many
+    entities of the same owner is only uploaded once, and a file that has changed is uploaded again. DMSS removes the
+    files referenced by a document together with it, so a file is only shared by documents that are removed together,
+    like the documents of a package tree, and the files of owners in a root package are forgotten when the CLI removes
+    anything in it (see 'invalidate_after_request').
+
+    The cache is shared by all imports to the data source within this process. If 'persist' is True, the cache is kept
+    between runs, and the ids from earlier runs are reused after checking that the blob or document still exists.
+    """
+
+    _open_caches: Dict[str, "GlobalFileCache"] = {}
+    _open_caches_lock = threading.Lock()
+
+    def __init__(self, data_source: str, persist: bool = False):
+        self.data_source = data_source
+        self.persist = persist
+        self.ids: Dict[str, str] = {}  # Uploaded during this run
+        self.persisted_ids: Dict[str, str] = {}  # Uploaded by earlier runs, and not yet checked to still exist
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._file_hashes: Dict[Tuple[str, int, int], str] = {}
+        if persist:
+            # Entries written before files had owners are dropped, as it is not known which documents share them
+            persisted_ids = read_json_file(self._file_path(), default={})
+            self.persisted_ids = {key: global_id for key, global_id in persisted_ids.items() if "|" in key}
+
+    @classmethod
+    def open(cls, data_source: str, persist: bool = False) -> "GlobalFileCache":
+        with cls._open_caches_lock:
+            if data_source not in cls._open_caches:
+                cls._open_caches[data_source] = cls(data_source, persist)
+            return cls._open_caches[data_source]
+
+    def _file_path(self) -> Path:
+        return get_cache_dir("global-files") / f"{self.data_source}.json"
+
+    def hash_file(self, path: Path) -> str:
+        """Hash the content of a file, only reading files again if they have been modified"""
+        stat = os.stat(path)
+        key = (str(Path(path).resolve()), stat.st_mtime_ns, stat.st_size)
+        if key not in self._file_hashes:
+            self._file_hashes[key] = hash_file(path)
+        return self._file_hashes[key]
+
+    def get_or_upload(
+        self, owner: str, kind: GlobalFileKind, path: Path, content_hash: str, upload: Callable[[], str]
+    ) -> str:
+        """
+        Get the id of a global file, calling 'upload' to upload it if it has not been uploaded already for 'owner'.
+        Concurrent calls for the same file wait for the first one to finish, instead of uploading it again.
+
+        @param owner: The address of the documents referencing the file that are always removed together
+        @param kind: Whether the file is uploaded as a blob or a document
+        @param path: The path to the file on the local filesystem
+        @param content_hash: A hash of what is uploaded for the file
+        @param upload: Uploads the file, returning the id it was stored with
+        """
+        key = f"{normalize_address(owner)}|{kind}:{Path(path).resolve()}:{content_hash}"
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if global_id := self.ids.get(key):
+                return global_id
+            global_id = self.persisted_ids.pop(key, None)
+            if not global_id or not self._exists(kind, global_id):
+                global_id = upload()
+            with self._lock:
+                self.ids[key] = global_id
+            return global_id
+
+    def _exists(self, kind: GlobalFileKind, global_id: str) -> bool:
+        try:
+            if kind == "document":
+                return bool(dmss_api.document_check(f"{self.data_source}/${global_id}"))
+            # Only the status is needed, so the connection is closed without downloading the blob
+            dmss_api.blob_get_by_id(self.data_source, global_id, _preload_content=False).close()
+            return True
+        except NotFoundException:
+            return False
+
+    def forget(self, removed: str) -> None:
+        """Forget the files of owners that may have been removed with the document at the address 'removed'"""
+        with self._lock:
+            for ids in (self.ids, self.persisted_ids):
+                for key in [key for key in ids if _may_own(key.split("|", 1)[0], removed)]:
+                    del ids[key]
+        self.save()
+
+    def save(self) -> None:
+        if not self.persist:
+            return
+        with self._lock:
+            write_json_file(self._file_path(), {**self.persisted_ids, **self.ids})
+
+
+def _may_own(owner: str, removed: str) -> bool:
+    """Whether 'owner' is in the same root package as 'removed', or it is not known from an address by id"""
+    owner_data_source, _, owner_path = owner.partition("/")
+    removed_data_source, _, removed_path = removed.partition("/")
+    if owner_data_source != removed_data_source:
+        return False
+    if not removed_path or removed_path.startswith("$") or owner_path.startswith("$"):
+        return True
+    return owner_path.split("/", 1)[0] == removed_path.split("/", 1)[0]
+
+
+def invalidate_after_request(method: str, url: str, status: int) -> None:
+    """
+    Forget the global files that may have been removed by a request to DMSS. Failed removals may have been partial,
+    so they are treated the same.
+    """
+    if method != "DELETE":
+        return
+    path = unquote(urlsplit(url).path)
+    if "/api/" not in path:
+        return
+    endpoint, _, address = path[path.index("/api/") + len("/api/") :].partition("/")
+    if endpoint not in ("documents", "data-sources"):
+        return
+    removed = normalize_address(address)
+    GlobalFileCache.open(removed.split("/", 1)[0], persist=state.reuse_global_files).forget(removed)
+
+
+def _invalidate_after_requests_of(api) -> None:
+    get_transport(api.api_client).hooks.append(
+        lambda record: invalidate_after_request(record.method, record.url, record.status)
+    )
+
+
+dmss_api.on_create(_invalidate_after_requests_of)
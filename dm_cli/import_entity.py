@@ -1,43 +1,29 @@
-import io
-import json
 from json import JSONDecodeError
 from pathlib import Path
-from zipfile import ZipFile
 
-from requests import Response
 from rich import print
-from tenacity import (
-    retry,
-    retry_if_exception_type,
-    retry_if_not_exception_type,
-    retry_if_not_result,
-    stop_after_attempt,
-    wait_random_exponential,
-)
 
+from . import response_cache
 from .dmss import ApplicationException, dmss_api
-from .dmss_api.exceptions import ApiException, NotFoundException, ServiceException
+from .dmss_api.exceptions import ApiException, NotFoundException
+from .domain import Package
+from .import_journal import ImportJournal
 from .import_package import import_package_tree
-from .package_tree_from_zip import package_tree_from_zip
+from .package_tree_from_folder import package_tree_from_folder
+from .preflight import check_package_references
 from .state import state
-from .utils.reference import replace_relative_references
+from .utils import codec
+from .utils.reference import ReferenceResolver
 from .utils.utils import (
     concat_dependencies,
     console,
     destination_is_root,
     ensure_package_structure,
 )
-from .utils.zip import zip_all
 
 
-@retry(
-    wait=wait_random_exponential(multiplier=1, max=60),
-    stop=stop_after_attempt(5),
-    reraise=True,
-    retry=retry_if_exception_type(ServiceException),
-)
 def import_document(source_path: Path, destination: str, document: dict):
-    remote_dependencies = dmss_api.export_meta(destination)
+    remote_dependencies = response_cache.export_meta(destination)
     old_dependencies = {dependency["alias"]: dependency for dependency in remote_dependencies.get("dependencies", [])}
 
     dependencies = concat_dependencies(
@@ -47,9 +33,9 @@ def import_document(source_path: Path, destination: str, document: dict):
     )
 
     # Replace references
-    prepared_document = replace_relative_references(document, dependencies, destination)
+    prepared_document = ReferenceResolver(dependencies, destination).replace_relative_references(document)
 
-    document_json_str = json.dumps(prepared_document)
+    document_json_str = codec.dumps(prepared_document)
     dmss_api.document_add(
         destination,
         document_json_str,
@@ -64,7 +50,7 @@ def import_single_entity(source_path: Path, destination: str, validate: bool = F
     try:  # Load the JSON document
         with open(source_path, "r") as fh:
             if Path(source_path).suffix == ".json":
-                content = json.load(fh)
+                content = codec.load(fh)
                 if validate:
                     print(f"Validating {source_path}", end="")
                     dmss_api.validate_entity(content)
@@ -83,46 +69,53 @@ def remove_by_path_ignore_404(target: str):
         pass
 
 
-@retry(
-    wait=wait_random_exponential(multiplier=1, max=60),
-    stop=stop_after_attempt(5),
-    reraise=True,
-    retry=retry_if_exception_type(ServiceException),
-)
 def import_folder_entity(
     source_path: Path,
     destination: str,
     raw_package_import: bool = False,
     resolve_local_ids: bool = False,
+    preflight: bool = False,
+    package: Package = None,
 ) -> dict:
+    """
+    Import a folder as a package to 'destination', replacing the package if it exists.
+
+    @param package: The package tree of the folder, if it has already been built with the ids in the import journal
+    """
     destination_path = Path(destination)
+    journal = ImportJournal.open(destination, source_path, resume=state.resume)
 
     # Check if target already exists on remote. Then delete or raise exception
     target = f"{destination}/{source_path.name}"
     exists = dmss_api.document_check(target)
-    if exists:
-        if not state.force:
-            raise ValueError(f"Failed to upload to '{target}' - It already exists.")
-        console.print(f"'{target}' already exists.  Replacing it...", style="dark_orange")
-        dmss_api.document_remove(target)
+    if exists and journal.has_progress:
+        console.print(f"Resuming the import of '{source_path}' to '{destination}'...", style="dark_orange")
+    elif journal.has_progress:
+        journal.completed.clear()  # The partially imported package has been removed since, so start over
+    elif exists and not state.force:
+        raise ValueError(f"Failed to upload to '{target}' - It already exists.")
 
     dependencies = {}
     is_root = destination_is_root(destination_path)
     if not is_root:
         ensure_package_structure(destination_path)
-        remote_dependencies = dmss_api.export_meta(f"{destination}")
+        remote_dependencies = response_cache.export_meta(f"{destination}")
         dependencies = {dependency["alias"]: dependency for dependency in remote_dependencies.get("dependencies", [])}
 
-    memory_file = io.BytesIO()
-    with ZipFile(memory_file, mode="w") as zip_file:
-        zip_all(
-            zip_file,
+    if package is None:
+        package = package_tree_from_folder(
+            destination,
             source_path,
-            write_folder=True,
+            is_root=is_root,
+            extra_dependencies=dependencies,
+            document_ids=journal.document_ids,
+            workers=state.parse_workers,
         )
-    memory_file.seek(0)
-
-    package = package_tree_from_zip(
-        destination, memory_file, is_root=is_root, extra_dependencies=dependencies, source_path=source_path
-    )
-    import_package_tree(package, destination, raw_package_import, resolve_local_ids)
+    if preflight:
+        check_package_references([(package, destination)], scopes=[f"{destination}/{package.name}"])
+    if exists and not journal.has_progress:
+        console.print(f"'{target}' already exists.  Replacing it...", style="dark_orange")
+        dmss_api.document_remove(target)
+    journal.save_ids()
+    import_package_tree(package, destination, raw_package_import, resolve_local_ids, journal=journal)
+    journal.finish()
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Set, TextIO
+
+from .utils.cache import fingerprint_tree, get_cache_dir
+
+
+class ImportJournal:
+    """
+    On-disk journal of the documents, files and packages DMSS has acknowledged during the import of a folder.
+
+    The journal records the ids given to every item in the folder, and every completed upload, so that a retry,
+    or a re-run with '--resume' after a crash, gives the items the same ids and skips the uploads already done.
+    Journals are kept per destination and source folder, and are discarded if the files in the folder have changed
+    since, or once the import has finished.
+    """
+
+    _open_journals: Dict[Path, "ImportJournal"] = {}
+    _open_journals_lock = threading.Lock()
+
+    def __init__(self, file_path: Path, source_path: Path):
+        self.file_path = file_path
+        self.source_path = Path(source_path)
+        self.document_ids: Dict[str, str] = {}
+        self.completed: Set[str] = set()
+        self._lock = threading.Lock()
+        self._file: Optional[TextIO] = None  # Kept open for appending records, once the first one is written
+
+    @classmethod
+    def open(cls, destination: str, source_path: Path, resume: bool) -> "ImportJournal":
+        """
+        Open the journal for importing 'source_path' to 'destination'.
+
+        The journal is shared by all attempts within this process. A journal left behind by an earlier run
+        is continued if 'resume' is True and the files in 'source_path' are the same, and discarded otherwise.
+        Files are compared by their path, size and modification time, so their content is not read.
+        """
+        source_key = hashlib.sha256(f"{destination}:{Path(source_path).resolve()}".encode()).hexdigest()[:16]
+        file_path = get_cache_dir("journals") / f"{Path(source_path).name}-{source_key}.jsonl"
+        with cls._open_journals_lock:
+            if file_path not in cls._open_journals:
+                journal = cls(file_path, source_path)
+                if not (resume and journal._load()):
+                    file_path.unlink(missing_ok=True)
+                cls._open_journals[file_path] = journal
+            return cls._open_journals[file_path]
+
+    def _load(self) -> bool:
+        """Load the journal left behind by an earlier run, returning False if there is none for the same files"""
+        if not self.file_path.is_file():
+            return False
+        with open(self.file_path) as file:
+            if json.loads(file.readline() or "{}").get("source") != fingerprint_tree(self.source_path):
+                return False
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:  # The last line may be incomplete if the process was killed
+                    continue
+                self.document_ids.update(record.get("ids", {}))
+                if "done" in record:
+                    self.completed.add(record["done"])
+        return True
+
+    def _write(self, record: dict) -> None:
+        with self._lock:
+            if self._file is None:
+                is_new = not self.file_path.is_file()
+                self._file = open(self.file_path, "a", buffering=1)  # Line buffered, so every record is written
+                if is_new:
+                    self._file.write(json.dumps({"source": fingerprint_tree(self.source_path)}) + "\n")
+            self._file.write(json.dumps(record) + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @property
+    def has_progress(self) -> bool:
+        return bool(self.completed)
+
+    def save_ids(self) -> None:
+        """Persist the ids in 'document_ids', so that a resumed import gives documents the same ids"""
+        self._write({"ids": self.document_ids})
+
+    def mark_done(self, document_id: str) -> None:
+        self._write({"done": document_id})
+        with self._lock:
+            self.completed.add(document_id)
+
+    def finish(self) -> None:
+        """Discard the journal of an import that has finished, so a later run imports the folder again"""
+        with self._open_journals_lock:
+            self._open_journals.pop(self.file_path, None)
+        self.close()
+        with self._lock:
+            self.file_path.unlink(missing_ok=True)
+            self.completed.clear()
@@ -1,120 +1,189 @@
 import io
-import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from json import JSONDecodeError
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, List, Set, Union
 from uuid import uuid4
 
 from rich.console import Console
-from tenacity import (
-    retry,
-    retry_if_exception_type,
-    retry_if_not_exception_type,
-    stop_after_attempt,
-    wait_random_exponential,
-)
 from tqdm import tqdm
 
-from .dmss import ApplicationException, dmss_api
+from .dmss import ApplicationException, blob_upload, dmss_api, file_upload
 from .dmss_api.exceptions import ServiceException
-from .domain import Dependency, File, Package
+from .domain import Dependency, File, LazyFile, Package
+from .global_files import GlobalFileCache
+from .import_journal import ImportJournal
+from .profiler import phase
+from .state import state
+from .utils import codec
+from .utils.cache import hash_json
 from .utils.reference import replace_relative_references
-from .utils.resolve_local_ids import resolve_local_ids_in_document
-from .utils.utils import concat_dependencies, replace_global_addresses
+from .utils.utils import concat_dependencies, prepare_document_for_upload
 
 console = Console()
 
 
-def add_object_to_package(path: Path, package: Package, object: io.BytesIO) -> None:
-    if len(path.parts) == 1:  # End of path means the actual document
-        file = File(
-            uid=str(uuid4()),  # This UID will be the data source ID for this file
-            name=object.name,
-            content=object,
-            path=path,
-        )
-        package.content.append(file)
-        return
-    items = [item for item in package.content if not isinstance(item, File)]
-    sub_folder = next((p for p in items if p["name"] == path.parts[0]), None)
-    if not sub_folder:  # If the sub folder has not already been created on parent, create it
-        sub_folder = Package(name=path.parts[0], parent=package)
-        package.content.append(sub_folder)
+def _get_parent_package(path: Path, package: Package) -> Package:
+    """Step down through the folders in 'path', creating any sub folder that has not already been created"""
+    for folder_name in path.parts[:-1]:
+        package = package.get_or_create_sub_package(folder_name)
+    return package
 
-    new_path = str(path).split("/", 1)[1]  # Remove first element in path before stepping down
-    return add_object_to_package(Path(new_path), sub_folder, object)
+
+def add_object_to_package(path: Path, package: Package, object: io.BytesIO) -> None:
+    file = File(
+        uid=str(uuid4()),  # This UID will be the data source ID for this file
+        name=object.name,
+        content=object,
+        path=Path(path.name),
+    )
+    _get_parent_package(path, package).content.append(file)
 
 
 def add_file_to_package(path: Path, package: Package, document: dict) -> None:
-    if len(path.parts) == 1:  # End of path means the actual document
-        if path.name.endswith("package.json"):
-            # if document is a package.json file, add meta info to package instead of adding it to content list.
-            package.meta = document.get("_meta_", {})
-            return
-        # Create a UUID if the document does not have one
-        package.content.append({**document, "_id": document.get("_id", str(uuid4()))})
+    package = _get_parent_package(path, package)
+    if path.name.endswith("package.json"):
+        # if document is a package.json file, add meta info to package instead of adding it to content list.
+        package.meta = document.get("_meta_", {})
         return
-    items = [item for item in package.content if not isinstance(item, File)]
-    sub_folder = next((p for p in items if p["name"] == path.parts[0]), None)
-    if not sub_folder:  # If the sub folder has not already been created on parent, create it
-        sub_folder = Package(name=path.parts[0], parent=package)
-        package.content.append(sub_folder)
-
-    new_path = str(path).split("/", 1)[1]  # Remove first element in path before stepping down
-    return add_file_to_package(Path(new_path), sub_folder, document)
+    # Create a UUID if the document does not have one
+    package.content.append({**document, "_id": document.get("_id", str(uuid4()))})
 
 
 def add_package_to_package(path: Path, package: Package) -> None:
-    if len(path.parts) == 1:
-        package.content.append(Package(name=path.parts[0], parent=package))
+    _get_parent_package(path, package).get_or_create_sub_package(path.name)
+
+
+def _item_id(item: Union[File, Package, dict]) -> str:
+    if isinstance(item, File):
+        return item.uid
+    if isinstance(item, Package):
+        return str(item.uid)
+    return item["_id"]
+
+
+def _describe(item: Union[File, Package, dict]) -> str:
+    if isinstance(item, File):
+        return str(item.path)
+    if isinstance(item, Package):
+        return item.path()
+    return item.get("name", item.get("_id", ""))
+
+
+def upload_concurrently(items: List, upload: Callable, desc: str, on_uploaded: Callable = None) -> None:
+    """
+    Calls 'upload' for every item on a bounded pool of worker threads, advancing a progress bar as uploads complete.
+
+    Every item is attempted, and failures are collected and raised together when the whole phase has finished.
+    If any of the failures are a ServiceException, that exception is re-raised, as DMSS failed even though the
+    requests to it were retried.
+
+    @param items: The files, entities, or packages to upload
+    @param upload: A function uploading a single item
+    @param desc: Description shown on the progress bar
+    @param on_uploaded: Called with every item that was uploaded successfully
+    """
+    if not items:
+        return
+    failures = []
+    with tqdm(total=len(items), desc=desc) as bar, ThreadPoolExecutor(max_workers=state.upload_workers) as executor:
+        futures = {executor.submit(upload, item): item for item in items}
+        for future in as_completed(futures):
+            if error := future.exception():
+                failures.append((futures[future], error))
+            elif on_uploaded:
+                on_uploaded(futures[future])
+            bar.update()
+    if not failures:
         return
-    items = [item for item in package.content if not isinstance(item, File)]
-    sub_folder = next((p for p in items if p["name"] == path.parts[0]), None)
-    if not sub_folder:  # If the sub folder has not already been created on parent, create it
-        sub_folder = Package(name=path.parts[0], parent=package)
-        package.content.append(sub_folder)
 
-    new_path = str(path).split("/", 1)[1]  # Remove first element in path before stepping down
-    return add_package_to_package(Path(new_path), sub_folder)
+    for item, error in failures:
+        console.print(f"Failed to upload '{_describe(item)}': {error}", style="red1")
+    service_exception = next((error for _, error in failures if isinstance(error, ServiceException)), None)
+    if service_exception:
+        raise service_exception
+    if len(failures) == 1:
+        raise failures[0][1]
+    raise ApplicationException(
+        message=f"{len(failures)} of {len(items)} uploads failed ({desc.strip()})",
+        data={"failures": [{"item": _describe(item), "error": str(error)} for item, error in failures]},
+    )
 
 
-def import_package_tree(package: Package, destination: str, raw_package_import: bool, resolve_local_ids: bool) -> None:
+def import_package_tree(
+    package: Package,
+    destination: str,
+    raw_package_import: bool,
+    resolve_local_ids: bool,
+    journal: Union[ImportJournal, None] = None,
+) -> None:
     destination_parts = destination.split("/")
     data_source = destination_parts[0]
 
-    if raw_package_import:
-        dmss_api.document_add_simple(data_source, body=package.to_dict())
-    else:
-        dmss_api.document_add(
-            destination,
-            json.dumps(package.to_dict()),
-            files=[],
-        )
+    if not journal or str(package.uid) not in journal.completed:
+        if raw_package_import:
+            dmss_api.document_add_simple(data_source, body=package.to_dict())
+        else:
+            dmss_api.document_add(
+                destination,
+                codec.dumps(package.to_dict()),
+                files=[],
+            )
+        if journal:
+            journal.mark_done(str(package.uid))
+
+    import_package_content(package, data_source, destination, resolve_local_ids, journal=journal)
+
 
-    import_package_content(package, data_source, destination, resolve_local_ids)
+def import_package_content(
+    package: Package,
+    data_source: str,
+    destination: str,
+    resolve_local_ids: bool,
+    only_ids: Union[Set[str], None] = None,
+    journal: Union[ImportJournal, None] = None,
+    share_global_files: Union[bool, None] = None,
+) -> None:
+    """
+    Uploads the files, entities and sub packages in a Package tree. The package itself must already be uploaded.
 
+    @param only_ids: If given, only the files, entities and packages with these ids are uploaded
+    @param journal: If given, uploads already completed in the journal are skipped, and new ones are recorded
+    @param share_global_files: Whether entities share the uploads of global files they reference. Defaults to
+        '--share-global-files', as DMSS removes the global files referenced by a document when removing it
+    """
+    if share_global_files is None:
+        share_global_files = state.share_global_files
+
+    def pending(items: List) -> List:
+        return [
+            item
+            for item in items
+            if (only_ids is None or _item_id(item) in only_ids)
+            and not (journal and _item_id(item) in journal.completed)
+        ]
+
+    def record(item) -> None:
+        if journal:
+            journal.mark_done(_item_id(item))
 
-@retry(
-    wait=wait_random_exponential(multiplier=1, max=60),
-    stop=stop_after_attempt(5),
-    reraise=True,
-    retry=retry_if_exception_type(ServiceException),
-)
-def import_package_content(package: Package, data_source: str, destination: str, resolve_local_ids: bool) -> None:
     files: List[File] = []
     entities: List[dict] = []
     package.traverse_documents(
         lambda document, **kwargs: files.append(document) if isinstance(document, File) else entities.append(document)
     )
-    uploaded_file_ids = {}
-    if len(files) > 0:
-        with tqdm(files, desc=f"  Adding files") as bar:
-            for file in files:
-                dmss_api.file_upload(data_source, json.dumps({"file_id": file.uid}), file.content)
-                uploaded_file_ids[f"dmss:/{file.content.destination}/{file.path.stem}"] = file.uid
-                bar.update()
-
-    def upload_global_file(address: str) -> str:
+    uploaded_file_ids = {f"dmss:/{file.content.destination}/{file.path.stem}": file.uid for file in files}
+    global_files = GlobalFileCache.open(data_source, persist=state.reuse_global_files)
+    with phase("file upload"):
+        upload_concurrently(
+            pending(files),
+            lambda file: file_upload(data_source, file.uid, file.content),
+            desc="  Adding files",
+            on_uploaded=record,
+        )
+
+    def upload_global_file(address: str, owner: str) -> str:
         """Handling uploading of global files."""
         filepath = Path(address)
         if not filepath.is_file():
@@ -122,17 +191,19 @@ def import_package_content(package: Package, data_source: str, destination: str,
                 f"Tried to upload file with address '{address}'. The file was not found", data=package.to_dict()
             )
         if filepath.suffix != ".json":
-            # Binary files
-            with open(address, "rb") as f:
-                file_like = io.BytesIO(f.read())
-            file_like.name = filepath.stem
-            global_id = str(uuid4())
-            dmss_api.blob_upload(data_source, global_id, file_like)
-            return global_id
+            # Binary files are streamed from disk when uploaded
+            def upload_blob() -> str:
+                global_id = str(uuid4())
+                blob_upload(
+                    data_source, global_id, LazyFile(filepath, name=filepath.stem, destination=Path(destination))
+                )
+                return global_id
+
+            return global_files.get_or_upload(owner, "blob", filepath, global_files.hash_file(filepath), upload_blob)
         else:
             try:
                 with open(address) as f:
-                    global_document = json.load(f)
+                    global_document = codec.load(f)
                 # Get dependencies from package
                 dependencies: Dict[str, Dependency] = {
                     dependency["alias"]: Dependency(**dependency)
@@ -148,26 +219,38 @@ def import_package_content(package: Package, data_source: str, destination: str,
                     destination,
                     file_path=address,
                 )
-                global_id = dmss_api.document_add_simple(data_source, global_document)
-                return global_id
+                return global_files.get_or_upload(
+                    owner,
+                    "document",
+                    filepath,
+                    hash_json(global_document),
+                    lambda: dmss_api.document_add_simple(data_source, global_document),
+                )
             except JSONDecodeError:
                 raise Exception(f"Failed to load the file '{address}' as a JSON document")
 
-    if len(entities) > 0:
-        with tqdm(entities, desc=f"  Adding entities") as bar:
-            for entity in entities:
-                document = replace_global_addresses(entity, destination, uploaded_file_ids, upload_global_file)
-                if resolve_local_ids:
-                    name = f"/{document.get('name')}" if document.get("name") else f" of type {document.get('type')}"
-                    document = resolve_local_ids_in_document(document)
-                    print(f"Successfully resolved local IDs in:\t{destination}{name}")
-                dmss_api.document_add_simple(data_source, document)
-                bar.update()
+    def upload_entity(entity: dict) -> None:
+        owner = f"{destination}/{package.name}" if share_global_files else f"{data_source}/${entity['_id']}"
+        document = prepare_document_for_upload(
+            entity, uploaded_file_ids, partial(upload_global_file, owner=owner), resolve_local_ids
+        )
+        if resolve_local_ids:
+            name = f"/{document.get('name')}" if document.get("name") else f" of type {document.get('type')}"
+            print(f"Successfully resolved local IDs in:\t{destination}{name}")
+        dmss_api.document_add_simple(data_source, document)
+
+    try:
+        with phase("entity upload"):
+            upload_concurrently(pending(entities), upload_entity, desc="  Adding entities", on_uploaded=record)
+    finally:
+        global_files.save()
 
     packages: List[Package] = []
     package.traverse_package(lambda package: packages.append(package))
-    if len(packages) > 0:
-        with tqdm(packages, desc=f"  Adding packages") as bar:
-            for package in packages:
-                dmss_api.document_add_simple(data_source, package.to_dict())
-                bar.update()
+    with phase("package upload"):
+        upload_concurrently(
+            pending(packages),
+            lambda package: dmss_api.document_add_simple(data_source, package.to_dict()),
+            desc="  Adding packages",
+            on_uploaded=record,
+        )
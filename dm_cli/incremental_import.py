@@ -0,0 +1,206 @@
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Set, Tuple, Union
+
+from rich import print
+
+from .dmss import dmss_api
+from .domain import File, LazyFile, Package
+from .enums import SIMOS
+from .import_entity import remove_by_path_ignore_404
+from .import_package import import_package_content
+from .package_tree_from_folder import package_tree_from_folder
+from .state import state
+from .utils.cache import (
+    get_cache_dir,
+    hash_file,
+    hash_json,
+    read_json_file,
+    write_json_file,
+)
+from .utils.traversal import walk
+
+
+class Manifest:
+    """
+    Record of what earlier imports uploaded to a data source, so that the next import only uploads what has changed.
+
+    Entries are keyed by the path of a document, file or package on the local filesystem, relative to the data
+    source folder (folder paths end with '/'), and hold the id it was uploaded with and a hash of its content.
+    """
+
+    def __init__(self, data_source: str, entries: Dict[str, dict] = None, resolve_local_ids: bool = False):
+        self.data_source = data_source
+        self.entries: Dict[str, dict] = entries if entries else {}
+        self.resolve_local_ids = resolve_local_ids
+        # Root packages in a data source may be imported in parallel, all recording their entries here
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _file_path(data_source: str) -> Path:
+        return get_cache_dir("manifests") / f"{data_source}.json"
+
+    @classmethod
+    def load(cls, data_source: str) -> "Manifest":
+        content = read_json_file(cls._file_path(data_source), default={})
+        return cls(data_source, content.get("entries"), content.get("resolveLocalIds", False))
+
+    def save(self) -> None:
+        with self._lock:
+            write_json_file(
+                self._file_path(self.data_source),
+                {"resolveLocalIds": self.resolve_local_ids, "entries": self.entries},
+            )
+
+    def root_packages(self) -> Set[str]:
+        return {path.split("/", 1)[0] for path in self.entries}
+
+    def entries_in(self, root_package: str) -> Dict[str, dict]:
+        return {path: entry for path, entry in self.entries.items() if path.split("/", 1)[0] == root_package}
+
+    def document_ids_in(self, root_package: str) -> Dict[str, str]:
+        """The ids the documents, files and packages in a root package were uploaded with, keyed by their path"""
+        return {path: entry["id"] for path, entry in self.entries_in(root_package).items()}
+
+    def set_entries_in(self, root_package: str, entries: Dict[str, dict]) -> None:
+        with self._lock:
+            # Replaced rather than updated in place, so that readers never see the entries change under them
+            self.entries = {
+                **{path: entry for path, entry in self.entries.items() if path.split("/", 1)[0] != root_package},
+                **entries,
+            }
+
+
+def content_hash(item: Union[Package, dict, File], file_hashes: Union[Dict[str, str], None] = None) -> str:
+    """
+    A hash of what is uploaded for a package, document or file.
+
+    The storage references of a document are only the local paths of files in the global folders, so the hashes of
+    those files are part of the hash of the document, and changing one changes every document referencing it.
+
+    @param file_hashes: Hashes of files in the global folders already computed, by their path, updated with new ones
+    """
+    if isinstance(item, Package):
+        return hash_json(item.to_dict())
+    if isinstance(item, File):
+        if isinstance(item.content, LazyFile):
+            return hash_file(item.content.path)
+        return hashlib.sha256(item.content.getvalue()).hexdigest()
+    file_hashes = {} if file_hashes is None else file_hashes
+    global_files = {}
+    for address in _storage_addresses(item):
+        if address not in file_hashes:
+            file_hashes[address] = hash_file(Path(address)) if Path(address).is_file() else None
+        global_files[address] = file_hashes[address]
+    # Documents without storage references are hashed as before
+    return hash_json([item, global_files]) if global_files else hash_json(item)
+
+
+def _storage_addresses(document: dict) -> List[str]:
+    """The addresses of the files in the global folders a document references, once references have been resolved"""
+    addresses = []
+
+    def visit(node: Union[dict, list]):
+        if isinstance(node, dict):
+            if node.get("type") == SIMOS.REFERENCE.value and node.get("referenceType") == "storage":
+                addresses.append(node.get("address"))
+            children = node.values()
+        else:
+            children = node
+        for child in children:
+            if isinstance(child, (dict, list)):
+                yield child
+
+    walk(document, visit)
+    return [address for address in addresses if isinstance(address, str)]
+
+
+def _items_by_id(package: Package) -> Dict[str, Union[Package, dict, File]]:
+    items = {str(package.uid): package}
+    package.traverse_package(lambda sub_package: items.update({str(sub_package.uid): sub_package}))
+    package.traverse_documents(
+        lambda document, **kwargs: items.update(
+            {document.uid if isinstance(document, File) else document["_id"]: document}
+        )
+    )
+    return items
+
+
+def import_root_package_incrementally(
+    source_path: Path,
+    data_source: str,
+    manifest: Manifest,
+    resolve_local_ids: bool,
+    package_tree: Union[Tuple[Package, Dict[str, str]], None] = None,
+) -> None:
+    """
+    Import a root package, only uploading the documents, files and packages that changed since the last import
+    recorded in the manifest, and removing the ones that have been deleted locally.
+
+    @param package_tree: The package tree of the root package, if it has already been built, and the ids of the
+        documents in it, built from 'Manifest.document_ids_in'
+    """
+    previous_entries = manifest.entries_in(source_path.name)
+    if package_tree:
+        package, document_ids = package_tree
+    else:
+        # Documents without an '_id' in the source keep the id they were given by the previous import
+        document_ids = manifest.document_ids_in(source_path.name)
+        package = package_tree_from_folder(
+            data_source, source_path, is_root=True, document_ids=document_ids, workers=state.parse_workers
+        )
+    items = _items_by_id(package)
+
+    if (
+        not previous_entries
+        or manifest.resolve_local_ids != resolve_local_ids
+        or not dmss_api.document_check(f"{data_source}/${package.uid}")
+    ):
+        # The data source can not be trusted to match the manifest, so the whole root package is replaced
+        remove_by_path_ignore_404(f"/{data_source}/{package.name}")
+        previous_entries = {}
+
+    file_hashes: Dict[str, str] = {}
+    entries = {
+        path: {"id": document_id, "hash": content_hash(items[document_id], file_hashes)}
+        for path, document_id in document_ids.items()
+        if document_id in items
+    }
+    changed_ids = {entry["id"] for path, entry in entries.items() if previous_entries.get(path) != entry}
+    removed_ids = {
+        entry["id"] for path, entry in previous_entries.items() if entries.get(path, {}).get("id") != entry["id"]
+    }
+    print(
+        f"Importing PACKAGE '{source_path}' --> '{data_source}' incrementally: {len(changed_ids)} changed, "
+        f"{len(removed_ids)} removed, {len(entries) - len(changed_ids)} unchanged"
+    )
+
+    # Record the ids before uploading, so that documents uploaded by an interrupted import keep their ids
+    manifest.set_entries_in(
+        source_path.name,
+        {path: {**entry, "hash": None} if entry["id"] in changed_ids else entry for path, entry in entries.items()},
+    )
+    manifest.save()
+
+    if str(package.uid) in changed_ids:
+        dmss_api.document_add_simple(data_source, body=package.to_dict())
+    # Single documents are removed below, so each has its own copy of the global files it references
+    import_package_content(
+        package, data_source, data_source, resolve_local_ids, only_ids=changed_ids, share_global_files=False
+    )
+    for removed_id in removed_ids:
+        remove_by_path_ignore_404(f"{data_source}/${removed_id}")
+
+    manifest.resolve_local_ids = resolve_local_ids
+    manifest.set_entries_in(source_path.name, entries)
+    manifest.save()
+
+
+def remove_root_package_incrementally(root_package: str, manifest: Manifest) -> None:
+    """Remove a root package that was imported earlier, but has since been deleted locally"""
+    print(f"Removing PACKAGE '{root_package}' from '{manifest.data_source}', as it no longer exists locally")
+    if root_package_entry := manifest.entries.get(f"{root_package}/"):
+        remove_by_path_ignore_404(f"{manifest.data_source}/${root_package_entry['id']}")
+    manifest.set_entries_in(root_package, {})
+    manifest.save()
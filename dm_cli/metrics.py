@@ -0,0 +1,141 @@
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from .utils import codec
+
+if TYPE_CHECKING:  # The transport imports urllib3, which is only imported once the CLI sends requests
+    from .transport import RequestRecord
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+
+@dataclass
+class EndpointMetrics:
+    requests: int = 0
+    retries: int = 0
+    failed: int = 0  # Responses with a 4xx or 5xx status, and requests without a response
+    statuses: Dict[str, int] = field(default_factory=dict)  # Status (or "none") -> count
+    seconds: float = 0.0
+    # The number of requests taking at most the bucket's upper bound, by bucket, like a Prometheus histogram
+    latency_buckets: List[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+    bytes_sent: int = 0
+    bytes_received: int = 0
+
+    def add(self, record: "RequestRecord") -> None:
+        self.requests += 1
+        self.retries += record.attempt > 1
+        self.failed += record.status is None or record.status >= 400
+        status = str(record.status).lower()
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.seconds += record.seconds
+        for index, upper_bound in enumerate(LATENCY_BUCKETS):
+            if record.seconds <= upper_bound:
+                self.latency_buckets[index] += 1
+        self.bytes_sent += record.bytes_sent
+        self.bytes_received += record.bytes_received
+
+
+class RequestMetrics:
+    """
+    Counts, latencies and bytes of the requests sent to DMSS, by endpoint. A hook for 'Transport.hooks'.
+
+    Endpoints are named by their method and path, without the addresses and ids in it (see 'endpoint_name'), so
+    that every document uploaded is counted for 'POST /api/documents'.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, EndpointMetrics] = {}
+
+    def __call__(self, record: "RequestRecord") -> None:
+        with self._lock:
+            self._endpoints.setdefault(record.endpoint, EndpointMetrics()).add(record)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "started": self.started,
+                "seconds": time.time() - self.started,
+                "latency_buckets": [str(upper_bound) for upper_bound in LATENCY_BUCKETS],
+                "endpoints": {endpoint: asdict(metrics) for endpoint, metrics in sorted(self._endpoints.items())},
+            }
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text format, like for the textfile collector of the node exporter"""
+        report = self.to_dict()
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, description: str, samples: List[Tuple[str, dict, float]]) -> None:
+            lines.append(f"# HELP dm_cli_{name} {description}")
+            lines.append(f"# TYPE dm_cli_{name} {kind}")
+            for suffix, labels, value in samples:
+                text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"dm_cli_{name}{suffix}{{{text}}} {value}")
+
+        endpoints = [(_labels(endpoint), metrics) for endpoint, metrics in report["endpoints"].items()]
+        metric(
+            "requests_total",
+            "counter",
+            "Requests sent to DMSS, including retries.",
+            [
+                ("", {**labels, "status": status}, count)
+                for labels, metrics in endpoints
+                for status, count in sorted(metrics["statuses"].items())
+            ],
+        )
+        metric(
+            "request_retries_total",
+            "counter",
+            "Requests sent to DMSS again after they failed.",
+            [("", labels, metrics["retries"]) for labels, metrics in endpoints],
+        )
+        metric(
+            "request_duration_seconds",
+            "histogram",
+            "Seconds from sending a request to DMSS until its response.",
+            [
+                sample
+                for labels, metrics in endpoints
+                for sample in (
+                    *(
+                        ("_bucket", {**labels, "le": "+Inf" if upper_bound == "inf" else upper_bound}, count)
+                        for upper_bound, count in zip(report["latency_buckets"], metrics["latency_buckets"])
+                    ),
+                    ("_sum", labels, metrics["seconds"]),
+                    ("_count", labels, metrics["requests"]),
+                )
+            ],
+        )
+        metric(
+            "request_bytes_sent_total",
+            "counter",
+            "Bytes of request bodies sent to DMSS, compressed if they were.",
+            [("", labels, metrics["bytes_sent"]) for labels, metrics in endpoints],
+        )
+        metric(
+            "response_bytes_received_total",
+            "counter",
+            "Bytes of response bodies received from DMSS, before they were decoded.",
+            [("", labels, metrics["bytes_received"]) for labels, metrics in endpoints],
+        )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path) -> None:
+        """Write the metrics as JSON to 'path', and in the Prometheus text format next to it, with '.prom' suffix"""
+        path = Path(path)
+        path.write_text(codec.dumps(self.to_dict()))
+        # Written under another name and moved, so that a collector never reads half a file
+        prometheus_path = path.with_suffix(".prom")
+        temporary_path = prometheus_path.with_name(f"{prometheus_path.name}.tmp")
+        temporary_path.write_text(self.to_prometheus())
+        temporary_path.replace(prometheus_path)
+
+
+def _labels(endpoint: str) -> dict:
+    method, _, path = endpoint.partition(" ")
+    return {"method": method, "endpoint": path}
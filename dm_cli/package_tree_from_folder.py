@@ -0,0 +1,212 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from json import JSONDecodeError
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple, Union
+from uuid import UUID, uuid4
+
+from .domain import Dependency, File, LazyFile, Package, PackageContent
+from .package_tree_from_zip import resolve_package_references
+from .profiler import phase
+from .utils import codec
+from .utils.reference import ReferenceResolver
+from .utils.utils import concat_dependencies
+
+
+@phase("package_tree_from_folder")
+def package_tree_from_folder(
+    destination: str,
+    source_path: Path,
+    is_root: bool = True,
+    extra_dependencies: Union[Dict[str, Dependency], None] = None,
+    document_ids: Union[Dict[str, str], None] = None,
+    workers: int = 1,
+) -> Package:
+    """
+    Converts a folder on the local filesystem into a DMSS Package structure.
+
+    Produces the same Package tree as zipping the folder and passing it to 'package_tree_from_zip',
+    but walks the folder once, and leaves the content of non-JSON files on disk until they are uploaded.
+
+    @param destination: A string with the documentId for the target. Only a data source is allowed
+    @param source_path: path to the root folder
+    @param is_root: Whether the folder should be imported as a root package
+    @param document_ids: Ids to give the documents, files and packages that do not have an '_id' in the source,
+        keyed by their path on the filesystem, relative to the parent of 'source_path' (folders end with '/').
+        Updated with the ids of every document, file and package in the returned tree.
+    @param workers: If more than 1, JSON documents are parsed, and their references resolved, in this many processes
+
+    @return: A Package object with sub folders(Package) and documents(dict)
+    """
+    source_path = Path(source_path)
+    folder_name = source_path.name
+
+    if document_ids is None:
+        document_ids = {}
+
+    def assign_id(path: str, source_id: Union[str, None] = None) -> str:
+        document_id = source_id or document_ids.get(path) or str(uuid4())
+        document_ids[path] = document_id
+        return document_id
+
+    package_entity = {}
+    if (source_path / "package.json").is_file():
+        package_entity = _load_json(source_path / "package.json", "package.json")
+    dependencies: Dict[str, Dependency] = {
+        dependency["alias"]: Dependency(**dependency)
+        for dependency in package_entity.get("_meta_", {}).get("dependencies", [])
+    }
+    if extra_dependencies:
+        dependencies.update(extra_dependencies)
+    root_package = Package(
+        name=package_entity.get("name", folder_name),
+        uid=UUID(assign_id(f"{folder_name}/")),
+        is_root=is_root,
+        meta=package_entity.get("_meta_"),
+    )
+
+    def add_folder(folder: Path, package: Package, relative_path: str) -> None:
+        with os.scandir(folder) as entries:
+            entries = list(entries)
+        # Sub folders are added before the files, in the same order as when the folder is zipped by 'zip_all'
+        for entry in entries:
+            if entry.is_dir():
+                sub_folder = package.get_or_create_sub_package(entry.name)
+                sub_folder.uid = UUID(assign_id(f"{folder_name}/{relative_path}{entry.name}/"))
+                add_folder(Path(entry.path), sub_folder, f"{relative_path}{entry.name}/")
+        for entry in entries:
+            if entry.is_dir() or not entry.is_file():
+                continue
+            add_file(Path(entry.path), package, f"{relative_path}{entry.name}")
+
+    # JSON documents left for the process pool, with the placeholder keeping their place in the package content
+    pending: List[Tuple[Path, Package, str, _PendingDocument]] = []
+
+    def add_file(path: Path, package: Package, filename: str) -> None:
+        nonlocal dependencies
+        if filename == "package.json":  # The root packages package.json file has already been read
+            return
+        if path.suffix != ".json":
+            package.content.append(
+                File(
+                    uid=assign_id(f"{folder_name}/{filename}"),  # This UID will be the data source ID for this file
+                    name=path.name,
+                    content=LazyFile(
+                        path, name=path.name, destination=Path(f"/{destination}/{folder_name}/{filename}").parent
+                    ),
+                    path=Path(path.name),
+                )
+            )
+            return
+        if workers > 1:
+            placeholder = _PendingDocument()
+            package.content.append(placeholder)
+            pending.append((path, package, filename, placeholder))
+            return
+        json_doc = _load_json(path, filename)
+        if path.name.endswith("package.json"):
+            # if document is a package.json file, add meta info to package instead of adding it to content list.
+            package.meta = json_doc.get("_meta_", {})
+        else:
+            # Create a UUID if the document does not have one
+            package.content.append({**json_doc, "_id": assign_id(f"{folder_name}/{filename}", json_doc.get("_id"))})
+
+        # Add dependencies from entity to the global dependencies list
+        dependencies = concat_dependencies(json_doc.get("_meta_", {}).get("dependencies", []), dependencies, filename)
+
+    add_folder(source_path, root_package, "")
+    if not pending:
+        resolve_package_references(root_package, dependencies, destination, source_path)
+        return root_package
+
+    dependencies, replacements = _load_pending_documents(
+        pending, assign_id, folder_name, dependencies, destination, source_path, workers
+    )
+    for package in {id(package): package for _, package, _, _ in pending}.values():
+        package.content = PackageContent(
+            replacements[id(child)] if isinstance(child, _PendingDocument) else child
+            for child in package.content
+            if not isinstance(child, _PendingDocument) or id(child) in replacements
+        )
+    resolve_package_references(root_package, dependencies, destination, source_path, documents=False)
+    return root_package
+
+
+def _load_pending_documents(
+    pending: List[Tuple[Path, Package, str, "_PendingDocument"]],
+    assign_id: Callable[[str, Union[str, None]], str],
+    folder_name: str,
+    dependencies: Dict[str, Dependency],
+    destination: str,
+    source_path: Path,
+    workers: int,
+) -> Tuple[Dict[str, Dependency], Dict[int, dict]]:
+    """
+    Loads the JSON documents left by 'package_tree_from_folder' in a process pool, and resolves their references.
+
+    Imports are run from worker threads, and forking a process with other threads running may deadlock on locks they
+    hold, so the processes are spawned instead.
+
+    @return: The dependencies, with those of the documents added, and the documents by the id of their placeholder
+    """
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        chunksize = max(1, len(pending) // (workers * 4))
+        # The dependencies of all documents are needed to resolve references, so documents are first only parsed.
+        # The parsed documents are sent back to the pool to be resolved, as parsing them again costs more than pickling
+        parsed_documents = executor.map(
+            _load_json,
+            [path for path, _, _, _ in pending],
+            [filename for _, _, filename, _ in pending],
+            chunksize=chunksize,
+        )
+        documents = []
+        # The documents are handled in the same order as 'add_file' would, so ids and dependencies are the same
+        for (path, package, filename, placeholder), json_doc in zip(pending, parsed_documents):
+            if path.name.endswith("package.json"):
+                # if document is a package.json file, add meta info to package instead of adding it to content list.
+                package.meta = json_doc.get("_meta_", {})
+            else:
+                # Create a UUID if the document does not have one
+                document_id = assign_id(f"{folder_name}/{filename}", json_doc.get("_id"))
+                documents.append(({**json_doc, "_id": document_id}, package.path(), placeholder))
+            dependencies = concat_dependencies(
+                json_doc.get("_meta_", {}).get("dependencies", []), dependencies, filename
+            )
+
+        resolved_documents = executor.map(
+            _resolve_json,
+            [(json_doc, file_path, dependencies, destination, source_path) for json_doc, file_path, _ in documents],
+            chunksize=chunksize,
+        )
+        return dependencies, {
+            id(placeholder): document for (*_, placeholder), document in zip(documents, resolved_documents)
+        }
+
+
+class _PendingDocument:
+    """Keeps the place of a document in the content of a package, until it has been loaded by the process pool"""
+
+    __slots__ = ()
+    name = None
+
+
+# The resolver used by a process in the pool, with the dependencies and destination it was created for
+_worker_resolver: Union[Tuple[Tuple, ReferenceResolver], None] = None
+
+
+def _resolve_json(task: Tuple) -> dict:
+    """Runs in the process pool. Replaces the relative references of a document."""
+    global _worker_resolver
+    json_doc, file_path, dependencies, destination, source_path = task
+    if _worker_resolver is None or _worker_resolver[0] != (dependencies, destination):
+        _worker_resolver = ((dependencies, destination), ReferenceResolver(dependencies, destination))
+    return _worker_resolver[1].replace_relative_references(json_doc, file_path=file_path, source_path=source_path)
+
+
+def _load_json(path: Path, filename: str) -> dict:
+    try:
+        with open(path, "rb") as file:
+            return codec.load(file)
+    except JSONDecodeError:
+        raise Exception(f"Failed to load the file '{filename}' as a JSON document")
@@ -1,5 +1,4 @@
 import io
-import json
 from json import JSONDecodeError
 from pathlib import Path
 from typing import Dict, Union
@@ -11,10 +10,13 @@ from .import_package import (
     add_object_to_package,
     add_package_to_package,
 )
-from .utils.reference import replace_relative_references
+from .profiler import phase
+from .utils import codec
+from .utils.reference import ReferenceResolver
 from .utils.utils import concat_dependencies
 
 
+@phase("package_tree_from_zip")
 def package_tree_from_zip(
     destination: str,
     zip_package: io.BytesIO,
@@ -44,7 +46,7 @@ def package_tree_from_zip(
             None,
         )
 
-        package_entity = json.loads(zip_file.read(package_file.filename)) if package_file else {}
+        package_entity = codec.loads(zip_file.read(package_file.filename)) if package_file else {}
         if package_file in zip_file.filelist:
             zip_file.filelist.remove(package_file)
         dependencies: Dict[str, Dependency] = {
@@ -73,7 +75,7 @@ def package_tree_from_zip(
                 add_object_to_package(Path(filename), root_package, file_like)
                 continue
             try:
-                json_doc = json.loads(zip_file.read(f"{folder_name}/{filename}"))
+                json_doc = codec.loads(zip_file.read(f"{folder_name}/{filename}"))
             except JSONDecodeError:
                 raise Exception(f"Failed to load the file '{filename}' as a JSON document")
 
@@ -84,37 +86,47 @@ def package_tree_from_zip(
                 json_doc.get("_meta_", {}).get("dependencies", []), dependencies, filename
             )
 
-        def replace(document, file_path):
-            if not isinstance(document, File):
-                document = replace_relative_references(
-                    document,
-                    dependencies,
-                    destination,
-                    file_path=file_path,
-                    source_path=source_path,
-                )
-            return document
-
-        # Now that we have the entire package as a Package tree, traverse it, and replace relative references
+        resolve_package_references(root_package, dependencies, destination, source_path)
+
+    return root_package
+
+
+@phase("reference replacement")
+def resolve_package_references(
+    root_package: Package,
+    dependencies: Dict[str, Dependency],
+    destination: str,
+    source_path: Path = None,
+    documents: bool = True,
+) -> None:
+    """
+    Replaces relative references with absolute ones in every document and package meta of a Package tree.
+
+    @param root_package: The root of the Package tree, with all documents added
+    @param dependencies: All dependencies collected from the documents in the tree
+    @param destination: A string with the documentId for the target
+    @param source_path: path to the root folder
+    @param documents: If False, only the package metas are resolved, as the documents already are
+    """
+
+    resolver = ReferenceResolver(dependencies, destination)
+
+    def replace(document, file_path):
+        if not isinstance(document, File):
+            document = resolver.replace_relative_references(document, file_path=file_path, source_path=source_path)
+        return document
+
+    # Now that we have the entire package as a Package tree, traverse it, and replace relative references
+    if documents:
         root_package.traverse_documents(
             lambda document, file_path: replace(document, file_path),
             update=True,
         )
-        root_package.meta = replace_relative_references(
-            root_package.meta,
-            dependencies,
-            destination,
-            file_path=root_package.path(),
-            source_path=source_path,
+    root_package.meta = resolver.replace_relative_references(
+        root_package.meta, file_path=root_package.path(), source_path=source_path
+    )
+    root_package.traverse_package(
+        lambda package: resolver.replace_relative_references(
+            package.meta, file_path=package.path(), source_path=source_path
         )
-        root_package.traverse_package(
-            lambda package: replace_relative_references(
-                package.meta,
-                dependencies,
-                destination,
-                file_path=package.path(),
-                source_path=source_path,
-            )
-        )
-
-    return root_package
+    )
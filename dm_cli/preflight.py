@@ -0,0 +1,198 @@
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Set, Tuple, Union
+
+from rich import print
+from rich.table import Table
+
+from .dmss import ApplicationException, dmss_api
+from .dmss_api.exceptions import NotFoundException
+from .domain import File, Package
+from .enums import SIMOS, ReferenceTypes
+from .profiler import phase
+from .utils.traversal import walk
+
+# Attributes of documents that hold the address of a blueprint, once references have been resolved
+REFERENCE_ATTRIBUTES = ("type", "attributeType", "enumType", "_blueprintPath_")
+# Where the last segment of an address to a document ends, and the path to an attribute within it starts
+_ATTRIBUTE_PATH = re.compile(r"[.\[(]")
+
+
+@dataclass
+class DanglingReference:
+    document: str  # The address of the document holding the reference
+    attribute: str
+    reference: str
+
+
+@dataclass
+class PreflightReport:
+    references: int = 0
+    # Addresses outside the packages being imported, and whether they exist in DMSS
+    external: Dict[str, bool] = field(default_factory=dict)
+    dangling: List[DanglingReference] = field(default_factory=list)
+
+
+class ReferenceIndex:
+    """
+    The address of every package, document and file in the package trees about to be imported.
+
+    A reference to an address within a 'scope' (a data source, or a package being replaced in full) must point to
+    something in the index, as everything in the scope is about to be replaced by what is being imported.
+    """
+
+    def __init__(self):
+        self.addresses: Set[str] = set()
+        self.scopes: Set[str] = set()
+
+    def add_package(self, package: Package, destination: str) -> None:
+        """
+        Add a package tree to the index, as it will be stored when imported to 'destination'
+
+        @param package: A root package, as built by 'package_tree_from_folder'
+        @param destination: The data source, or path to a package, the package is imported to
+        """
+        stack = [package]
+        while stack:
+            package = stack.pop()
+            package_address = f"dmss://{destination}/{package.path()}"
+            self.addresses.add(package_address)
+            for child in package.content:
+                if isinstance(child, Package):
+                    stack.append(child)
+                elif isinstance(child, File):
+                    # Files are addressed without their extension once uploaded, like in 'import_package_content'
+                    self.addresses.add(f"{package_address}/{child.path.stem}")
+                elif child.get("name"):
+                    self.addresses.add(f"{package_address}/{child['name']}")
+
+    def add_scope(self, address: str) -> None:
+        self.scopes.add(f"dmss://{address.strip('/')}")
+
+    def in_scope(self, address: str) -> bool:
+        return any(address == scope or address.startswith(f"{scope}/") for scope in self.scopes)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self.addresses
+
+
+def find_references(document: dict) -> List[Tuple[str, str]]:
+    """Find the resolved references in a document, as pairs of attribute name and address"""
+    found = []
+
+    def visit(node: Union[dict, list]):
+        if isinstance(node, dict):
+            for attribute in REFERENCE_ATTRIBUTES:
+                if isinstance(node.get(attribute), str):
+                    found.append((attribute, node[attribute]))
+            for extended in node.get("extends") or []:
+                found.append(("extends", extended))
+            if node.get("type") == SIMOS.REFERENCE.value and node.get("referenceType") == ReferenceTypes.LINK.value:
+                found.append(("address", node.get("address")))
+            children = node.values()
+        else:
+            children = node
+        for child in children:
+            if isinstance(child, (dict, list)):
+                yield child
+
+    walk(document, visit)
+    return [(attribute, reference) for attribute, reference in found if _is_path_address(reference)]
+
+
+def _is_path_address(reference) -> bool:
+    # Only addresses by path can be checked. Addresses by id ('$'), and local paths ('^' and '~') are skipped
+    return isinstance(reference, str) and reference.startswith("dmss://") and "$" not in reference
+
+
+def document_address(reference: str) -> str:
+    """
+    The address of the document a reference points to, without the path to an attribute within it.
+    Packages may have dots in their names, so only the last segment of the path is cut at an attribute path.
+    """
+    data_source, _, path = reference[len("dmss://") :].partition("/")
+    packages, separator, name = path.rpartition("/")
+    return f"dmss://{data_source}/{packages}{separator}{_ATTRIBUTE_PATH.split(name, 1)[0]}".rstrip("/")
+
+
+def _exists_in_dmss(address: str) -> bool:
+    try:
+        return bool(dmss_api.document_check(address[len("dmss://") :]))
+    except NotFoundException:
+        return False
+
+
+def check_references(
+    packages: Iterable[Tuple[Package, str]],
+    scopes: Iterable[str],
+    exists: Callable[[str], bool] = _exists_in_dmss,
+) -> PreflightReport:
+    """
+    Check that every reference in the packages points to something, before anything is uploaded.
+
+    References within the scopes are checked against an index of the packages. Other references are checked
+    against DMSS, once for every document they point to.
+
+    @param packages: Pairs of a package tree and the destination it is imported to
+    @param scopes: Addresses that will only contain what is in the packages once they are imported
+    @param exists: Checks if an address exists in DMSS
+    """
+    packages = list(packages)
+    index = ReferenceIndex()
+    for package, destination in packages:
+        index.add_package(package, destination)
+    for scope in scopes:
+        index.add_scope(scope)
+
+    report = PreflightReport()
+
+    def check_document(document: Union[dict, File], file_path: str, destination: str) -> None:
+        if not isinstance(document, dict):
+            return
+        for attribute, reference in find_references(document):
+            report.references += 1
+            address = document_address(reference)
+            if index.in_scope(address):
+                found = address in index
+            else:
+                if address not in report.external:
+                    report.external[address] = exists(address)
+                found = report.external[address]
+            if not found:
+                report.dangling.append(
+                    DanglingReference(
+                        f"dmss://{destination}/{file_path}/{document.get('name', '')}", attribute, reference
+                    )
+                )
+
+    for package, destination in packages:
+        package.traverse_documents(check_document, destination=destination)
+    return report
+
+
+def print_preflight_report(report: PreflightReport) -> None:
+    print(
+        f"Preflight: checked {report.references} references, "
+        f"pointing to {len(report.external)} documents outside the imported packages"
+    )
+    if not report.dangling:
+        return
+    table = Table(title=f"Dangling references ({len(report.dangling)})")
+    table.add_column("Document")
+    table.add_column("Attribute")
+    table.add_column("Reference")
+    for dangling in report.dangling:
+        table.add_row(dangling.document, dangling.attribute, dangling.reference)
+    print(table)
+
+
+@phase("preflight")
+def check_package_references(packages: Iterable[Tuple[Package, str]], scopes: Iterable[str]) -> None:
+    """Check the references in the packages, printing a report, and raising an exception if any of them dangle"""
+    report = check_references(packages, scopes)
+    print_preflight_report(report)
+    if report.dangling:
+        raise ApplicationException(
+            message=f"Preflight found {len(report.dangling)} dangling references. Nothing was uploaded.",
+            debug="References to packages being imported are checked against them, others against DMSS",
+        )
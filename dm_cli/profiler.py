@@ -0,0 +1,130 @@
+import cProfile
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional
+
+from rich.table import Table
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def peak_rss() -> Optional[int]:
+    """The most memory the process has had resident so far, in bytes, or None if it is not known"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Kilobytes on Linux
+
+
+def cpu_seconds() -> float:
+    """CPU time used by the process, and by the child processes that have ended, like the workers parsing JSON"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+@dataclass
+class PhaseStats:
+    calls: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss: Optional[int] = None  # The peak of the process at the end of the phase
+    rss_growth: int = 0  # How much higher the peak of the process got during the phase
+
+
+class PhaseProfiler:
+    """
+    Wall time, CPU time and peak memory of the phases of imports, like building package trees and uploading.
+
+    Phases are recorded when the profiler is enabled, and are otherwise free. A phase running inside another phase
+    of the same name in the same thread is counted as part of it, so recursive and nested calls are counted once.
+
+    The CPU time and the peak memory are those of the whole process, so for phases running at the same time in
+    different threads (like with 'dm reset --parallel'), each includes the work of the others.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._active = threading.local()
+        self._phases: Dict[str, PhaseStats] = {}
+        self._cprofile: Optional[cProfile.Profile] = None
+
+    def enable(self, cprofile: bool = False) -> None:
+        """@param cprofile: Also profile the functions called from the main thread with cProfile"""
+        self.enabled = True
+        if cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def disable(self) -> None:
+        self.enabled = False
+        if self._cprofile:
+            self._cprofile.disable()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Record the time and memory of the code run in the context, or of every call, if used as a decorator"""
+        active = self._active.__dict__.setdefault("names", set())
+        if not self.enabled or name in active:
+            yield
+            return
+        active.add(name)
+        with self._lock:
+            stats = self._phases.setdefault(name, PhaseStats())  # Phases are reported in the order they started
+        wall, cpu, rss = time.perf_counter(), cpu_seconds(), peak_rss()
+        try:
+            yield
+        finally:
+            active.discard(name)
+            wall, cpu, end_rss = time.perf_counter() - wall, cpu_seconds() - cpu, peak_rss()
+            with self._lock:
+                stats.calls += 1
+                stats.wall_seconds += wall
+                stats.cpu_seconds += cpu
+                if end_rss is not None:
+                    stats.peak_rss = max(stats.peak_rss or 0, end_rss)
+                    stats.rss_growth += end_rss - rss
+
+    def phases(self) -> Dict[str, PhaseStats]:
+        """The stats of every phase recorded, in the order they were first started"""
+        with self._lock:
+            return {name: PhaseStats(**vars(stats)) for name, stats in self._phases.items()}
+
+    def table(self) -> Table:
+        table = Table(title="Profile", caption=f"Peak memory of the process: {_megabytes(peak_rss())}")
+        for column in ("Phase", "Calls", "Wall (s)", "CPU (s)", "Peak memory", "Peak growth"):
+            table.add_column(column, justify="left" if column == "Phase" else "right")
+        for name, stats in self.phases().items():
+            table.add_row(
+                name,
+                str(stats.calls),
+                f"{stats.wall_seconds:.2f}",
+                f"{stats.cpu_seconds:.2f}",
+                _megabytes(stats.peak_rss),
+                _megabytes(stats.rss_growth if stats.peak_rss is not None else None),
+            )
+        return table
+
+    def dump_stats(self, path: str) -> None:
+        """Write the cProfile stats to 'path', to be read with 'pstats' or a viewer like snakeviz"""
+        if self._cprofile:
+            self._cprofile.dump_stats(path)
+
+
+def _megabytes(size: Optional[int]) -> str:
+    return "-" if size is None else f"{size / 1e6:.1f} MB"
+
+
+profiler = PhaseProfiler()
+
+
+def phase(name: str):
+    """Record a phase with the profiler of the CLI. See 'PhaseProfiler.phase'"""
+    return profiler.phase(name)
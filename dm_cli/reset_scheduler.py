@@ -0,0 +1,111 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import click
+from rich import print
+from rich.table import Table
+
+from .dmss import ApplicationException
+from .dmss_api.exceptions import ApiException
+
+# Returns the root packages to import in a data source, as pairs of root package name and import function
+PrepareDataSource = Callable[[], List[Tuple[str, Callable[[], None]]]]
+
+
+@dataclass
+class ResetStep:
+    data_source: str
+    # The name of the root package, or None for preparing the data source (definition and removal of old packages)
+    root_package: Optional[str] = None
+    seconds: float = 0.0
+    error: Optional[Exception] = None
+
+
+def _run_step(step: ResetStep, function: Callable):
+    start = time.perf_counter()
+    try:
+        return function()
+    except Exception as error:
+        step.error = error
+    finally:
+        step.seconds = time.perf_counter() - start
+
+
+def describe_error(error: Exception) -> str:
+    if isinstance(error, ApplicationException):
+        return error.message
+    if isinstance(error, ApiException):
+        description = f"{error.status} {error.reason}"
+        return f"{description}: {_error_message(error.body)}" if error.body else description
+    if isinstance(error, click.exceptions.Exit):
+        return "see error above"
+    return f"{type(error).__name__}: {error}"
+
+
+def _error_message(body) -> str:
+    """The message of an error response from DMSS, or the whole body if it is not a DMSS error"""
+    try:
+        error = json.loads(body)
+    except (TypeError, ValueError):
+        return str(body)
+    return str(error.get("message") or error) if isinstance(error, dict) else str(error)
+
+
+class ResetScheduler:
+    """
+    Reset data sources concurrently.
+
+    Every data source is first prepared, and as soon as it is, its root packages are queued for import.
+    Preparations and imports for all data sources share one pool of workers, so no more than 'max_parallel'
+    of them run at the same time. A failure in one data source does not stop the others.
+    """
+
+    def __init__(self, max_parallel: int = 1):
+        self.max_parallel = max_parallel
+
+    def run(self, data_sources: Dict[str, PrepareDataSource]) -> List[ResetStep]:
+        """
+        @param data_sources: The function preparing each data source, by the name of the data source.
+        @return: The steps that were run, ordered by data source.
+        """
+        steps: List[ResetStep] = []
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            preparations = {}
+            for data_source, prepare in data_sources.items():
+                step = ResetStep(data_source)
+                steps.append(step)
+                preparations[executor.submit(_run_step, step, prepare)] = step
+
+            imports = []
+            for future in as_completed(preparations):
+                prepared = preparations[future]
+                for root_package, import_root_package in future.result() or []:
+                    step = ResetStep(prepared.data_source, root_package)
+                    steps.append(step)
+                    imports.append(executor.submit(_run_step, step, import_root_package))
+            for future in imports:
+                future.result()
+
+        data_source_order = list(data_sources)
+        return sorted(
+            steps, key=lambda step: (data_source_order.index(step.data_source), step.root_package is not None)
+        )
+
+
+def print_reset_summary(steps: List[ResetStep], seconds: float, caption: str = None) -> None:
+    table = Table(title=f"Reset summary ({seconds:.1f}s)", caption=caption)
+    table.add_column("Data source")
+    table.add_column("Step")
+    table.add_column("Time", justify="right")
+    table.add_column("Result")
+    for step in steps:
+        table.add_row(
+            step.data_source,
+            step.root_package or "(prepare)",
+            f"{step.seconds:.1f}s",
+            f"[red]{describe_error(step.error)}[/red]" if step.error else "[green]OK[/green]",
+        )
+    print(table)
@@ -0,0 +1,124 @@
+import threading
+import time
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+from urllib.parse import unquote, urlsplit
+
+from .dmss import dmss_api
+from .state import state
+from .transport import get_transport
+from .utils.cache import get_cache_dir, read_json_file, write_json_file
+
+
+def normalize_address(address: str) -> str:
+    return address.split("://", 1)[-1].strip("/")
+
+
+class ResponseCache:
+    """
+    Responses from one DMSS endpoint, keyed by the address they are about, and kept between runs for 'ttl' seconds.
+
+    Entries are removed when the CLI writes to an address they are about (see 'invalidate_after_request'), so they
+    only go stale through changes made by others, and only for as long as 'ttl'.
+    """
+
+    def __init__(self, name: str, ttl: float):
+        self.name = name
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List] = None  # Address -> [expiry time, response]
+
+    def _file_path(self) -> Path:
+        return get_cache_dir("responses") / f"{self.name}.json"
+
+    def _load(self) -> Dict[str, List]:
+        if self._entries is None:
+            now = time.time()
+            entries = read_json_file(self._file_path(), default={})
+            self._entries = {address: entry for address, entry in entries.items() if entry[0] > now}
+        return self._entries
+
+    def get(self, address: str, fetch: Callable[[], Any]) -> Any:
+        """Get the cached response for 'address', calling 'fetch' to get it from DMSS if there is none"""
+        if self.ttl <= 0:
+            return fetch()
+        address = normalize_address(address)
+        with self._lock:
+            entry = self._load().get(address)
+            if entry and entry[0] > time.time():
+                return entry[1]
+        response = fetch()
+        with self._lock:
+            self._load()[address] = [time.time() + self.ttl, response]
+            write_json_file(self._file_path(), self._entries)
+        return response
+
+    def invalidate(self, matches: Callable[[str], bool]) -> None:
+        """Remove the entries for addresses that 'matches' returns True for"""
+        with self._lock:
+            entries = self._load()
+            stale = [address for address in entries if matches(address)]
+            if stale:
+                for address in stale:
+                    del entries[address]
+                write_json_file(self._file_path(), entries)
+
+
+CACHED_ENDPOINTS = ("export-meta",)
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(name: str) -> ResponseCache:
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = ResponseCache(name, state.cache_ttl)
+        return _caches[name]
+
+
+def export_meta(address: str) -> dict:
+    return get_response_cache("export-meta").get(address, lambda: dmss_api.export_meta(address))
+
+
+def _is_stale(cached: str, address: str, scope: str) -> bool:
+    if scope == "data source":
+        return cached.split("/", 1)[0] == address.split("/", 1)[0]
+    return cached.startswith(f"{address}/") or (scope == "address" and cached == address)
+
+
+def invalidate_after_request(method: str, url: str, status: int) -> None:
+    """
+    Remove cached responses about the addresses a request to DMSS wrote to. Failed writes may have been partial, so
+    they invalidate the same responses.
+
+    Adding a document to a package does not change the package's meta, so only responses about addresses below the
+    package are removed. Writes by id or to a whole data source remove every response about the data source.
+    Nothing is removed when caching is turned off with '--cache-ttl 0'.
+    """
+    if state.cache_ttl <= 0 or method not in ("POST", "PUT", "DELETE", "PATCH"):
+        return
+    path = unquote(urlsplit(url).path)
+    if "/api/" not in path:
+        return
+    endpoint, _, address = path[path.index("/api/") + len("/api/") :].partition("/")
+    if endpoint == "documents" and method == "POST":
+        scope = "below"
+    elif endpoint == "documents" and method == "DELETE":
+        scope = "address"
+    elif endpoint in ("documents", "documents-add-raw", "data-sources"):
+        scope = "data source"
+    else:
+        return
+    # Also caches not used in this run, as their entries are kept for later runs
+    for name in CACHED_ENDPOINTS:
+        get_response_cache(name).invalidate(partial(_is_stale, address=normalize_address(address), scope=scope))
+
+
+def _invalidate_after_requests_of(api) -> None:
+    get_transport(api.api_client).hooks.append(
+        lambda record: invalidate_after_request(record.method, record.url, record.status)
+    )
+
+
+dmss_api.on_create(_invalidate_after_requests_of)
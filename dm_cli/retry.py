@@ -0,0 +1,83 @@
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+def is_retryable(status: Optional[int]) -> bool:
+    """Server errors, 429 Too Many Requests, and requests without a response (None) may succeed when retried"""
+    return status is None or status == 429 or status >= 500
+
+
+@dataclass
+class RetryStats:
+    budget: int
+    spent: int = 0
+    exhausted: int = 0  # Failed requests not retried because the budget was spent
+    by_endpoint: Dict[str, int] = field(default_factory=dict)
+
+    def __str__(self):
+        text = (
+            f"Retried requests to DMSS {self.spent} times ({self.budget - self.spent} of {self.budget} retries left)"
+        )
+        if self.by_endpoint:
+            text += ": " + ", ".join(f"{endpoint} {count}" for endpoint, count in sorted(self.by_endpoint.items()))
+        if self.exhausted:
+            text += f". {self.exhausted} failed requests were not retried, as the budget was spent"
+        return text
+
+
+class RetryBudget:
+    """
+    The retries of requests to DMSS left in a run, shared by every request sent in the process.
+
+    Requests failing with a server error, a 429 Too Many Requests, or without a response, are retried on their own,
+    up to 'max_attempts' times, after a random delay growing exponentially from 'base_delay' up to 'max_delay'.
+    Once 'budget' retries have been spent, failed requests are not retried, so a DMSS that keeps failing stops a run
+    in seconds instead of retrying every request of it.
+
+    @param budget: The number of retries for all requests together
+    @param max_attempts: The number of times a single request is sent at most, including the first
+    @param base_delay: Seconds to wait at most before the first retry
+    @param max_delay: Seconds to wait at most before any retry
+    """
+
+    def __init__(self, budget: int = 50, max_attempts: int = 5, base_delay: float = 0.5, max_delay: float = 10.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._stats = RetryStats(budget)
+
+    def stats(self) -> RetryStats:
+        with self._lock:
+            return RetryStats(
+                self._stats.budget, self._stats.spent, self._stats.exhausted, dict(self._stats.by_endpoint)
+            )
+
+    def take(self, endpoint: str, attempt: int) -> bool:
+        """
+        Take a retry from the budget for a request that failed, if it may be retried.
+
+        @param endpoint: The endpoint of the request, for the stats
+        @param attempt: The number of times the request has been sent
+        """
+        if attempt >= self.max_attempts:
+            return False
+        with self._lock:
+            if self._stats.spent >= self._stats.budget:
+                self._stats.exhausted += 1
+                return False
+            self._stats.spent += 1
+            self._stats.by_endpoint[endpoint] = self._stats.by_endpoint.get(endpoint, 0) + 1
+            return True
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Seconds to wait before sending a request again, after it has been sent 'attempt' times.
+        A 'Retry-After' from DMSS is respected, up to 'max_delay'.
+        """
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), self.max_delay)
+        # "Full jitter", so requests failing together are not retried together
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
@@ -7,6 +8,19 @@ class State:
     token: str = "no-token"
     dmss_url: str = "http://localhost:5000"
     debug: bool = False
+    concurrency: int = 4
+    resume: bool = False
+    reuse_global_files: bool = False
+    share_global_files: bool = False
+    parse_workers: int = 1
+    preflight: bool = False
+    cache_ttl: float = 300.0
+    max_concurrency: Optional[int] = None
+
+    @property
+    def upload_workers(self) -> int:
+        """Threads sending requests per import. With 'max_concurrency', a limiter decides how many are in flight"""
+        return self.max_concurrency or self.concurrency
 
 
 state = State()
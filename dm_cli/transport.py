@@ -0,0 +1,296 @@
+import gzip
+import logging
+import socket
+import threading
+import time
+import weakref
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import Callable, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import urllib3
+from urllib3 import HTTPHeaderDict
+from urllib3.connection import HTTPConnection
+from urllib3.util import Retry, make_headers
+
+from .concurrency import AdaptiveLimiter
+from .dmss_api import ApiClient
+from .dmss_api.rest import RESTResponse
+from .retry import RetryBudget, is_retryable
+
+logger = logging.getLogger(__name__)
+
+# The encodings of responses urllib3 can decode
+ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]
+# urllib3 retries connecting and redirects, the retry budget of the transport retries failed requests
+URLLIB3_RETRIES = Retry(total=3, respect_retry_after_header=False)
+
+
+@dataclass
+class ConnectionStats:
+    requests: int = 0
+    connections: int = 0  # Opened, including the TLS handshake for https
+    # Bodies of requests and responses, as sent over the connections, and before compression or after decoding
+    bytes_sent: int = 0
+    bytes_sent_uncompressed: int = 0
+    bytes_received: int = 0
+    bytes_received_decoded: int = 0
+
+    @property
+    def reused(self) -> int:
+        """The number of requests sent over a connection that was already open"""
+        return max(self.requests - self.connections, 0)
+
+    def __str__(self):
+        return (
+            f"{self.requests} requests to DMSS over {self.connections} connections ({self.reused} reused). "
+            f"Sent {_megabytes(self.bytes_sent)} ({_megabytes(self.bytes_sent_uncompressed)} uncompressed), "
+            f"received {_megabytes(self.bytes_received)} ({_megabytes(self.bytes_received_decoded)} decoded)"
+        )
+
+
+@dataclass
+class RequestRecord:
+    method: str
+    url: str
+    endpoint: str  # See 'endpoint_name'
+    status: Optional[int]  # None if there was no response
+    seconds: float  # From sending the request until the response (or failure), not counting waiting for the limiter
+    attempt: int  # 1 for the first time the request was sent, 2 for the first retry, and so on
+    # Bodies as sent over the connection. Responses not read in full by the transport are not counted
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    bytes_received_decoded: int = 0
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / 1e6:.1f} MB"
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """The method and endpoint of a request, without the addresses and ids in its path, like 'POST /api/documents'"""
+    base_path, api, resource_path = urlsplit(url).path.partition("/api/")
+    return f"{method} {base_path}{api}{resource_path.split('/', 1)[0]}"
+
+
+def _retry_after(response) -> Optional[float]:
+    try:
+        return float(response.headers["Retry-After"])
+    except (AttributeError, KeyError, TypeError, ValueError):  # No response or header, or an HTTP date
+        return None
+
+
+def _body_size(body) -> int:
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    try:
+        return len(body)
+    except TypeError:  # A stream of unknown size
+        return 0
+
+
+class Transport:
+    """
+    The connections to DMSS of an api client, shared by the generated api, streamed uploads and exports.
+
+    Connections are kept alive and reused by every request to DMSS, so concurrent imports do not open a connection
+    per request. The pool is sized to the number of requests in flight, unless it is limited with 'configure'.
+
+    Compressed responses are accepted, and decoded by urllib3. Request bodies are only compressed for endpoints
+    given to 'configure', as DMSS only accepts compressed bodies when deployed behind a proxy that decodes them.
+
+    If a 'limiter' is set, requests wait for it before they are sent, however many threads are sending them.
+    If a 'retry_budget' is set, requests that fail with a server error or without a response are retried on their own.
+    Every request sent is passed to the 'hooks' as a RequestRecord, like for metrics (see 'RequestMetrics').
+    """
+
+    def __init__(self, api_client: ApiClient):
+        self.api_client = api_client
+        self.max_connections: Optional[int] = None
+        self.compress_endpoints: Tuple[str, ...] = ()
+        self.compress_min_size = 1024
+        self._closed_pools = ConnectionStats()  # Counts from pools that have been replaced
+        self._transferred = ConnectionStats()  # Counts of bytes sent and received
+        self._lock = threading.Lock()
+        # Called with a record of every request sent, including retries and requests that got no response
+        self.hooks: List[Callable[[RequestRecord], None]] = []
+        self.limiter: Optional[AdaptiveLimiter] = None
+        self.retry_budget: Optional[RetryBudget] = None
+        self.timeout: Optional[urllib3.Timeout] = None
+        # Every request, whether sent by the generated api or through 'request', goes through 'urlopen'
+        self.pool_manager.urlopen = partial(self._urlopen, self.pool_manager.urlopen)
+        pool_kwargs = self.pool_manager.connection_pool_kw
+        # Detect connections dropped by firewalls and load balancers while idle between requests
+        pool_kwargs.setdefault("socket_options", [*HTTPConnection.default_socket_options])
+        if (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) not in pool_kwargs["socket_options"]:
+            pool_kwargs["socket_options"].append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+
+    @property
+    def pool_manager(self) -> urllib3.PoolManager:
+        return self.api_client.rest_client.pool_manager
+
+    def configure(
+        self,
+        max_connections: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        compress_endpoints: Iterable[str] = (),
+        compress_min_size: int = 1024,
+    ) -> None:
+        """
+        @param max_connections: The maximum number of connections to DMSS. Requests wait for a free connection once
+            they are all in use. If None, the pool grows with the number of requests in flight
+        @param connect_timeout: Seconds to wait for a connection to DMSS to open
+        @param read_timeout: Seconds to wait for DMSS to send (some of) a response
+        @param compress_endpoints: The paths of the endpoints (or the start of them) to send request bodies to
+            compressed with gzip, if they are at least 'compress_min_size' bytes
+        """
+        with self._lock:
+            self.max_connections = max_connections
+            self.compress_endpoints = tuple(compress_endpoints)
+            self.compress_min_size = compress_min_size
+            pool_kwargs = self.pool_manager.connection_pool_kw
+            self.timeout = urllib3.Timeout(connect=connect_timeout, read=read_timeout)
+            pool_kwargs["timeout"] = self.timeout
+            pool_kwargs["block"] = max_connections is not None
+            if max_connections is not None:
+                pool_kwargs["maxsize"] = max_connections
+            self._replace_pools()
+
+    def ensure_pool_size(self, size: int) -> None:
+        """Grow the connection pool, so that 'size' requests can be in flight at once, unless it has been limited"""
+        with self._lock:
+            pool_kwargs = self.pool_manager.connection_pool_kw
+            if self.max_connections is None and size > pool_kwargs.get("maxsize", 1):
+                pool_kwargs["maxsize"] = size
+                self.api_client.configuration.connection_pool_maxsize = size
+                self._replace_pools()
+
+    def _replace_pools(self) -> None:
+        # New pools are created with the new settings, open connections are closed once idle
+        stats = self._open_pools()
+        self._closed_pools.requests += stats.requests
+        self._closed_pools.connections += stats.connections
+        self.pool_manager.clear()
+
+    def _open_pools(self) -> ConnectionStats:
+        stats = ConnectionStats()
+        pools = self.pool_manager.pools
+        for key in pools.keys():
+            if pool := pools.get(key):
+                stats.requests += pool.num_requests
+                stats.connections += pool.num_connections
+        return stats
+
+    def stats(self) -> ConnectionStats:
+        with self._lock:
+            stats = self._open_pools()
+            return replace(
+                self._transferred,
+                requests=self._closed_pools.requests + stats.requests,
+                connections=self._closed_pools.connections + stats.connections,
+            )
+
+    def _should_compress(self, url: str, body) -> bool:
+        if not self.compress_endpoints or not isinstance(body, bytes) or len(body) < self.compress_min_size:
+            return False
+        path, base_path = urlsplit(url).path, urlsplit(self.api_client.configuration.host).path.rstrip("/")
+        return path.startswith(base_path) and path[len(base_path) :].startswith(self.compress_endpoints)
+
+    def _urlopen(self, urlopen: Callable, method: str, url: str, redirect: bool = True, **kwargs):
+        headers = HTTPHeaderDict(kwargs.get("headers") or {})
+        headers.setdefault("Accept-Encoding", ACCEPT_ENCODING)
+        body = kwargs.get("body")
+        uncompressed_size = _body_size(body)
+        if "Content-Encoding" not in headers and self._should_compress(url, body):
+            body = kwargs["body"] = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+            headers["Content-Length"] = str(len(body))
+        kwargs["headers"] = headers
+        kwargs.setdefault("retries", URLLIB3_RETRIES)
+        if kwargs.get("timeout") is None and self.timeout is not None:
+            # The generated api passes None for requests without a '_request_timeout', which urllib3 takes as none
+            kwargs["timeout"] = self.timeout
+
+        attempt = 1
+        while True:
+            try:
+                response = self._send(urlopen, method, url, redirect, attempt, uncompressed_size, **kwargs)
+            except urllib3.exceptions.HTTPError:
+                if not self._retry(method, url, attempt, body):
+                    raise
+            else:
+                if not is_retryable(response.status) or not self._retry(method, url, attempt, body, response):
+                    return response
+                response.drain_conn()
+                response.release_conn()
+            attempt += 1
+
+    def _send(
+        self, urlopen: Callable, method: str, url: str, redirect: bool, attempt: int, uncompressed_size: int, **kwargs
+    ):
+        limiter = self.limiter
+        endpoint = endpoint_name(method, url)
+        slot = limiter.acquire() if limiter else None
+        sent = time.perf_counter()
+        response, error = None, None
+        try:
+            response = urlopen(method, url, redirect=redirect, **kwargs)
+        except BaseException as exception:  # Raised once the request has been recorded
+            error = exception
+        status = response.status if response is not None else None
+        if limiter:
+            limiter.release(slot, endpoint, status)
+        record = RequestRecord(method, url, endpoint, status, time.perf_counter() - sent, attempt)
+        record.bytes_sent = _body_size(kwargs.get("body"))
+        if response is not None and kwargs.get("preload_content", True):  # Otherwise the body is not read yet
+            record.bytes_received = response.tell()
+            record.bytes_received_decoded = len(response.data or b"")
+        with self._lock:
+            self._transferred.bytes_sent += record.bytes_sent
+            self._transferred.bytes_sent_uncompressed += uncompressed_size
+            self._transferred.bytes_received += record.bytes_received
+            self._transferred.bytes_received_decoded += record.bytes_received_decoded
+        for hook in self.hooks:
+            try:
+                hook(record)
+            except Exception:  # Hooks are for bookkeeping, like metrics, and never fail the request
+                logger.warning("Failed to handle the record of a request to %s", endpoint, exc_info=True)
+        if error is not None:
+            raise error
+        return response
+
+    def _retry(self, method: str, url: str, attempt: int, body, response=None) -> bool:
+        """Wait before sending a failed request again, if the retry budget allows it and the body can be sent again"""
+        budget = self.retry_budget
+        rewindable = body is None or isinstance(body, (bytes, str)) or getattr(body, "seekable", lambda: False)()
+        if not budget or not rewindable or not budget.take(endpoint_name(method, url), attempt):
+            return False
+        time.sleep(budget.delay(attempt, _retry_after(response)))
+        if hasattr(body, "seek"):
+            body.seek(0)
+        return True
+
+    def request(self, method: str, resource_path: str, headers: dict = None, **kwargs) -> RESTResponse:
+        """Send a request to DMSS, with the host and default headers of the api client"""
+        response = self.pool_manager.request(
+            method,
+            self.api_client.configuration.host + resource_path,
+            headers={**self.api_client.default_headers, **(headers or {})},
+            **kwargs,
+        )
+        return RESTResponse(response)
+
+
+_transports: "weakref.WeakKeyDictionary[ApiClient, Transport]" = weakref.WeakKeyDictionary()
+_transports_lock = threading.Lock()
+
+
+def get_transport(api_client: ApiClient) -> Transport:
+    with _transports_lock:
+        if api_client not in _transports:
+            _transports[api_client] = Transport(api_client)
+        return _transports[api_client]
@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+from ..state import state
+
+
+def get_cache_dir(*parts: str) -> Path:
+    """
+    Get (and create) a directory for data the CLI keeps between runs.
+
+    The directory is scoped to the DMSS instance given by the '--url' option, as anything cached about
+    documents in one DMSS instance is invalid for another. The cache root can be set with 'DM_CLI_CACHE_DIR'.
+    """
+    cache_root = os.environ.get("DM_CLI_CACHE_DIR") or Path(
+        os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache", "dm-cli"
+    )
+    dmss_instance = hashlib.sha256(state.dmss_url.encode()).hexdigest()[:16]
+    cache_dir = Path(cache_root, dmss_instance, *parts)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def read_json_file(path: Path, default=None):
+    """Read a JSON file written by 'write_json_file', returning 'default' if it is missing or unreadable"""
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def write_json_file(path: Path, data) -> None:
+    """Write a JSON file atomically, so that an interrupted run never leaves a half written file behind"""
+    temporary_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(temporary_path, "w") as file:
+        json.dump(data, file)
+    os.replace(temporary_path, path)
+
+
+def hash_file(path: Path) -> str:
+    """Hash the content of a file, without reading it into memory in full"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_json(value: Any) -> str:
+    """Hash a JSON serializable value, independent of the order of the keys in it"""
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+
+def fingerprint_tree(path: Path) -> str:
+    """Hash the paths, sizes and modification times of every file in a folder, without reading the files"""
+    digest = hashlib.sha256()
+    for folder, _, filenames in sorted(os.walk(path)):
+        for filename in sorted(filenames):
+            stat = os.stat(os.path.join(folder, filename))
+            relative_path = Path(folder, filename).relative_to(path).as_posix()
+            digest.update(f"{relative_path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
@@ -0,0 +1,118 @@
+"""
+Encoding and decoding of JSON documents.
+
+Uses 'orjson' if it is installed (pip install development-framework-cli[fast]), and the standard library otherwise.
+Values 'orjson' does not support (e.g. dicts with non-string keys, or integers larger than 64 bits) are encoded
+with the standard library instead, so both backends accept the same documents. So are values with NaN or Infinity,
+which 'orjson' would encode as null, so they are encoded as the standard library decodes them.
+
+Both backends decode and encode nested values recursively, so documents nested deeper than the recursion limit
+(or than 'orjson' allows) can not be decoded or encoded, even though the CLI rewrites them without recursion.
+Such documents fail with a 'DocumentTooDeepError' rather than a RecursionError.
+"""
+
+import json
+import math
+import sys
+from types import SimpleNamespace
+from typing import IO, Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSONDecodeError = json.JSONDecodeError
+
+
+class DocumentTooDeepError(ValueError):
+    def __init__(self):
+        super().__init__(
+            f"The document is nested deeper than the recursion limit ({sys.getrecursionlimit()}) of JSON encoding"
+        )
+
+
+def backend() -> str:
+    return "orjson" if orjson else "json"
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Decode a JSON document. Raises 'JSONDecodeError' if it is not valid JSON"""
+    if orjson:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # The standard library also accepts NaN and Infinity, otherwise it raises the same error
+    try:
+        return json.loads(data)
+    except RecursionError:
+        raise DocumentTooDeepError() from None
+
+
+def load(file: IO) -> Any:
+    """Decode the JSON document in a file, opened in text or binary mode"""
+    return loads(file.read())
+
+
+def dumps_bytes(value: Any) -> bytes:
+    """Encode a value as UTF-8 encoded JSON, to be sent as a request body without copying it into a string"""
+    encoded = _orjson_dumps(value)
+    if encoded is not None:
+        return encoded
+    try:
+        return json.dumps(value, ensure_ascii=False).encode("utf-8")
+    except RecursionError:
+        raise DocumentTooDeepError() from None
+
+
+def dumps(value: Any) -> str:
+    """Encode a value as JSON"""
+    encoded = _orjson_dumps(value)
+    if encoded is not None:
+        return encoded.decode("utf-8")
+    try:
+        return json.dumps(value)
+    except RecursionError:
+        raise DocumentTooDeepError() from None
+
+
+def _orjson_dumps(value: Any) -> Union[bytes, None]:
+    """Encode a value with 'orjson', or return None if it must be encoded with the standard library"""
+    if not orjson:
+        return None
+    try:
+        encoded = orjson.dumps(value)
+    except TypeError:
+        return None
+    # 'orjson' encodes NaN and Infinity as null, so the value is only searched for them if there is a null
+    if b"null" in encoded and _has_non_finite_float(value):
+        return None
+    return encoded
+
+
+def _has_non_finite_float(value: Any) -> bool:
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, float):
+            if not math.isfinite(item):
+                return True
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return False
+
+
+def install_in_generated_client() -> None:
+    """
+    Make the generated DMSS api decode responses, and encode JSON request bodies, with this codec.
+
+    The generated code is replaced every time the api is generated, so rather than editing it, the 'json' module
+    it uses is replaced by a namespace with the same functions.
+    """
+    from ..dmss_api import api_client, rest
+
+    # Dicts and lists in multipart requests are encoded to strings, which the generated code encodes as UTF-8
+    api_client.json = SimpleNamespace(loads=loads, dumps=lambda value, **kwargs: dumps(value))
+    rest.json = SimpleNamespace(loads=loads, dumps=dumps_bytes)
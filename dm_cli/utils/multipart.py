@@ -0,0 +1,138 @@
+import io
+import mimetypes
+import os
+from typing import Callable, List, Tuple, Union
+from uuid import uuid4
+
+# A part of the body is either bytes, or a function opening a binary file together with the size of the file
+Segment = Union[bytes, Tuple[Callable[[], io.IOBase], int]]
+
+
+def _file_segment(file: io.IOBase) -> Tuple[Callable[[], io.IOBase], int]:
+    """
+    Files on the local filesystem (like 'LazyFile') are opened again for every pass over the body, while other
+    file-like objects (like 'io.BytesIO') are rewound. Neither is read into memory in full.
+    """
+    path = getattr(file, "path", None)
+    if path is not None:
+        return lambda: open(path, "rb"), os.path.getsize(path)
+
+    def rewind() -> io.IOBase:
+        file.seek(0)
+        return _Unclosable(file)
+
+    size = file.seek(0, io.SEEK_END)
+    return rewind, size
+
+
+class _Unclosable(io.RawIOBase):
+    """Reads from a file-like object owned by the caller, without closing it"""
+
+    def __init__(self, file: io.IOBase):
+        super().__init__()
+        self._file = file
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        return self._file.readinto(buffer)
+
+
+class MultipartStream(io.RawIOBase):
+    """
+    A multipart/form-data request body, produced part by part as it is read.
+
+    Files in the body are streamed in chunks when the request is sent, so the memory used does not depend on
+    their size. The length of the body is known up front, and the body can be rewound, so that a request
+    retried after a failed connection sends it again from the start.
+    """
+
+    def __init__(self, fields: List[Tuple[str, Union[str, io.IOBase]]]):
+        """
+        @param fields: Pairs of field name and value. Values are either strings, or files opened in binary mode.
+        """
+        super().__init__()
+        boundary = uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        self._segments: List[Segment] = []
+        for name, value in fields:
+            if isinstance(value, str):
+                self._segments.append(
+                    f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+                )
+                continue
+            filename = os.path.basename(value.name)
+            content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            self._segments.append(
+                (
+                    f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                    f"Content-Type: {content_type}\r\n\r\n"
+                ).encode()
+            )
+            self._segments.append(_file_segment(value))
+            self._segments.append(b"\r\n")
+        self._segments.append(f"--{boundary}--\r\n".encode())
+        self._length = sum(len(segment) if isinstance(segment, bytes) else segment[1] for segment in self._segments)
+        self._index = 0
+        self._offset = 0  # Within the current segment, if it is bytes
+        self._file = None  # The open file of the current segment, if it is a file
+        self._position = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_END:
+            offset += self._length
+        elif whence == io.SEEK_CUR:
+            offset += self._position
+        if offset == self._position:
+            return offset
+        if offset != 0:
+            raise io.UnsupportedOperation("A multipart stream can only be rewound to the start")
+        self._close_file()
+        self._index = self._offset = self._position = 0
+        return 0
+
+    def readinto(self, buffer) -> int:
+        buffer = memoryview(buffer).cast("B")
+        count = 0
+        while count < len(buffer) and self._index < len(self._segments):
+            segment = self._segments[self._index]
+            if isinstance(segment, bytes):
+                chunk = segment[self._offset : self._offset + len(buffer) - count]
+                buffer[count : count + len(chunk)] = chunk
+                self._offset += len(chunk)
+                read = len(chunk)
+                finished = self._offset == len(segment)
+            else:
+                if self._file is None:
+                    self._file = segment[0]()
+                read = self._file.readinto(buffer[count:]) or 0
+                finished = read == 0
+            count += read
+            if finished:
+                self._close_file()
+                self._index += 1
+                self._offset = 0
+        self._position += count
+        return count
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        self._close_file()
+        super().close()
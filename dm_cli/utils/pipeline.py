@@ -0,0 +1,88 @@
+from typing import Any, Hashable, Tuple
+
+from .traversal import walk
+
+# Returned by 'DocumentStage.child' when the stage should not follow a child
+SKIP = object()
+# Returned by 'DocumentStage.child' when the stage should not follow a child, nor any of the children after it
+STOP = object()
+
+
+class DocumentStage:
+    """
+    A transformation of a document, run by a 'DocumentPipeline' together with other stages in one traversal.
+
+    Every stage decides which children of a node it follows, and carries its own state down to them.
+    """
+
+    # If True, 'child' is only called for children that are dicts or lists
+    containers_only = False
+
+    def enter(self, node: Any, state: Any) -> Any:
+        """
+        Called on every node the stage follows, before any of its children are visited.
+
+        @param node: A dict or list in the document (or any value a stage chose to follow)
+        @param state: The state the stage passed down to the node
+        @return: A context that is passed to 'child' for every child of the node
+        """
+        return state
+
+    def child(self, node: Any, context: Any, key: Hashable, value: Any) -> Any:
+        """
+        Called for every key of a dict, or index of a list, in order, that the stage has entered.
+        Children that are followed are visited before 'child' is called for the next key.
+
+        @return: The state to follow 'value' with, or SKIP or STOP
+        """
+        return SKIP
+
+
+class DocumentPipeline:
+    """Runs document stages together, in one traversal of a document"""
+
+    def __init__(self, *stages: DocumentStage):
+        self.stages = stages
+
+    def run(self, document: Any, *states: Any) -> Any:
+        """
+        @param document: The document to transform in place
+        @param states: The initial state of every stage, or SKIP for stages that should not run on the document
+        @return: The transformed document
+        """
+        walk((document, states), self._visit)
+        return document
+
+    def _visit(self, item: Tuple[Any, Tuple]):
+        node, states = item
+        # The stages following this node, as (index, stage, context)
+        active = [
+            (index, stage, stage.enter(node, state))
+            for index, (stage, state) in enumerate(zip(self.stages, states))
+            if state is not SKIP
+        ]
+        if isinstance(node, dict):
+            children = node.items()
+        elif isinstance(node, list):
+            children = enumerate(node)
+        else:
+            return
+        for key, value in children:
+            if not active:
+                return
+            child_states = None  # Only allocated for children that are followed, most children are primitives
+            is_container = isinstance(value, (dict, list))
+            for index, stage, context in active:
+                if stage.containers_only and not is_container:
+                    continue
+                child_state = stage.child(node, context, key, value)
+                if child_state is SKIP:
+                    continue
+                if child_state is STOP:
+                    active = [following for following in active if following[0] != index]
+                    continue
+                if child_states is None:
+                    child_states = [SKIP] * len(self.stages)
+                child_states[index] = child_state
+            if child_states is not None:
+                yield value, child_states
@@ -1,10 +1,11 @@
 from os.path import normpath
 from pathlib import Path
-from typing import Dict, List, Union
+from typing import Dict, List, Tuple, Union
 
 from ..dmss import ApplicationException
 from ..domain import Dependency
 from ..enums import SIMOS, BuiltinDataTypes, ReferenceTypes
+from .pipeline import SKIP, STOP, DocumentPipeline, DocumentStage
 from .utils import resolve_dependency
 
 
@@ -30,6 +31,140 @@ def resolve_reference(
         raise ex
 
 
+# Looked up for every blueprint attribute, so the values are computed once
+BUILTIN_DATA_TYPES = frozenset(data_type.value for data_type in BuiltinDataTypes)
+
+
+class ReferenceResolver:
+    """
+    Resolves the references in documents that are imported to the same destination with the same dependencies.
+
+    Resolved references are memoized, as the same few references (like 'CORE:Blueprint') occur in every document.
+    Only dotted references depend on the path of the file they are in; all others depend on the root package
+    at most. The dependencies must not change after resolving has started.
+    """
+
+    def __init__(self, dependencies: Dict[str, Dependency], destination: str):
+        """
+        @param dependencies: A dict containing the dependencies of the documents
+        @param destination: The name of the data source where the documents should be stored
+        """
+        self.dependencies = dependencies
+        self.destination = destination
+        self._resolved: Dict[Tuple[str, str], str] = {}
+        self.stage = ReferenceStage(self)
+        self._pipeline = DocumentPipeline(self.stage)
+
+    def resolve(self, reference: str | None, file_path: str | None = None) -> str | None:
+        if not reference:
+            return reference
+        if reference[0] == ".":
+            key = (reference, file_path or "")
+        else:
+            key = (reference, file_path.split("/", 1)[0] if file_path else "")
+        resolved = self._resolved.get(key)
+        if resolved is None:
+            resolved = resolve_reference(reference, self.dependencies, self.destination, file_path)
+            self._resolved[key] = resolved
+        return resolved
+
+    def replace_relative_references(
+        self, value: dict | list, file_path: Union[str, None] = None, source_path: Path = None
+    ) -> Union[str, List[str], dict]:
+        """
+        Takes a dict or list, and returns the passed value, with
+        relative references replaced with absolute ones.
+
+        It digs down on complex types
+
+        @param value: Dict or list of an entity
+        @param file_path: The path to the directory containing the documents
+        @param source_path: path to the root folder (required when importing packages)
+        """
+        return self._pipeline.run(value, (file_path, source_path))
+
+
+# Marks which children of a node the reference stage follows
+_ALL_CHILDREN = object()
+_CONTAINER_CHILDREN = object()
+
+
+class ReferenceStage(DocumentStage):
+    """
+    Replaces relative references with absolute ones, following only the parts of a document that can hold them.
+    The state is the path to the directory containing the document, and the path to the root folder.
+    """
+
+    def __init__(self, resolver: ReferenceResolver):
+        self.resolver = resolver
+
+    def enter(self, value: dict | list, state: Tuple[Union[str, None], Path]) -> Union[tuple, None]:
+        file_path, source_path = state
+        resolve = self.resolver.resolve
+        if isinstance(value, dict):
+            if not value:
+                return None
+
+            if not value.get("type"):
+                raise KeyError(f"Object is missing the required 'type' attribute. File: '{file_path}'")
+
+            value["type"] = resolve(value["type"], file_path)
+
+            match value["type"]:
+                case SIMOS.REFERENCE.value:
+                    if value["referenceType"] == ReferenceTypes.LINK.value:
+                        value["address"] = resolve(value["address"], file_path)
+                    else:
+                        # Handle storage references
+                        local_file_path = "/".join(str(source_path).split("/")[:-1])
+                        if value["address"][0] == ".":
+                            raise ApplicationException(
+                                f"Relative references by . are not supported", data=value, debug=file_path
+                            )
+                        value["address"] = f"{local_file_path}{value['address']}"
+                    return None
+
+                case SIMOS.ATTRIBUTE.value:
+                    if enum_type := value.get("enumType"):
+                        value["enumType"] = resolve(enum_type, file_path)
+                    if value["attributeType"] not in BUILTIN_DATA_TYPES:
+                        value["attributeType"] = resolve(value["attributeType"], file_path)
+                        if value.get("default"):
+                            return state, ("default",)
+                    return None
+
+                case SIMOS.BLUEPRINT.value:
+                    value["extends"] = [resolve(ext_from, file_path) for ext_from in value.get("extends", [])]
+                    value.setdefault("attributes", [])
+                    return state, ("attributes", "_meta_") if value.get("_meta_") else ("attributes",)
+
+                case SIMOS.RECIPE_LINK.value:
+                    value["_blueprintPath_"] = resolve(value["_blueprintPath_"], file_path)
+                    return state, ("initialUiRecipe", "uiRecipes")
+
+                case _:  # The value is a dict, but of unknown type. Need to dig through it
+                    return state, _CONTAINER_CHILDREN
+
+        if isinstance(value, list):
+            if value and (isinstance(value[0], dict) or isinstance(value[0], list)):
+                return state, _ALL_CHILDREN
+            # It's an empty or primitive list. Dig no further
+            return None
+
+        raise ValueError(f"Function can only be called on dicts and lists. Got {value}")
+
+    def child(self, node: dict | list, context: Union[tuple, None], key, value):
+        if context is None:
+            return STOP
+        state, follow = context
+        if follow is _ALL_CHILDREN:
+            return state
+        if follow is _CONTAINER_CHILDREN:
+            return state if isinstance(value, (dict, list)) else SKIP
+        # Values that are not set are not dug into
+        return state if key in follow and value else SKIP
+
+
 def replace_relative_references(
     value: dict | list,
     dependencies: Dict[str, Dependency],
@@ -41,89 +176,12 @@ def replace_relative_references(
     Takes a dict or list, and returns the passed value, with
     relative references replaced with absolute ones.
 
-    For Blob-entities; insert the binary data from the file into the entity.
-    It digs down on complex types
+    Use a 'ReferenceResolver' instead when replacing references in several documents with the same dependencies.
 
     @param value: Dict or list of an entity
     @param dependencies: A dict containing the dependencies of the document
     @param destination: The name of the data source where the document should be stored
     @param file_path: The path to the directory containing the documents
-
-    When importing packages, the following additional parameter is required:
-    @param zip_file:
-    @param source_path: path to the root folder
+    @param source_path: path to the root folder (required when importing packages)
     """
-
-    def _resolve_reference(inner_value: str | None):
-        if not inner_value:
-            return inner_value
-        return resolve_reference(
-            inner_value,
-            dependencies,
-            destination,
-            file_path,
-        )
-
-    def _replace_relative(inner_value: dict | list):
-        return replace_relative_references(inner_value, dependencies, destination, file_path, source_path)
-
-    if isinstance(value, dict):
-        if not value:
-            return value
-
-        if not value.get("type"):
-            raise KeyError(f"Object is missing the required 'type' attribute. File: '{file_path}'")
-
-        value["type"] = _resolve_reference(value["type"])
-
-        match _resolve_reference(value["type"]):
-            case SIMOS.REFERENCE.value:
-                if value["referenceType"] == ReferenceTypes.LINK.value:
-                    value["address"] = _resolve_reference(value["address"])
-                else:
-                    # Handle storage references
-                    local_file_path = "/".join(str(source_path).split("/")[:-1])
-                    if value["address"][0] == ".":
-                        raise ApplicationException(
-                            f"Relative references by . are not supported", data=value, debug=file_path
-                        )
-                    value["address"] = f"{local_file_path}{value['address']}"
-                return value
-
-            case SIMOS.ATTRIBUTE.value:
-                if enum_type := value.get("enumType"):
-                    value["enumType"] = _resolve_reference(enum_type)
-                if value["attributeType"] not in [data_type.value for data_type in BuiltinDataTypes]:
-                    value["attributeType"] = _resolve_reference(value["attributeType"])
-                    if default := value.get("default"):
-                        value["default"] = _replace_relative(default)
-                return value
-
-            case SIMOS.BLUEPRINT.value:
-                value["extends"] = [_resolve_reference(ext_from) for ext_from in value.get("extends", [])]
-                value["attributes"] = [_replace_relative(attr) for attr in value.get("attributes", [])]
-                if meta := value.get("_meta_"):
-                    value["_meta_"] = _replace_relative(meta)
-                return value
-
-            case SIMOS.RECIPE_LINK.value:
-                value["_blueprintPath_"] = _resolve_reference(value["_blueprintPath_"])
-                if initial_recipe := value.get("initialUiRecipe"):
-                    value["initialUiRecipe"] = _replace_relative(initial_recipe)
-                if uiRecipes := value.get("uiRecipes"):
-                    value["uiRecipes"] = _replace_relative(uiRecipes)
-                return value
-
-            case _:  # The value is a dict, but of unknown type. Need to dig through it recursively
-                for key, inner_value in value.items():
-                    if isinstance(inner_value, dict) or isinstance(inner_value, list):
-                        value[key] = _replace_relative(inner_value)
-                return value
-
-    if isinstance(value, list):
-        if value and (isinstance(value[0], dict) or isinstance(value[0], list)):
-            return [_replace_relative(v) for v in value]
-        # It's an empty or primitive list. Dig no further
-        return value
-
-    raise ValueError(f"Function can only be called on dicts and lists. Got {value}")
+    return ReferenceResolver(dependencies, destination).replace_relative_references(value, file_path, source_path)
@@ -1,46 +1,19 @@
 import re
+from typing import Dict, Optional, Tuple, Union
 
-
-def search_in_list(
-    document: list, pattern: str, target_attr: str, path: str, parent_was_dict: bool, targets: dict, references: dict
-):
-    attribute_types = map(lambda attr: (attr, type(attr)), document)
-    for i, at in enumerate(attribute_types):
-        a = at[0]
-        t = at[1]
-        if is_primitive(t):
-            result = search_in_primitive(a, pattern)
-            if result:
-                references[f"{path}[{i}]"] = result
-        else:
-            action = type_to_action[t]
-            action(a, pattern, target_attr, f"{path}[{i}]", False, targets, references)
-
-
-def search_in_primitive(val, pattern: str):
-    match = re.match(pattern, str(val))
-    if match:
-        return match.group(1)
+from .pipeline import SKIP, DocumentPipeline, DocumentStage
 
 
 def is_primitive(t: type):
     return t == str or t == int or t == float or t == bool
 
 
-def is_list(t: type):
-    return t == list
-
-
-def is_dict(t: type):
-    return t == dict
-
-
 def search_in_dict(
     document: dict, pattern: str, target_attr: str, path: str, parent_was_dict: bool, targets: dict, references: dict
 ):
     """Search for internal references in 'document', referencing to a target attribute.
 
-    Uses the methods 'search_in_list' and 'search_in_primitive' to continue searching in attributes of these types
+    Nested dicts and lists are searched without recursion, in the same order as a recursive search would
 
     Args:
         document: the input document which contains internal references
@@ -59,31 +32,94 @@ def search_in_dict(
         that id (absolute local path)
     """
 
-    attribute_types = map(lambda attr: (attr, type(document[attr])), list(document.keys()))
-    for a, t in attribute_types:
-        val = document[a]
-        if is_primitive(t):
-            if a == target_attr:
-                parent_path = path.rsplit("[", 1)[0]
-                final_path = path if parent_was_dict else f"{parent_path}({target_attr}={val})"
-                targets[val] = final_path
-            result = search_in_primitive(val, pattern)
-            if result:
-                references[f"{path}.{a}"] = result
-        else:
-            action = type_to_action[t]
-            action(document[a], pattern, target_attr, f"{path}.{a}", True, targets, references)
+    _search(document, pattern, target_attr, path, parent_was_dict, targets, references)
     return targets, references
 
 
-def _dig_and_replace(document, path_iterator: iter, replace: str):
-    attr = next(path_iterator, None)
-    if not attr:
-        return True
-    attr = int(attr) if is_list(type(document)) else attr
-    last_attribute = _dig_and_replace(document[attr], path_iterator, replace)
-    if last_attribute:
-        document[attr] = replace
+# The default syntax of references to local ids, and the literal prefix every such reference starts with
+LOCAL_ID_PATTERN = r"\^\.\$(\w+)"
+LOCAL_ID_PREFIX = "^.$"
+
+# The path to a node, as (path to its parent, the segment added by the node, whether the parent is a dict)
+LocalIdPath = Tuple[Optional["LocalIdPath"], str, bool]
+
+
+class LocalIdStage(DocumentStage):
+    """
+    Collects the attributes that define local ids ('targets'), and the references to local ids ('references').
+    The state is the path to a node, which is only joined into a string for targets and references. See
+    'search_in_dict'.
+
+    With the default pattern, only strings starting with '^.$' are matched against it, so documents with many
+    numbers and other strings are searched without running the pattern on every value. The container holding each
+    reference is kept, so 'replace' does not have to find the references in the document again.
+    """
+
+    def __init__(
+        self, pattern: str = LOCAL_ID_PATTERN, target_attr: str = "_id", targets: dict = None, references: dict = None
+    ):
+        self.pattern = re.compile(pattern)
+        # Values that cannot match the pattern are skipped. For other patterns, every primitive is matched as before
+        self.prefix = LOCAL_ID_PREFIX if pattern == LOCAL_ID_PATTERN else None
+        self.target_attr = target_attr
+        self.targets = {} if targets is None else targets
+        self.references = {} if references is None else references
+        self.containers: Dict[str, Tuple[dict | list, Union[str, int]]] = {}
+
+    @staticmethod
+    def initial_state(path: str = "^", parent_was_dict: bool = True) -> LocalIdPath:
+        return None, path, parent_was_dict
+
+    @staticmethod
+    def join(path: LocalIdPath) -> str:
+        segments = []
+        while path:
+            path, segment, _ = path
+            segments.append(segment)
+        return "".join(reversed(segments))
+
+    def enter(self, node: dict | list, state: LocalIdPath) -> Tuple[LocalIdPath, bool]:
+        return state, isinstance(node, list)
+
+    def child(self, node: dict | list, context: Tuple[LocalIdPath, bool], key, value):
+        path, in_list = context
+        if isinstance(value, (dict, list)):
+            return (path, f"[{key}]", False) if in_list else (path, f".{key}", True)
+        if not in_list and key == self.target_attr and is_primitive(type(value)):
+            node_path = self.join(path)
+            self.targets[value] = (
+                node_path if path[2] else f"{node_path.rsplit('[', 1)[0]}({self.target_attr}={value})"
+            )
+        if self.prefix is not None:
+            if type(value) is not str or not value.startswith(self.prefix):
+                return SKIP
+        elif not is_primitive(type(value)):
+            return SKIP
+        match = self.pattern.match(str(value))
+        if match:
+            reference_path = f"{self.join(path)}[{key}]" if in_list else f"{self.join(path)}.{key}"
+            self.references[reference_path] = match.group(1)
+            self.containers[reference_path] = (node, key)
+        return SKIP
+
+    def replace(self) -> None:
+        """Replace the references found in the search with the paths of their targets. See 'dig_and_replace'"""
+        for path, ref in self.references.items():
+            container, key = self.containers[path]
+            container[key] = self.targets[ref]
+
+
+def _search(
+    document: dict | list,
+    pattern: str,
+    target_attr: str,
+    path: str,
+    parent_was_dict: bool,
+    targets: dict,
+    references: dict,
+) -> None:
+    stage = LocalIdStage(pattern, target_attr, targets, references)
+    DocumentPipeline(stage).run(document, stage.initial_state(path, parent_was_dict))
 
 
 def dig_and_replace(targets: dict, references: dict, document):
@@ -102,15 +138,20 @@ def dig_and_replace(targets: dict, references: dict, document):
 
     """
     for path, ref in references.items():
-        path_items = re.split("[\.\[\]]+", path)[1:]  # splits path on the '.', '[' and ']' characters
-        path_iterator = iter(path_items)
-        _dig_and_replace(document, path_iterator, targets[ref])
+        # Splits the path on the '.', '[' and ']' characters
+        path_items = [item for item in re.split(r"[\.\[\]]+", path)[1:] if item]
+        if not path_items:
+            continue
+        container = document
+        for item in path_items[:-1]:
+            container = container[int(item) if isinstance(container, list) else item]
+        container[int(path_items[-1]) if isinstance(container, list) else path_items[-1]] = targets[ref]
     return document
 
 
 def resolve_local_ids_in_document(
     document: dict,
-    pattern: str = r"\^\.\$(\w+)",
+    pattern: str = LOCAL_ID_PATTERN,
     target_attr: str = "_id",
     path: str = "^",
     parent_was_dict: bool = True,
@@ -135,8 +176,7 @@ def resolve_local_ids_in_document(
         The final document with all the local id references resolved into local path references
     """
 
-    targets, references = search_in_dict(document, pattern, target_attr, path, parent_was_dict, {}, {})
-    return dig_and_replace(targets, references, document)
-
-
-type_to_action = {list: search_in_list, dict: search_in_dict}
+    stage = LocalIdStage(pattern, target_attr)
+    DocumentPipeline(stage).run(document, stage.initial_state(path, parent_was_dict))
+    stage.replace()
+    return document
@@ -0,0 +1,25 @@
+from typing import Any, Callable, Iterable, Union
+
+_DONE = object()
+
+
+def walk(root: Any, visit: Callable[[Any], Union[Iterable, None]]) -> None:
+    """
+    Visit 'root' and every node below it, depth first and in the same order as a recursive traversal would,
+    but without recursion, so that deeply nested documents do not hit Python's recursion limit.
+    Note that decoding and encoding documents as JSON is still recursive (see 'codec').
+
+    @param root: The node to start from
+    @param visit: Called with every node. Returns the children to visit next, or None if the node is a leaf.
+        If 'visit' is a generator function, the code after each 'yield' runs once the subtree of the yielded
+        child has been visited, just like the code after a recursive call would.
+    """
+    stack = [iter((root,))]
+    while stack:
+        node = next(stack[-1], _DONE)
+        if node is _DONE:
+            stack.pop()
+            continue
+        children = visit(node)
+        if children is not None:
+            stack.append(iter(children))
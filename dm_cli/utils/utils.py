@@ -1,3 +1,4 @@
+import asyncio
 import json
 import os
 import pprint
@@ -10,7 +11,12 @@ from rich.console import Console
 
 from dm_cli.dmss import ApplicationException, dmss_api
 from dm_cli.dmss_api.exceptions import ApiException, NotFoundException
+from dm_cli.dmss_async import AsyncDMSS
+from dm_cli.profiler import phase
+from dm_cli.utils import codec
 from dm_cli.utils.file_structure import get_app_dir_structure, get_json_files_in_dir
+from dm_cli.utils.pipeline import SKIP, STOP, DocumentPipeline, DocumentStage
+from dm_cli.utils.resolve_local_ids import LocalIdStage
 
 from ..domain import Dependency, Package
 from ..enums import SIMOS
@@ -63,33 +69,68 @@ def add_package_to_path(name: str, path: Path):
     package = Package(name, is_root=len(path.parts) == 2)
     dmss_api.document_add(
         str(path.parent),
-        json.dumps(package.to_dict()),
+        codec.dumps(package.to_dict()),
         files=[],
     )
 
 
+class GlobalAddressStage(DocumentStage):
+    """
+    Replaces the addresses of references to files in the package, and of references to documents in the global
+    folders (which are uploaded on the way), with the ids they are stored with.
+    """
+
+    containers_only = True
+
+    def __init__(self, files_to_upload: dict, upload_global_file: Callable):
+        self.files_to_upload = files_to_upload
+        self.upload_global_file = upload_global_file
+
+    def enter(self, node: dict | list, state):
+        if isinstance(node, dict):
+            # This is for contained Files(blob data)?
+            # If so they should be embedded in the json document, not uploaded as a blob
+            if node["type"] == SIMOS.REFERENCE.value and node["address"] in self.files_to_upload:
+                blob_id = self.files_to_upload[node["address"]]
+                node["address"] = f"${blob_id}"
+            # This is for model contained, storage-uncontained documents.
+            # They are stored on disk in the "global" folder
+            if node["type"] == SIMOS.REFERENCE.value and node["referenceType"] == "storage":
+                global_id = self.upload_global_file(node["address"])
+                node["address"] = f"${global_id}"
+        return state
+
+    def child(self, node: dict | list, context, key, value):
+        if isinstance(node, list):  # The items of a list of dicts
+            return context if isinstance(value, dict) else SKIP
+        if key == "_meta_":  # meta data can never contain blob data.
+            return STOP
+        if isinstance(value, dict) and value:
+            return context
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            return context
+        return SKIP
+
+
 def replace_global_addresses(
     document: dict, data_source_id: str, files_to_upload: dict, upload_global_file: Callable
 ) -> dict:
-    # This is for contained Files(blob data)? If so they should be embedded in the json document, not uploaded as a blob
-    if document["type"] == SIMOS.REFERENCE.value and document["address"] in files_to_upload:
-        blob_id = files_to_upload[document["address"]]
-        document["address"] = f"${blob_id}"
-    # This is for model contained, storage-uncontained documents. They are stored on disk in the "global" folder
-    if document["type"] == SIMOS.REFERENCE.value and document["referenceType"] == "storage":
-        global_id = upload_global_file(document["address"])
-        document["address"] = f"${global_id}"
-    for key, value in document.items():
-        if key == "_meta_":  # meta data can never contain blob data.
-            return document
-        if isinstance(value, dict) and value:
-            document[key] = replace_global_addresses(value, data_source_id, files_to_upload, upload_global_file)
-        if isinstance(value, list) and value:
-            if len(value) > 0 and isinstance(value[0], dict):
-                document[key] = [
-                    replace_global_addresses(item, data_source_id, files_to_upload, upload_global_file)
-                    for item in document[key]
-                ]
+    return DocumentPipeline(GlobalAddressStage(files_to_upload, upload_global_file)).run(document, True)
+
+
+def prepare_document_for_upload(
+    document: dict, files_to_upload: dict, upload_global_file: Callable, resolve_local_ids: bool
+) -> dict:
+    """
+    Replace global addresses in a document, and optionally resolve its local ids, in one traversal of the document.
+    Does the same as 'replace_global_addresses' followed by 'resolve_local_ids_in_document'.
+    """
+    local_ids = LocalIdStage()
+    DocumentPipeline(GlobalAddressStage(files_to_upload, upload_global_file), local_ids).run(
+        document, True, local_ids.initial_state() if resolve_local_ids else SKIP
+    )
+    if resolve_local_ids:
+        local_ids.replace()
     return document
 
 
@@ -145,6 +186,7 @@ def get_root_packages_in_data_sources(path: str) -> dict:
     return root_packages_in_data_sources
 
 
+@phase("validation")
 def validate_entities_in_data_sources(data_source_contents: dict):
     """Run validation on entities in data sources.
     data_source_contents is a dict that contains what root packages are included in a data source. Example structure:
@@ -154,8 +196,20 @@ def validate_entities_in_data_sources(data_source_contents: dict):
     }
 
     """
-    for data_source_name in data_source_contents:
-        root_packages = data_source_contents[data_source_name]
-        for root_package_name in root_packages:
-            print("Validating entities in: ", f"{os.path.join(data_source_name, root_package_name)}")
-            dmss_api.validate_existing_entity(f"{os.path.join(data_source_name, root_package_name)}")
+    addresses = [
+        os.path.join(data_source_name, root_package_name)
+        for data_source_name, root_packages in data_source_contents.items()
+        for root_package_name in root_packages
+    ]
+    asyncio.run(_validate_existing_entities(addresses))
+
+
+async def _validate_existing_entities(addresses: List[str]) -> None:
+    """Validate the entities at the addresses concurrently, raising the first validation error"""
+    async with AsyncDMSS() as dmss:
+
+        async def validate(address: str) -> None:
+            print("Validating entities in: ", address)
+            await dmss.validate_existing_entity(address)
+
+        await asyncio.gather(*(validate(address) for address in addresses))
@@ -5,8 +5,10 @@ from zipfile import ZipFile
 import emoji
 
 from ..dmss import ApplicationException
+from ..profiler import phase
 
 
+@phase("zip_all")
 def zip_all(zip_file: ZipFile, path: str, real_name="", write_folder: bool = True):
     basename = os.path.basename(path)
     if os.path.isdir(path):
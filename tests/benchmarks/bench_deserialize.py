@@ -0,0 +1,69 @@
+"""
+Compares the cost of deserializing DMSS responses with the type conversion of the generated DMSS api, and as raw
+JSON (see 'use_raw_responses'), for a large document from 'document_get' and a list from 'data_source_get_all'.
+
+    PYTHONPATH=. python tests/benchmarks/bench_deserialize.py [--scale 50] [--repeat 5]
+"""
+
+import argparse
+import timeit
+from datetime import date, datetime
+from functools import partial
+from unittest import mock
+
+from dm_cli.dmss import _deserialize_raw
+from dm_cli.dmss_api import ApiClient
+from dm_cli.dmss_api.model.data_source_information import DataSourceInformation
+from dm_cli.dmss_api.model_utils import none_type
+from dm_cli.utils import codec
+
+DOCUMENT_TYPE = ({str: (bool, date, datetime, dict, float, int, list, str, none_type)},)
+DATA_SOURCES_TYPE = ([DataSourceInformation],)
+
+
+def large_document(scale: int) -> dict:
+    return {
+        "_id": "result",
+        "type": "dmss://DataSource/root/Result",
+        "series": [
+            {
+                "type": "dmss://DataSource/root/Series",
+                "name": f"series-{index}",
+                "values": [index * 0.5 + value for value in range(200)],
+                "labels": [f"label-{value}" for value in range(20)],
+                "meta": {"unit": "m/s", "valid": True, "source": None},
+            }
+            for index in range(scale)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=10)
+    arguments = parser.parse_args()
+
+    api_client = ApiClient()
+    generated = partial(ApiClient.deserialize, api_client)
+    document = mock.Mock(data=codec.dumps_bytes(large_document(arguments.scale)))
+    data_sources = mock.Mock(
+        data=codec.dumps_bytes(
+            [{"id": f"ds-{i}", "name": f"DataSource{i}", "host": "db", "type": "mongo-db"} for i in range(500)]
+        )
+    )
+    assert generated(document, DOCUMENT_TYPE, True) == _deserialize_raw(generated, document, DOCUMENT_TYPE, True)
+
+    for name, function in (
+        ("document_get: generated", lambda: generated(document, DOCUMENT_TYPE, True)),
+        ("document_get: raw", lambda: _deserialize_raw(generated, document, DOCUMENT_TYPE, True)),
+        ("data_source_get_all: generated", lambda: generated(data_sources, DATA_SOURCES_TYPE, True)),
+        ("data_source_get_all: raw", lambda: _deserialize_raw(generated, data_sources, DATA_SOURCES_TYPE, True)),
+    ):
+        seconds = min(timeit.repeat(function, number=arguments.number, repeat=arguments.repeat))
+        print(f"{name:<32}{seconds / arguments.number * 1e3:>10.2f} ms per response")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compares the per document cost of preparing entities for upload, by running the reference replacement,
+global address replacement and local id resolution as separate passes, and as stages of one pipeline.
+
+    PYTHONPATH=. python tests/benchmarks/bench_document_pipeline.py [--scale 50] [--repeat 5]
+"""
+
+import argparse
+import copy
+import json
+import timeit
+from pathlib import Path
+
+from dm_cli.domain import Dependency
+from dm_cli.utils.pipeline import DocumentPipeline
+from dm_cli.utils.reference import ReferenceResolver, replace_relative_references
+from dm_cli.utils.resolve_local_ids import (
+    LocalIdStage,
+    resolve_local_ids_in_document,
+)
+from dm_cli.utils.utils import (
+    GlobalAddressStage,
+    prepare_document_for_upload,
+    replace_global_addresses,
+)
+
+FIXTURE = Path(__file__).parents[1] / "unit" / "resolve_local_ids_test_data" / "carRentalCompany.json"
+DEPENDENCIES = {"CORE": Dependency(alias="CORE", protocol="dmss", address="system/SIMOS", version="0.0.1", type="")}
+
+
+def scaled_fixture(scale: int) -> dict:
+    """The car rental company from the unit tests, with 'scale' times as many cars and customers"""
+    with open(FIXTURE) as file:
+        document = json.load(file)
+    document["cars"] = [copy.deepcopy(document["cars"][index % 2]) for index in range(2 * scale)]
+    for index, cars in enumerate(document["cars"][2:], start=2):
+        for car in cars:
+            car["_id"] = f"{car['_id']}_{index}"
+    document["customers"] = [copy.deepcopy(customer) for customer in document["customers"] * scale]
+    return document
+
+
+def separate_passes(document: dict) -> dict:
+    document = replace_relative_references(document, DEPENDENCIES, "DataSource", "root")
+    document = replace_global_addresses(document, "DataSource", {}, str)
+    return resolve_local_ids_in_document(document)
+
+
+def fused_pipeline(document: dict) -> dict:
+    local_ids = LocalIdStage()
+    pipeline = DocumentPipeline(
+        ReferenceResolver(DEPENDENCIES, "DataSource").stage, GlobalAddressStage({}, str), local_ids
+    )
+    pipeline.run(document, ("root", None), True, local_ids.initial_state())
+    local_ids.replace()
+    return document
+
+
+def separate_upload_passes(document: dict) -> dict:
+    return resolve_local_ids_in_document(replace_global_addresses(document, "DataSource", {}, str))
+
+
+def fused_upload_pipeline(document: dict) -> dict:
+    return prepare_document_for_upload(document, {}, str, resolve_local_ids=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20)
+    arguments = parser.parse_args()
+
+    document = scaled_fixture(arguments.scale)
+    resolved = replace_relative_references(copy.deepcopy(document), DEPENDENCIES, "DataSource", "root")
+    assert separate_passes(copy.deepcopy(document)) == fused_pipeline(copy.deepcopy(document))
+
+    for name, function, fixture in (
+        ("3 separate passes", separate_passes, document),
+        ("3 stages, 1 pass", fused_pipeline, document),
+        ("upload: 2 separate passes", separate_upload_passes, resolved),
+        ("upload: 2 stages, 1 pass", fused_upload_pipeline, resolved),
+    ):
+        copies = [copy.deepcopy(fixture) for _ in range(arguments.repeat * arguments.number)]
+        seconds = min(timeit.repeat(lambda: function(copies.pop()), number=arguments.number, repeat=arguments.repeat))
+        print(f"{name:<28}{seconds / arguments.number * 1e6:>10.0f} µs per document")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Measures the startup time of the CLI: importing it, and running commands that do not talk to DMSS, like
+'dm --version' and 'dm --help', which should not import the generated DMSS api or the modules of the command groups.
+
+    PYTHONPATH=. python tests/benchmarks/bench_startup.py [--repeat 10]
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+COMMANDS = {
+    "import dm_cli.cli": [sys.executable, "-c", "import dm_cli.cli"],
+    "dm --version": [sys.executable, "-m", "dm_cli.cli", "--version"],
+    "dm --help": [sys.executable, "-m", "dm_cli.cli", "--help"],
+    "dm ds --help": [sys.executable, "-m", "dm_cli.cli", "ds", "--help"],
+    "python (baseline)": [sys.executable, "-c", "pass"],
+}
+
+
+def run(command: list) -> float:
+    start = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    arguments = parser.parse_args()
+
+    for name, command in COMMANDS.items():
+        run(command)  # Warm up the file system cache and the bytecode cache
+        seconds = sorted(run(command) for _ in range(arguments.repeat))
+        print(f"{name:<24}{seconds[0] * 1e3:>10.1f} ms best{seconds[len(seconds) // 2] * 1e3:>10.1f} ms median")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from dm_cli import response_cache
+from dm_cli.global_files import GlobalFileCache
+from dm_cli.import_journal import ImportJournal
+
+
+class CacheTestCase(unittest.TestCase):
+    """
+    A test case with its own cache directory ('DM_CLI_CACHE_DIR'), and without the caches, journals and manifests
+    kept in memory by earlier tests.
+    """
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = cache_dir.name
+        patcher = mock.patch.dict(os.environ, {"DM_CLI_CACHE_DIR": self.cache_dir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.new_run()
+        self.addCleanup(self.new_run)
+
+    def new_run(self):
+        """Forget what is kept in memory, like a new run of the CLI does"""
+        for journal in ImportJournal._open_journals.values():
+            journal.close()
+        ImportJournal._open_journals.clear()
+        GlobalFileCache._open_caches.clear()
+        response_cache._caches.clear()
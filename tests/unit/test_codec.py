@@ -0,0 +1,66 @@
+import io
+import json
+import math
+import unittest
+from unittest import mock
+
+from dm_cli.dmss import call_raw, dmss_api, use_raw_responses
+from dm_cli.dmss_api import ApiClient, api_client, rest
+from dm_cli.dmss_api.model.data_source_information import DataSourceInformation
+from dm_cli.utils import codec
+
+
+class CodecTest(unittest.TestCase):
+    document = {"name": "Ærøskøbing", "values": [1, 2.5, True, None, {"nested": "ünïcode"}], "count": 2**40}
+
+    def test_backends_encode_and_decode_the_same_documents(self):
+        for backend in (codec.orjson, None):
+            with mock.patch("dm_cli.utils.codec.orjson", backend):
+                assert json.loads(codec.dumps(self.document)) == self.document
+                assert json.loads(codec.dumps_bytes(self.document).decode("utf-8")) == self.document
+                assert codec.loads(json.dumps(self.document).encode()) == self.document
+                assert codec.load(io.StringIO(json.dumps(self.document))) == self.document
+                with self.assertRaises(codec.JSONDecodeError):
+                    codec.loads(b'{"name": ')
+
+    def test_values_the_fast_backend_rejects_are_encoded_by_the_standard_library(self):
+        value = {1: "non-string key", "big": 2**70}
+        assert json.loads(codec.dumps_bytes(value)) == {"1": "non-string key", "big": 2**70}
+        assert codec.loads("[NaN]")[0] != codec.loads("[NaN]")[0]
+
+    def test_backends_keep_nan_and_infinity(self):
+        value = {"values": [float("nan"), float("inf"), None], "nested": {"value": float("-inf")}}
+        for backend in (codec.orjson, None):
+            with mock.patch("dm_cli.utils.codec.orjson", backend):
+                for encoded in (codec.dumps(value), codec.dumps_bytes(value)):
+                    decoded = codec.loads(encoded)
+                    assert math.isnan(decoded["values"][0])
+                    assert decoded["values"][1:] == [float("inf"), None]
+                    assert decoded["nested"] == {"value": float("-inf")}
+
+    def test_generated_client_decodes_responses_with_the_codec(self):
+        assert api_client.json.loads is codec.loads and rest.json.dumps is codec.dumps_bytes
+        response = mock.Mock(data=codec.dumps_bytes(self.document))
+        assert (
+            dmss_api.api_client.deserialize(response, ({str: (bool, float, int, list, dict, str, type(None))},), True)
+            == self.document
+        )
+
+    def test_raw_responses_are_not_converted_to_models(self):
+        client = ApiClient()
+        response = mock.Mock(data=codec.dumps_bytes([{"id": "1", "name": "DataSource", "host": "db"}]))
+
+        use_raw_responses(client)
+        assert client.deserialize(response, ([DataSourceInformation],), True) == [
+            {"id": "1", "name": "DataSource", "host": "db"}
+        ]
+        use_raw_responses(client, enabled=False)
+        assert isinstance(client.deserialize(response, ([DataSourceInformation],), True)[0], DataSourceInformation)
+
+    def test_call_raw_parses_the_response_of_a_single_call(self):
+        response = mock.Mock(data=codec.dumps_bytes({"dependencies": []}))
+        operation = mock.Mock(return_value=response)
+
+        assert call_raw(operation, "DataSource/root") == {"dependencies": []}
+        operation.assert_called_once_with("DataSource/root", _preload_content=False)
+        response.release_conn.assert_called_once()
@@ -0,0 +1,82 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from dm_cli.concurrency import AdaptiveLimiter
+
+
+def respond(limiter: AdaptiveLimiter, status=200, endpoint="GET /api/documents", latency=0.0):
+    sent = limiter.acquire()
+    with mock.patch("dm_cli.concurrency.time.monotonic", return_value=sent + latency):
+        limiter.release(sent, endpoint, status)
+
+
+class AdaptiveLimiterTest(unittest.TestCase):
+    def test_limit_grows_additively_and_halves_on_overload(self):
+        limiter = AdaptiveLimiter(initial=4, max_limit=8)
+        for _ in range(6):  # 1/limit per response
+            respond(limiter)
+        assert limiter.limit == 5
+        for _ in range(100):
+            respond(limiter)
+        assert limiter.limit == 8
+
+        for status in (503, 429):
+            respond(limiter, status=status)
+        assert limiter.limit == 2  # Halved once per response, as both were sent after the previous decrease
+        for _ in range(10):
+            respond(limiter, status=500)
+        assert limiter.limit == 1
+        assert str(limiter.stats()) == (
+            "Concurrent requests to DMSS adapted between 1 and 8 (1 at the end, backed off 12 times)"
+        )
+
+    def test_latency_spikes_are_compared_to_the_same_endpoint(self):
+        limiter = AdaptiveLimiter(initial=8, max_limit=8)
+        respond(limiter, endpoint="POST /api/files", latency=2.0)
+        respond(limiter, endpoint="GET /api/documents", latency=0.2)
+        respond(limiter, endpoint="POST /api/files", latency=2.5)
+        respond(limiter, endpoint="GET /api/documents", latency=0.25)  # Within the jitter of DMSS
+        assert limiter.limit == 8
+        respond(limiter, endpoint="GET /api/documents", latency=1.0)
+        respond(limiter, endpoint="POST /api/files", latency=2.0)
+        respond(limiter, endpoint="GET /api/documents", latency=1.0)
+        assert limiter.limit == 8  # A single slow response, like for a large document, is not a spike
+        respond(limiter, endpoint="GET /api/documents", latency=1.2)
+        assert limiter.limit == 4
+
+    def test_lasting_change_in_latency_becomes_the_usual_latency(self):
+        limiter = AdaptiveLimiter(initial=10, max_limit=10)
+        for _ in range(50):
+            respond(limiter, latency=0.05)
+        for _ in range(200):
+            respond(limiter, latency=0.3)
+        stats = limiter.stats()
+        assert stats.limit == 10 and stats.decreases == 1
+
+    def test_failures_of_requests_sent_before_a_decrease_do_not_decrease_it_again(self):
+        limiter = AdaptiveLimiter(initial=4, max_limit=4)
+        in_flight = [limiter.acquire() for _ in range(4)]
+        for sent in in_flight:
+            limiter.release(sent, "GET /api/documents", 503)
+        assert limiter.limit == 2
+
+    def test_requests_wait_for_a_slot_but_redirects_do_not(self):
+        limiter = AdaptiveLimiter(initial=1, max_limit=1)
+        sent = limiter.acquire()
+        assert limiter.acquire() is None  # A redirect from the same thread
+        waited = []
+
+        def other_request():
+            respond(limiter)
+            waited.append(time.monotonic())
+
+        thread = threading.Thread(target=other_request)
+        thread.start()
+        time.sleep(0.05)
+        assert not waited
+        released = time.monotonic()
+        limiter.release(sent, "GET /api/documents", 200)
+        thread.join()
+        assert waited[0] >= released
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import unquote
+
+from dm_cli.dmss_api import ApiClient, Configuration
+from dm_cli.dmss_api.api.default_api import DefaultApi
+from dm_cli.dmss_api.exceptions import ApiException, NotFoundException
+from dm_cli.dmss_async import AsyncDMSS
+from dm_cli.utils.utils import validate_entities_in_data_sources
+
+
+class StubDMSS(BaseHTTPRequestHandler):
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, status: int, body) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):  # Validation
+        self.do_GET()
+
+    def do_GET(self):
+        with StubDMSS.lock:
+            StubDMSS.in_flight += 1
+            StubDMSS.max_in_flight = max(StubDMSS.max_in_flight, StubDMSS.in_flight)
+        time.sleep(0.02)
+        with StubDMSS.lock:
+            StubDMSS.in_flight -= 1
+        address = unquote(self.path.split("/", 3)[3])
+        if self.path.startswith("/api/documents-existence/"):
+            return self._respond(200, not address.endswith("missing"))
+        if self.path.startswith("/api/entity/validate-existing-entity/"):
+            return self._respond(200 if not address.endswith("invalid") else 422, "OK")
+        if address.endswith("missing"):
+            return self._respond(404, {"status": 404, "type": "NotFoundException", "message": "Not found"})
+        return self._respond(200, {"name": address.rsplit("/", 1)[-1], "type": "dmss://system/SIMOS/Entity"})
+
+
+class AsyncDMSSTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubDMSS)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.api = DefaultApi(ApiClient(Configuration(host=f"http://127.0.0.1:{cls.server.server_port}")))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_requests_are_concurrent_and_bounded(self):
+        async def get_documents():
+            async with AsyncDMSS(self.api, max_concurrency=4) as dmss:
+                return await asyncio.gather(*(dmss.document_get(f"ds/root/entity{i}") for i in range(40)))
+
+        StubDMSS.max_in_flight = 0
+        documents = asyncio.run(get_documents())
+
+        assert [document["name"] for document in documents] == [f"entity{i}" for i in range(40)]
+        assert 1 < StubDMSS.max_in_flight <= 4
+
+    def test_errors_are_raised_as_api_exceptions(self):
+        async def check_and_get():
+            async with AsyncDMSS(self.api, max_concurrency=2) as dmss:
+                exists = await asyncio.gather(dmss.document_check("ds/root/entity"), dmss.document_check("ds/missing"))
+                with self.assertRaises(NotFoundException):
+                    await dmss.document_get("ds/missing")
+                return exists
+
+        assert asyncio.run(check_and_get()) == [True, False]
+
+    def test_entities_in_data_sources_are_validated_concurrently(self):
+        StubDMSS.max_in_flight = 0
+        with mock.patch("dm_cli.dmss_async.dmss_api", self.api):
+            validate_entities_in_data_sources({"ds": [f"root{i}" for i in range(8)], "other": ["root"]})
+            assert StubDMSS.max_in_flight > 1
+            with self.assertRaises(ApiException):
+                validate_entities_in_data_sources({"ds": ["root", "invalid"]})
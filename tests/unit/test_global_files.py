@@ -0,0 +1,72 @@
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from cache_test_case import CacheTestCase
+
+from dm_cli.global_files import GlobalFileCache, invalidate_after_request
+
+HOST = "http://localhost:5000"
+
+
+class GlobalFileCacheTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = Path(self.cache_dir, "report.pdf")
+        self.path.write_bytes(b"%PDF")
+
+    def test_file_referenced_concurrently_is_uploaded_once(self):
+        cache = GlobalFileCache.open("DataSource")
+        uploads = []
+
+        def upload():
+            time.sleep(0.01)
+            uploads.append(1)
+            return f"id-{len(uploads)}"
+
+        ids = []
+        threads = [
+            threading.Thread(
+                target=lambda: ids.append(
+                    cache.get_or_upload("DataSource/root", "blob", self.path, cache.hash_file(self.path), upload)
+                )
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert ids == ["id-1"] * 8 and len(uploads) == 1
+        self.path.write_bytes(b"%PDF changed")
+        assert cache.get_or_upload("DataSource/root", "blob", self.path, cache.hash_file(self.path), upload) == "id-2"
+
+    def test_persisted_ids_are_reused_if_they_still_exist(self):
+        cache = GlobalFileCache.open("DataSource", persist=True)
+        cache.get_or_upload("DataSource/root", "document", self.path, "hash", lambda: "kept")
+        cache.get_or_upload("DataSource/root", "document", Path("other.json"), "hash", lambda: "removed")
+        cache.save()
+
+        self.new_run()
+        cache = GlobalFileCache.open("DataSource", persist=True)
+        with mock.patch("dm_cli.global_files.dmss_api.document_check", side_effect=lambda address: "kept" in address):
+            assert cache.get_or_upload("DataSource/root", "document", self.path, "hash", lambda: "new") == "kept"
+            assert (
+                cache.get_or_upload("DataSource/root", "document", Path("other.json"), "hash", lambda: "new") == "new"
+            )
+
+    def test_removing_one_owner_keeps_the_files_of_the_others(self):
+        cache = GlobalFileCache.open("DataSource")
+        uploads = iter(range(10))
+        for owner in ("DataSource/a", "DataSource/b", "DataSource/b/sub"):
+            cache.get_or_upload(owner, "blob", self.path, "hash", lambda: f"id-{next(uploads)}")
+
+        invalidate_after_request("DELETE", f"{HOST}/api/documents/DataSource%2Fb", 200)
+        assert cache.get_or_upload("DataSource/a", "blob", self.path, "hash", lambda: "new") == "id-0"
+        assert cache.get_or_upload("DataSource/b/sub", "blob", self.path, "hash", lambda: "new") == "new"
+
+        # Which root package a document removed by id was in is not known
+        invalidate_after_request("DELETE", f"{HOST}/api/documents/DataSource/$123", 200)
+        assert cache.get_or_upload("DataSource/a", "blob", self.path, "hash", lambda: "newer") == "newer"
@@ -0,0 +1,47 @@
+from pathlib import Path
+from unittest import mock
+
+from cache_test_case import CacheTestCase
+
+from dm_cli.import_journal import ImportJournal
+
+
+class ImportJournalTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = Path(self.cache_dir, "source", "models")
+        self.source.mkdir(parents=True)
+        (self.source / "Car.json").write_text('{"name": "Car"}')
+
+    def test_resumed_journal_keeps_ids_and_completed_uploads(self):
+        journal = ImportJournal.open("DataSource", self.source, resume=False)
+        journal.document_ids.update({"models/": "1", "models/Car.json": "2"})
+        journal.save_ids()
+        journal.mark_done("1")
+        assert ImportJournal.open("DataSource", self.source, resume=False) is journal  # Shared by retries
+
+        self.new_run()
+        resumed = ImportJournal.open("DataSource", self.source, resume=True)
+        assert resumed.document_ids == {"models/": "1", "models/Car.json": "2"}
+        assert resumed.completed == {"1"} and resumed.has_progress
+
+    def test_journal_is_discarded_when_not_resuming(self):
+        with mock.patch("dm_cli.import_journal.fingerprint_tree") as fingerprint_tree:
+            journal = ImportJournal.open("DataSource", self.source, resume=False)
+            assert not fingerprint_tree.called  # The files are only looked at once something is journalled
+        journal.mark_done("1")
+
+        self.new_run()
+        assert not ImportJournal.open("DataSource", self.source, resume=False).has_progress
+
+    def test_journal_is_discarded_when_the_files_changed_or_the_import_finished(self):
+        ImportJournal.open("DataSource", self.source, resume=False).mark_done("1")
+        self.new_run()
+        (self.source / "Car.json").write_text('{"name": "Car", "description": "Changed"}')
+        assert not ImportJournal.open("DataSource", self.source, resume=True).has_progress
+
+        journal = ImportJournal.open("DataSource", self.source, resume=True)
+        journal.mark_done("1")
+        journal.finish()
+        assert not journal.file_path.exists()
+        assert not ImportJournal.open("DataSource", self.source, resume=True).has_progress
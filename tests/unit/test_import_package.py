@@ -6,8 +6,16 @@ from uuid import UUID
 from zipfile import ZipFile
 
 from dm_cli.dmss import ApplicationException
-from dm_cli.domain import File
+from dm_cli.dmss_api.exceptions import ServiceException
+from dm_cli.domain import File, Package
+from dm_cli.import_package import (
+    add_file_to_package,
+    add_package_to_package,
+    upload_concurrently,
+)
+from dm_cli.package_tree_from_folder import package_tree_from_folder
 from dm_cli.package_tree_from_zip import package_tree_from_zip
+from dm_cli.utils.zip import zip_all
 
 """
 ROOT
@@ -235,6 +243,20 @@ test_documents_with_dependency_conflict = {
 }
 
 
+def comparable_tree(node):
+    """Strip the randomly generated ids from a Package tree, so that trees can be compared"""
+    if isinstance(node, Package):
+        return {"name": node.name, "meta": node.meta, "content": [comparable_tree(child) for child in node.content]}
+    if isinstance(node, File):
+        return {
+            "name": node.name,
+            "path": node.path,
+            "destination": node.content.destination,
+            "data": node.content.read(),
+        }
+    return {key: value for key, value in node.items() if key != "_id"}
+
+
 class ImportPackageTest(unittest.TestCase):
     def test_package_tree_from_zip_with_relative_references(self):
         memory_file = io.BytesIO()
@@ -307,3 +329,71 @@ class ImportPackageTest(unittest.TestCase):
 
         with self.assertRaises(ApplicationException):
             package_tree_from_zip(destination="test_data_source", zip_package=memory_file)
+
+    def test_upload_concurrently_uploads_all_items_and_aggregates_failures(self):
+        uploaded = []
+
+        def upload(entity):
+            if entity["name"].startswith("bad"):
+                raise ValueError(f"Could not upload {entity['name']}")
+            uploaded.append(entity["name"])
+
+        entities = [{"name": f"good{i}"} for i in range(20)] + [{"name": "bad1"}, {"name": "bad2"}]
+        with self.assertRaises(ApplicationException) as context:
+            upload_concurrently(entities, upload, desc="Adding entities")
+
+        assert sorted(uploaded) == sorted(f"good{i}" for i in range(20))
+        assert context.exception.message == "2 of 22 uploads failed (Adding entities)"
+        assert {failure["item"] for failure in context.exception.data["failures"]} == {"bad1", "bad2"}
+
+    def test_upload_concurrently_reraises_service_exception(self):
+        def upload(entity):
+            if entity["name"] == "unavailable":
+                raise ServiceException(status=503, reason="Service Unavailable")
+            raise ValueError("Invalid entity")
+
+        with self.assertRaises(ServiceException):
+            upload_concurrently([{"name": "invalid"}, {"name": "unavailable"}], upload, desc="Adding entities")
+
+    def test_package_tree_from_folder_matches_package_tree_from_zip(self):
+        for root_package in ("models", "instances"):
+            source_path = Path("tests/test_data/test_app_dir_struct/data/DemoApplicationDataSource") / root_package
+            memory_file = io.BytesIO()
+            with ZipFile(memory_file, mode="w") as zip_file:
+                zip_all(zip_file, source_path, write_folder=True)
+            memory_file.seek(0)
+
+            from_zip = package_tree_from_zip("DemoApplicationDataSource", memory_file, source_path=source_path)
+            from_folder = package_tree_from_folder("DemoApplicationDataSource", source_path)
+
+            assert comparable_tree(from_folder) == comparable_tree(from_zip)
+
+    def test_package_tree_from_folder_in_process_pool_matches_sequential(self):
+        for root_package in ("models", "instances"):
+            source_path = Path("tests/test_data/test_app_dir_struct/data/DemoApplicationDataSource") / root_package
+            document_ids = {}
+            sequential = package_tree_from_folder("DemoApplicationDataSource", source_path, document_ids=document_ids)
+            parallel_ids = dict(document_ids)
+            parallel = package_tree_from_folder(
+                "DemoApplicationDataSource", source_path, document_ids=parallel_ids, workers=2
+            )
+
+            assert comparable_tree(parallel) == comparable_tree(sequential)
+            assert parallel_ids == document_ids
+            assert [document["_id"] for document in parallel.content if isinstance(document, dict)] == [
+                document["_id"] for document in sequential.content if isinstance(document, dict)
+            ]
+
+    def test_package_index_follows_content_changes(self):
+        root_package = Package(name="Root")
+        add_package_to_package(Path("A/B"), root_package)
+        add_file_to_package(Path("A/B/doc.json"), root_package, {"name": "doc", "type": "Doc"})
+        add_file_to_package(Path("A/doc.json"), root_package, {"name": "B", "type": "Doc"})
+
+        folder_A = root_package.search("A")
+        assert len(root_package.content) == 1 and len(folder_A.content) == 2
+        assert isinstance(folder_A.search("B"), Package)  # First child with the name wins
+        assert folder_A.get_sub_package("B").search("doc")["type"] == "Doc"
+
+        root_package.traverse_documents(lambda document, file_path: {**document, "type": "Replaced"}, update=True)
+        assert folder_A.get_sub_package("B").search("doc")["type"] == "Replaced"
@@ -0,0 +1,52 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from cache_test_case import CacheTestCase
+
+from dm_cli.enums import SIMOS
+from dm_cli.incremental_import import Manifest, content_hash
+from dm_cli.package_tree_from_folder import package_tree_from_folder
+from dm_cli.utils.cache import hash_json
+
+source_path = Path("tests/test_data/test_app_dir_struct/data/DemoApplicationDataSource/models")
+
+
+class IncrementalImportTest(unittest.TestCase):
+    def test_package_tree_from_folder_reuses_document_ids(self):
+        document_ids = {}
+        first = package_tree_from_folder("DemoApplicationDataSource", source_path, document_ids=document_ids)
+        second = package_tree_from_folder("DemoApplicationDataSource", source_path, document_ids=dict(document_ids))
+
+        assert document_ids["models/"] == str(first.uid)
+        assert "models/CarPackage/" in document_ids and "models/CarPackage/Car.json" in document_ids
+        assert first.uid == second.uid
+        assert first.search("CarPackage").search("Car")["_id"] == second.search("CarPackage").search("Car")["_id"]
+        assert content_hash(first) == content_hash(second)
+
+    def test_documents_change_with_the_global_files_they_reference(self):
+        with tempfile.TemporaryDirectory() as global_folder:
+            blob = Path(global_folder, "report.pdf")
+            blob.write_bytes(b"%PDF")
+            reference = {"type": SIMOS.REFERENCE.value, "referenceType": "storage", "address": str(blob)}
+            document = {"name": "car", "report": {"type": "Report", "file": reference}}
+            before = content_hash(document)
+            assert content_hash(document) == before
+
+            blob.write_bytes(b"%PDF changed")
+            assert content_hash(document) != before
+            assert content_hash({"name": "car"}) == hash_json({"name": "car"})  # No storage references
+
+
+class ManifestTest(CacheTestCase):
+    def test_manifest_is_saved_per_data_source(self):
+        manifest = Manifest("DemoApplicationDataSource", resolve_local_ids=True)
+        manifest.set_entries_in("models", {"models/": {"id": "1", "hash": "a"}})
+        manifest.set_entries_in("instances", {"instances/": {"id": "2", "hash": "b"}})
+        manifest.save()
+
+        loaded = Manifest.load("DemoApplicationDataSource")
+        assert loaded.resolve_local_ids
+        assert loaded.root_packages() == {"models", "instances"}
+        assert loaded.entries_in("models") == {"models/": {"id": "1", "hash": "a"}}
+        assert Manifest.load("AnotherDataSource").entries == {}
@@ -0,0 +1,40 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from dm_cli.metrics import RequestMetrics
+from dm_cli.transport import RequestRecord
+
+
+class RequestMetricsTest(unittest.TestCase):
+    def test_requests_are_counted_by_endpoint(self):
+        metrics = RequestMetrics()
+        for status, seconds, attempt in ((503, 0.3, 1), (None, 20.0, 2), (200, 0.02, 3)):
+            metrics(RequestRecord("POST", "url", "POST /api/documents", status, seconds, attempt, bytes_sent=1000))
+        metrics(RequestRecord("GET", "url", "GET /api/export", 200, 1.5, 1, bytes_received=12345678))
+
+        endpoints = metrics.to_dict()["endpoints"]
+        documents = endpoints["POST /api/documents"]
+        assert (documents["requests"], documents["retries"], documents["failed"]) == (3, 2, 2)
+        assert documents["statuses"] == {"503": 1, "none": 1, "200": 1}
+        assert documents["latency_buckets"] == [0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 2, 3, 3, 3]
+        assert documents["bytes_sent"] == 3000 and endpoints["GET /api/export"]["bytes_received"] == 12345678
+
+    def test_metrics_are_written_as_json_and_prometheus_text(self):
+        metrics = RequestMetrics()
+        metrics(RequestRecord("GET", "url", "GET /api/export", 200, 1.5, 1, bytes_received=12345678))
+
+        with tempfile.TemporaryDirectory() as directory:
+            metrics.write(Path(directory, "metrics.json"))
+            report = json.loads(Path(directory, "metrics.json").read_text())
+            prometheus = Path(directory, "metrics.prom").read_text().splitlines()
+
+        assert report["endpoints"]["GET /api/export"]["requests"] == 1
+        labels = 'method="GET",endpoint="/api/export"'
+        assert f'dm_cli_requests_total{{{labels},status="200"}} 1' in prometheus
+        assert f'dm_cli_request_duration_seconds_bucket{{{labels},le="1.0"}} 0' in prometheus
+        assert f'dm_cli_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in prometheus
+        assert f"dm_cli_request_duration_seconds_sum{{{labels}}} 1.5" in prometheus
+        assert f"dm_cli_response_bytes_received_total{{{labels}}} 12345678" in prometheus
+        assert "# TYPE dm_cli_request_duration_seconds histogram" in prometheus
@@ -0,0 +1,62 @@
+import io
+import unittest
+from pathlib import Path
+
+from dm_cli.domain import File
+from dm_cli.package_tree_from_folder import package_tree_from_folder
+from dm_cli.preflight import DanglingReference, check_references, document_address
+
+DATA_SOURCE = "DemoApplicationDataSource"
+
+
+class PreflightTest(unittest.TestCase):
+    def setUp(self):
+        data_source_dir = Path("tests/test_data/test_app_dir_struct/data", DATA_SOURCE)
+        self.packages = [
+            (package_tree_from_folder(DATA_SOURCE, data_source_dir / root_package, is_root=True), DATA_SOURCE)
+            for root_package in ("models", "instances")
+        ]
+        self.scopes = [f"{DATA_SOURCE}/{package.name}" for package, _ in self.packages]
+        self.checked = []
+
+    def exists(self, address: str) -> bool:
+        self.checked.append(address)
+        return not address.endswith("/Missing")
+
+    def test_references_to_imported_packages_are_checked_without_dmss(self):
+        report = check_references(self.packages, self.scopes, exists=self.exists)
+
+        assert report.references > 0 and not report.dangling
+        assert self.checked and all(address.startswith("dmss://system/SIMOS/") for address in self.checked)
+        assert len(self.checked) == len(set(self.checked))  # Once for every document outside the packages
+
+    def test_dangling_references_are_reported(self):
+        models = self.packages[0][0]
+        blueprint = next(document for document in models.content if isinstance(document, dict))
+        blueprint["extends"] = [f"dmss://{DATA_SOURCE}/models/Missing", "dmss://system/SIMOS/Missing"]
+
+        report = check_references(self.packages, self.scopes, exists=self.exists)
+
+        assert report.dangling == [
+            DanglingReference(f"dmss://{DATA_SOURCE}/models/{blueprint['name']}", "extends", reference)
+            for reference in blueprint["extends"]
+        ]
+        assert f"dmss://{DATA_SOURCE}/models/Missing" not in self.checked
+
+    def test_links_to_files_are_checked_without_their_extension(self):
+        models = self.packages[0][0]
+        models.content.append(File(content=io.BytesIO(b"%PDF"), path=Path("report.pdf"), name="report.pdf"))
+        blueprint = next(document for document in models.content if isinstance(document, dict))
+        blueprint["extends"] = [f"dmss://{DATA_SOURCE}/models/report"]
+
+        report = check_references(self.packages, self.scopes, exists=self.exists)
+
+        assert not report.dangling
+        assert f"dmss://{DATA_SOURCE}/models/report" not in self.checked
+
+    def test_document_address_drops_attribute_paths(self):
+        assert document_address("dmss://DataSource/root/car.wheels[0]") == "dmss://DataSource/root/car"
+        assert document_address("dmss://DataSource/root/car(_id=1)") == "dmss://DataSource/root/car"
+        assert document_address("dmss://DataSource/root/") == "dmss://DataSource/root"
+        assert document_address("dmss://DataSource/root/my.package/Doc") == "dmss://DataSource/root/my.package/Doc"
+        assert document_address("dmss://DataSource/v1.2/car.wheels") == "dmss://DataSource/v1.2/car"
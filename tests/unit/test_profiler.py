@@ -0,0 +1,58 @@
+import pstats
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from rich.console import Console
+
+from dm_cli.profiler import PhaseProfiler
+
+
+class PhaseProfilerTest(unittest.TestCase):
+    def test_phases_are_only_recorded_when_enabled(self):
+        profiler = PhaseProfiler()
+        with profiler.phase("file upload"):
+            pass
+        assert profiler.phases() == {}
+
+        profiler.enable()
+        with profiler.phase("file upload"):
+            time.sleep(0.01)
+        with profiler.phase("entity upload"):
+            sum(range(100000))
+        profiler.disable()
+
+        phases = profiler.phases()
+        assert list(phases) == ["file upload", "entity upload"]
+        assert phases["file upload"].calls == 1 and phases["file upload"].wall_seconds >= 0.01
+        assert phases["entity upload"].cpu_seconds >= 0
+
+    def test_recursive_calls_are_counted_once(self):
+        profiler = PhaseProfiler()
+        profiler.enable()
+
+        @profiler.phase("zip_all")
+        def zip_all(depth: int) -> int:
+            with profiler.phase("reference replacement"):
+                return zip_all(depth - 1) + 1 if depth else 0
+
+        assert zip_all(3) == 3
+        assert zip_all(1) == 1
+        phases = profiler.phases()
+        assert (phases["zip_all"].calls, phases["reference replacement"].calls) == (2, 2)
+
+    def test_report_and_cprofile_stats(self):
+        profiler = PhaseProfiler()
+        profiler.enable(cprofile=True)
+        with profiler.phase("validation"):
+            sorted(range(1000), key=str)
+        profiler.disable()
+
+        console = Console(record=True, width=120)
+        console.print(profiler.table())
+        assert "validation" in console.export_text()
+        with tempfile.TemporaryDirectory() as directory:
+            profiler.dump_stats(str(Path(directory, "profile.pstats")))
+            stats = pstats.Stats(str(Path(directory, "profile.pstats")))
+        assert any("sorted" in str(function) for function in stats.stats)
@@ -1,9 +1,15 @@
 import unittest
+from copy import deepcopy
 from pathlib import Path
+from unittest import mock
 
 from dm_cli.dmss import ApplicationException
 from dm_cli.domain import Dependency
-from dm_cli.utils.reference import replace_relative_references
+from dm_cli.utils.reference import (
+    ReferenceResolver,
+    replace_relative_references,
+    resolve_reference,
+)
 from dm_cli.utils.utils import Package, concat_dependencies
 
 """
@@ -179,3 +185,29 @@ class ReplaceReferences(unittest.TestCase):
         assert "CORE" not in root_package.meta["type"]
         assert "CORE" not in root_package.content[0].meta["type"]
         assert "CORE" not in root_package.content[0].content[0].meta["type"]
+
+    def test_resolver_memoizes_references(self):
+        dependencies = {
+            "CORE": Dependency(
+                alias="CORE", protocol="dmss", address="system/SIMOS", version="0.0.1", type="CORE:Dependency"
+            )
+        }
+        resolver = ReferenceResolver(dependencies, "DataSource")
+        blueprint = {
+            "type": "CORE:Blueprint",
+            "attributes": [
+                {"type": "CORE:BlueprintAttribute", "attributeType": "./Wheel"},
+                {"type": "CORE:BlueprintAttribute", "attributeType": "Engine"},
+            ],
+        }
+
+        with mock.patch("dm_cli.utils.reference.resolve_reference", wraps=resolve_reference) as resolve:
+            resolver.replace_relative_references(deepcopy(blueprint), file_path="root/cars")
+            resolver.replace_relative_references(deepcopy(blueprint), file_path="root/cars")
+            assert resolve.call_count == 4  # Blueprint, BlueprintAttribute, ./Wheel and Engine
+            prepared = resolver.replace_relative_references(deepcopy(blueprint), file_path="root/boats")
+            assert resolve.call_count == 5  # Only the dotted reference depends on the file path
+
+        assert prepared["attributes"][0]["attributeType"] == "dmss://DataSource/root/boats/Wheel"
+        assert prepared["attributes"][1]["attributeType"] == "dmss://DataSource/root/Engine"
+        assert prepared == replace_relative_references(deepcopy(blueprint), dependencies, "DataSource", "root/boats")
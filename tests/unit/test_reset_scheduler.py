@@ -0,0 +1,71 @@
+import threading
+import time
+import unittest
+
+from dm_cli.dmss import ApplicationException
+from dm_cli.dmss_api.exceptions import ApiException
+from dm_cli.reset_scheduler import ResetScheduler, describe_error
+
+
+class ResetSchedulerTest(unittest.TestCase):
+    def test_data_sources_are_reset_concurrently_within_the_cap(self):
+        lock = threading.Lock()
+        running = {"now": 0, "max": 0}
+
+        def work():
+            with lock:
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+            time.sleep(0.02)
+            with lock:
+                running["now"] -= 1
+
+        def prepare(root_packages):
+            def prepare_data_source():
+                work()
+                return [(root_package, work) for root_package in root_packages]
+
+            return prepare_data_source
+
+        steps = ResetScheduler(max_parallel=3).run(
+            {"DS1": prepare(["a", "b", "c"]), "DS2": prepare(["d", "e"]), "DS3": prepare([])}
+        )
+
+        assert [(step.data_source, step.root_package) for step in steps] == [
+            ("DS1", None),
+            ("DS1", "a"),
+            ("DS1", "b"),
+            ("DS1", "c"),
+            ("DS2", None),
+            ("DS2", "d"),
+            ("DS2", "e"),
+            ("DS3", None),
+        ]
+        assert running["max"] == 3
+        assert not any(step.error for step in steps)
+
+    def test_failures_do_not_stop_other_data_sources(self):
+        def fail():
+            raise ApplicationException(message="Upload failed")
+
+        def prepare_broken():
+            raise FileNotFoundError("missing")
+
+        steps = ResetScheduler(max_parallel=2).run(
+            {
+                "Broken": prepare_broken,
+                "Partial": lambda: [("ok", lambda: None), ("bad", fail)],
+            }
+        )
+
+        errors = {(step.data_source, step.root_package): step.error for step in steps}
+        assert isinstance(errors[("Broken", None)], FileNotFoundError)
+        assert errors[("Partial", None)] is None and errors[("Partial", "ok")] is None
+        assert errors[("Partial", "bad")].message == "Upload failed"
+
+    def test_errors_from_dmss_are_described_with_their_message(self):
+        error = ApiException(status=400, reason="Bad Request")
+        error.body = '{"status": 400, "type": "BadRequestException", "message": "Document already exists"}'
+        assert describe_error(error) == "400 Bad Request: Document already exists"
+        error.body = "Bad Gateway"
+        assert describe_error(error) == "400 Bad Request: Bad Gateway"
@@ -36,3 +36,21 @@ class ResolveLocalIdsTest(unittest.TestCase):
 
         resolved_document = resolve_local_ids_in_document(test_json)
         assert resolved_document == expected
+
+    def test_only_values_that_can_be_references_are_resolved(self):
+        document = {
+            "_id": "root",
+            "values": [0.5, 7, True, None, "^.$root", "^.$", "$root"],
+            "series": [{"_id": "s42", "value": 1}, {"next": "^.$s42", "previous": "^.$root"}],
+        }
+
+        assert resolve_local_ids_in_document(document) == {
+            "_id": "root",
+            "values": [0.5, 7, True, None, "^", "^.$", "$root"],
+            "series": [{"_id": "s42", "value": 1}, {"next": "^.series(_id=s42)", "previous": "^"}],
+        }
+        # Other patterns are matched against every primitive
+        document = {"items": [{"_id": "2024"}, 2024, "2024-01-01"]}
+        assert resolve_local_ids_in_document(document, pattern=r"(\d+)$") == {
+            "items": [{"_id": "^.items(_id=2024)"}, "^.items(_id=2024)", "2024-01-01"]
+        }
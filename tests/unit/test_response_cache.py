@@ -0,0 +1,62 @@
+from unittest import mock
+
+from cache_test_case import CacheTestCase
+
+from dm_cli.response_cache import export_meta, invalidate_after_request
+
+HOST = "http://localhost:5000"
+
+
+class ResponseCacheTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch(
+            "dm_cli.response_cache.dmss_api.export_meta", side_effect=lambda address: {"address": address}
+        )
+        self.export_meta = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_responses_are_kept_between_runs_until_they_expire(self):
+        assert export_meta("DataSource/root/package") == {"address": "DataSource/root/package"}
+        self.new_run()
+        assert export_meta("dmss://DataSource/root/package/") == {"address": "DataSource/root/package"}
+        assert self.export_meta.call_count == 1
+
+        self.new_run()
+        with mock.patch("dm_cli.response_cache.time.time", return_value=1e12):
+            export_meta("DataSource/root/package")
+        assert self.export_meta.call_count == 2
+
+    def test_writes_by_the_cli_invalidate_responses(self):
+        for address in ("DataSource/root", "DataSource/root/package", "DataSource/other", "Other/root"):
+            export_meta(address)
+
+        # Adding a document to the root package does not change its meta, but may replace documents below it
+        invalidate_after_request("POST", f"{HOST}/api/documents/DataSource%2Froot", 200)
+        self.new_run()
+        for address in ("DataSource/root", "DataSource/root/package", "DataSource/other", "Other/root"):
+            export_meta(address)
+        assert [call.args[0] for call in self.export_meta.call_args_list[4:]] == ["DataSource/root/package"]
+
+        invalidate_after_request("DELETE", f"{HOST}/api/documents/DataSource/other", 404)
+        invalidate_after_request("GET", f"{HOST}/api/documents/Other/root", 200)
+        export_meta("DataSource/other")
+        export_meta("Other/root")
+        assert self.export_meta.call_count == 6
+
+        invalidate_after_request("POST", f"{HOST}/api/documents-add-raw/DataSource", 200)
+        export_meta("DataSource/root")
+        export_meta("Other/root")
+        assert self.export_meta.call_count == 7
+
+    def test_cache_files_are_not_touched_without_a_ttl(self):
+        export_meta("DataSource/root/package")
+        self.new_run()
+        with (
+            mock.patch("dm_cli.response_cache.state.cache_ttl", 0),
+            mock.patch("dm_cli.response_cache.read_json_file") as read_json_file,
+        ):
+            export_meta("DataSource/root/package")
+            invalidate_after_request("POST", f"{HOST}/api/documents/DataSource%2Froot", 200)
+        read_json_file.assert_not_called()
+        assert self.export_meta.call_count == 2
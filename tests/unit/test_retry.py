@@ -0,0 +1,30 @@
+import unittest
+from unittest import mock
+
+from dm_cli.retry import RetryBudget, is_retryable
+
+
+class RetryBudgetTest(unittest.TestCase):
+    def test_requests_are_retried_until_the_budget_is_spent(self):
+        budget = RetryBudget(budget=3, max_attempts=3)
+        assert budget.take("GET /api/documents", attempt=1)
+        assert budget.take("GET /api/documents", attempt=2)
+        assert not budget.take("GET /api/documents", attempt=3)  # Sent 3 times already
+        assert budget.take("POST /api/files", attempt=1)
+        assert not budget.take("POST /api/files", attempt=1)
+
+        assert str(budget.stats()) == (
+            "Retried requests to DMSS 3 times (0 of 3 retries left): GET /api/documents 2, POST /api/files 1. "
+            "1 failed requests were not retried, as the budget was spent"
+        )
+
+    def test_delay_grows_exponentially_and_respects_retry_after(self):
+        budget = RetryBudget(base_delay=0.5, max_delay=10.0)
+        with mock.patch("dm_cli.retry.random.uniform", side_effect=lambda low, high: high):
+            assert [budget.delay(attempt) for attempt in range(1, 7)] == [0.5, 1.0, 2.0, 4.0, 8.0, 10.0]
+        assert budget.delay(1, retry_after=3) == 3
+        assert budget.delay(1, retry_after=120) == 10.0
+
+    def test_only_server_errors_and_missing_responses_are_retried(self):
+        assert all(is_retryable(status) for status in (None, 429, 500, 503))
+        assert not any(is_retryable(status) for status in (200, 400, 404))
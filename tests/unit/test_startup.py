@@ -0,0 +1,39 @@
+import subprocess
+import sys
+import unittest
+
+# Modules the CLI only imports once a command uses DMSS, or runs an import
+LAZY_MODULES = ("dm_cli.dmss_api", "urllib3", "requests", "tqdm", "dm_cli.command_group.data_source")
+
+
+def modules_loaded_by(code: str) -> set:
+    output = subprocess.run(
+        [sys.executable, "-c", f"import sys\n{code}\nprint(' '.join(sys.modules))"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return set(output.splitlines()[-1].split())
+
+
+class StartupTest(unittest.TestCase):
+    def test_the_dmss_api_and_command_groups_are_not_imported_on_startup(self):
+        loaded = modules_loaded_by("import dm_cli.cli")
+        assert not loaded.intersection(LAZY_MODULES)
+
+        loaded = modules_loaded_by(
+            "from typer.testing import CliRunner\n"
+            "from dm_cli.cli import app\n"
+            "result = CliRunner().invoke(app, ['--help'], terminal_width=200)\n"
+            "assert result.exit_code == 0 and 'Import and reset data sources' in result.output, result.output"
+        )
+        assert not loaded.intersection(LAZY_MODULES)
+
+    def test_the_dmss_api_is_created_on_first_use(self):
+        loaded = modules_loaded_by(
+            "from dm_cli.dmss import dmss_api\n"
+            "from dm_cli.transport import get_transport\n"
+            "assert not dmss_api.is_created\n"
+            "assert get_transport(dmss_api.api_client).retry_budget is not None and dmss_api.is_created"
+        )
+        assert "dm_cli.dmss_api" in loaded
@@ -0,0 +1,98 @@
+import io
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from urllib3.filepost import encode_multipart_formdata
+
+from dm_cli.dmss import blob_upload, file_upload
+from dm_cli.dmss_api import ApiClient, Configuration
+from dm_cli.dmss_api.exceptions import ServiceException
+from dm_cli.domain import LazyFile
+from dm_cli.utils import codec
+from dm_cli.utils.multipart import MultipartStream
+
+
+class StubUpload(BaseHTTPRequestHandler):
+    received = []
+
+    def log_message(self, *args):
+        pass
+
+    def _receive(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        StubUpload.received.append((self.command, self.path, dict(self.headers), body))
+        status, response = (500, {"message": "Unavailable"}) if "unavailable" in self.path else (200, "OK")
+        data = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_POST = _receive
+    do_PUT = _receive
+
+
+class StreamingUploadTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubUpload)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        configuration = Configuration(host=f"http://127.0.0.1:{cls.server.server_port}")
+        configuration.access_token = "token"
+        cls.api_client = ApiClient(configuration)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubUpload.received.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name, "result.bin")
+        self.path.write_bytes(bytes(range(256)) * 4096)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_body_matches_the_generated_client_and_can_be_rewound(self):
+        stream = MultipartStream([("data", '{"file_id": "1"}'), ("file", LazyFile(self.path, "result.bin", Path()))])
+        boundary = stream.content_type.split("boundary=")[1]
+        expected, content_type = encode_multipart_formdata(
+            [
+                ("data", '{"file_id": "1"}'),
+                ("file", ("result.bin", self.path.read_bytes(), "application/octet-stream")),
+            ],
+            boundary=boundary,
+        )
+
+        assert stream.read(100) == expected[:100]
+        stream.seek(0)
+        assert stream.read() == expected and len(stream) == len(expected)
+        assert stream.content_type == content_type
+
+    def test_files_and_blobs_are_uploaded_from_disk(self):
+        file_upload("DataSource", "1", LazyFile(self.path, "result.bin", Path()), api_client=self.api_client)
+        in_memory = io.BytesIO(b"blob")
+        in_memory.name = "blob"
+        assert blob_upload("DataSource", "2", in_memory, api_client=self.api_client) == "OK"
+
+        (file_method, file_path, file_headers, file_body), (blob_method, blob_path, _, blob_body) = StubUpload.received
+        assert (file_method, file_path, blob_method, blob_path) == (
+            "POST",
+            "/api/files/DataSource",
+            "PUT",
+            "/api/blobs/DataSource/2",
+        )
+        assert file_headers["Authorization"] == "Bearer token"
+        assert codec.dumps({"file_id": "1"}).encode() in file_body and self.path.read_bytes() in file_body
+        assert b"\r\n\r\nblob\r\n" in blob_body and not in_memory.closed
+
+    def test_errors_are_raised_like_the_generated_client(self):
+        with self.assertRaises(ServiceException):
+            blob_upload("unavailable", "1", LazyFile(self.path, "result.bin", Path()), api_client=self.api_client)
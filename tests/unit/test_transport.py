@@ -0,0 +1,187 @@
+import gzip
+import io
+import socket
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import urllib3
+
+from dm_cli.concurrency import AdaptiveLimiter
+from dm_cli.dmss_api import ApiClient, Configuration
+from dm_cli.dmss_api.api.default_api import DefaultApi
+from dm_cli.dmss_api.exceptions import ServiceException
+from dm_cli.retry import RetryBudget
+from dm_cli.transport import get_transport
+
+
+class StubDmss(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep connections alive
+    in_flight = 0
+    most_in_flight = 0
+    received = []
+    failures = 0  # The number of requests to respond to with 503 Service Unavailable
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self._fail():
+            return
+        with StubDmss.lock:
+            StubDmss.in_flight += 1
+            StubDmss.most_in_flight = max(StubDmss.most_in_flight, StubDmss.in_flight)
+        time.sleep(0.02)
+        with StubDmss.lock:
+            StubDmss.in_flight -= 1
+        self._respond(b"true")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        StubDmss.received.append((self.path, self.headers.get("Content-Encoding"), body))
+        if self._fail():
+            return
+        self._respond(b'"' + b"ok" * 1000 + b'"')
+
+    def _fail(self) -> bool:
+        with StubDmss.lock:
+            if StubDmss.failures <= 0:
+                return False
+            StubDmss.failures -= 1
+        self.send_response(503)
+        self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        return True
+
+    def _respond(self, data: bytes, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TransportTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubDmss)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubDmss.most_in_flight = 0
+        StubDmss.received.clear()
+        StubDmss.failures = 0
+        self.api = DefaultApi(ApiClient(Configuration(host=f"http://127.0.0.1:{self.server.server_port}")))
+        self.transport = get_transport(self.api.api_client)
+
+    def test_connections_are_reused_by_the_api_and_other_requests(self):
+        for _ in range(5):
+            assert self.api.document_check("DataSource/root/entity") is True
+            assert self.transport.request("GET", "/api/export/DataSource/root").data == b"true"
+
+        stats = self.transport.stats()
+        assert (stats.requests, stats.connections, stats.reused) == (10, 1, 9)
+        self.transport.ensure_pool_size(8)  # Replaces the pool, but keeps counting
+        self.api.document_check("DataSource/root/entity")
+        assert (self.transport.stats().requests, self.transport.stats().connections) == (11, 2)
+
+    def test_connections_can_be_limited(self):
+        self.transport.configure(max_connections=2, connect_timeout=1, read_timeout=5)
+        self.transport.ensure_pool_size(8)  # A limit is not overridden by the number of requests in flight
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: self.api.document_check("DataSource/root/entity"), range(16)))
+
+        assert StubDmss.most_in_flight <= 2
+        assert self.transport.stats().connections <= 2
+
+    def test_requests_of_the_api_time_out(self):
+        with socket.socket() as unresponsive:  # Accepts connections, but never responds
+            unresponsive.bind(("127.0.0.1", 0))
+            unresponsive.listen()
+            api = DefaultApi(ApiClient(Configuration(host=f"http://127.0.0.1:{unresponsive.getsockname()[1]}")))
+            get_transport(api.api_client).configure(connect_timeout=1, read_timeout=0.1)
+            start = time.perf_counter()
+            with self.assertRaises(urllib3.exceptions.MaxRetryError):
+                api.document_check("DataSource/root/entity")
+            assert time.perf_counter() - start < 2
+
+    def test_requests_in_flight_are_limited_by_the_limiter(self):
+        self.transport.limiter = AdaptiveLimiter(initial=1, max_limit=2)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: self.api.document_check("DataSource/root/entity"), range(16)))
+
+        assert StubDmss.most_in_flight <= 2
+        assert self.transport.limiter.stats().highest == 2
+
+    def test_failed_requests_are_retried_until_the_budget_is_spent(self):
+        self.transport.retry_budget = RetryBudget(budget=3, max_attempts=2)
+        records = []
+        self.transport.hooks.append(records.append)
+        StubDmss.failures = 1
+        response = self.transport.request(
+            "POST", "/api/documents/DataSource", body=io.BytesIO(b"{}"), headers={"Content-Length": "2"}
+        )
+        assert response.status == 200
+        assert [body for _, _, body in StubDmss.received] == [b"{}", b"{}"]  # Rewound for the retry
+        assert [(record.endpoint, record.status, record.attempt) for record in records] == [
+            ("POST /api/documents", 503, 1),
+            ("POST /api/documents", 200, 2),
+        ]
+
+        StubDmss.failures = 2
+        with self.assertRaises(ServiceException):  # Only sent twice
+            self.api.document_check("DataSource/root/entity")
+        StubDmss.failures = 1
+        assert self.api.document_check("DataSource/root/entity") is True
+        StubDmss.failures = 1
+        with self.assertRaises(ServiceException):  # The budget is spent
+            self.api.document_check("DataSource/root/entity")
+
+        stats = self.transport.retry_budget.stats()
+        assert (stats.spent, stats.exhausted) == (3, 1)
+        assert stats.by_endpoint == {"POST /api/documents": 1, "GET /api/documents-existence": 2}
+
+    def test_failing_hooks_do_not_affect_requests(self):
+        records = []
+        self.transport.hooks.extend([mock.Mock(side_effect=OSError("Disk full")), records.append])
+        with self.assertLogs("dm_cli.transport", level="WARNING"):
+            assert self.api.document_check("DataSource/root/entity") is True
+        StubDmss.failures = 1
+        with self.assertLogs("dm_cli.transport", level="WARNING"), self.assertRaises(ServiceException):
+            self.api.document_check("DataSource/root/entity")
+        assert [record.status for record in records] == [200, 503]
+
+    def test_request_bodies_are_compressed_for_configured_endpoints(self):
+        self.transport.configure(compress_endpoints=["/api/documents"], compress_min_size=100)
+        document = b'{"name": "entity", "values": [' + b"1.0, " * 1000 + b"1.0]}"
+
+        for path, body in (
+            ("/api/documents/DataSource", document),
+            ("/api/documents/small", b"{}"),
+            ("/api/x", document),
+        ):
+            response = self.transport.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+            assert response.data == b'"' + b"ok" * 1000 + b'"'  # Decoded from gzip
+
+        (_, encoding, compressed), small, other = StubDmss.received
+        assert encoding == "gzip" and gzip.decompress(compressed) == document
+        assert small == ("/api/documents/small", None, b"{}") and other == ("/api/x", None, document)
+        stats = self.transport.stats()
+        assert stats.bytes_sent == len(compressed) + 2 + len(document)
+        assert stats.bytes_sent_uncompressed == 2 * len(document) + 2
+        assert stats.bytes_received < stats.bytes_received_decoded == 3 * 2002
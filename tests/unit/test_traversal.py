@@ -0,0 +1,90 @@
+import json
+import sys
+import unittest
+from copy import deepcopy
+
+from dm_cli.domain import Dependency
+from dm_cli.enums import SIMOS
+from dm_cli.utils import codec
+from dm_cli.utils.reference import replace_relative_references
+from dm_cli.utils.resolve_local_ids import resolve_local_ids_in_document
+from dm_cli.utils.traversal import walk
+from dm_cli.utils.utils import prepare_document_for_upload, replace_global_addresses
+
+
+def nested_entity(depth: int) -> dict:
+    """A chain of 'depth' contained entities, where the innermost one links to the outermost one"""
+    innermost = {
+        "type": "Segment",
+        "next": {"type": SIMOS.REFERENCE.value, "address": "^.$first", "referenceType": "link"},
+    }
+    entity = innermost
+    for _ in range(depth):
+        entity = {"type": "Segment", "next": entity}
+    entity["_id"] = "first"
+    return entity
+
+
+class TraversalTest(unittest.TestCase):
+    def test_walk_visits_in_recursive_order(self):
+        tree = {"name": "a", "children": [{"name": "b", "children": [{"name": "c", "children": []}]}, {"name": "d"}]}
+        visited = []
+
+        def visit(node):
+            visited.append(f"enter {node['name']}")
+            for child in node.get("children", []):
+                yield child
+                visited.append(f"back in {node['name']}")
+
+        walk(tree, visit)
+        assert visited == ["enter a", "enter b", "enter c", "back in b", "back in a", "enter d", "back in a"]
+
+    def test_deeply_nested_entities_are_rewritten(self):
+        depth = sys.getrecursionlimit() * 2
+        dependencies = {
+            "CORE": Dependency(alias="CORE", protocol="dmss", address="system/SIMOS", version="0.0.1", type="")
+        }
+
+        entity = replace_relative_references(nested_entity(depth), dependencies, "DataSource", "root")
+        entity = replace_global_addresses(entity, "DataSource", {}, lambda address: address)
+        entity = resolve_local_ids_in_document(entity)
+
+        innermost = entity
+        for _ in range(depth):
+            assert innermost["type"] == "dmss://DataSource/root/Segment"
+            innermost = innermost["next"]
+        assert innermost["next"]["address"] == "^"
+
+        # Decoding and encoding JSON is recursive, so such documents can not be uploaded
+        with self.assertRaises(codec.DocumentTooDeepError):
+            codec.dumps(entity)
+
+    def test_upload_stages_in_one_pass_match_separate_passes(self):
+        with open("tests/unit/resolve_local_ids_test_data/carRentalCompany.json") as file:
+            document = json.load(file)
+        for customer in document["customers"]:
+            for reference in (customer.get("car"), customer.get("chauffeur")):
+                if reference:
+                    reference["type"] = SIMOS.REFERENCE.value
+        document["owner"]["contract"] = {
+            "type": SIMOS.REFERENCE.value,
+            "referenceType": "storage",
+            "address": "global/contract.json",
+        }
+        document["owner"]["photo"] = {"type": SIMOS.REFERENCE.value, "referenceType": "link", "address": "photo"}
+        uploaded = []
+
+        def upload_global_file(address: str) -> str:
+            uploaded.append(address)
+            return "contract-id"
+
+        expected = resolve_local_ids_in_document(
+            replace_global_addresses(deepcopy(document), "DataSource", {"photo": "photo-id"}, upload_global_file)
+        )
+        prepared = prepare_document_for_upload(document, {"photo": "photo-id"}, upload_global_file, True)
+
+        assert prepared == expected
+        assert uploaded == ["global/contract.json"] * 2
+        assert prepared["owner"]["contract"]["address"] == "$contract-id"
+        assert prepared["owner"]["photo"]["address"] == "$photo-id"
+        assert prepared["customers"][0]["car"]["address"] == "^.cars[0](_id=7654321)"